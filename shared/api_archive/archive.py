@@ -1,17 +1,27 @@
-import json
 import logging
+import os
+import re
+import tempfile
 from base64 import b16encode
 from enum import Enum
+from functools import cached_property
 from hashlib import md5
 
 import sentry_sdk
 
 import shared.storage
 from shared.config import get_config
-from shared.utils.ReportEncoder import ReportEncoder
+from shared.storage.cached import CachedStorageService
+from shared.storage.disk_cache import DiskCache
+from shared.storage.metrics import path_template_regex, register_object_kinds
+from shared.storage.zstd_dictionaries import train_dictionary
+from shared.utils.ReportEncoder import ReportEncoder, dumps_json, iter_json
 
 log = logging.getLogger(__name__)
 
+# Streamed JSON payloads are spilled to a temporary file past this size
+JSON_SPOOL_SIZE = 1024 * 1024 * 8
+
 
 # TODO deduplicate this logic from worker and shared
 class MinioEndpoints(Enum):
@@ -35,6 +45,57 @@ class MinioEndpoints(Enum):
     def get_path(self, **kwaargs):
         return self.value.format(**kwaargs)
 
+    @cached_property
+    def path_regex(self) -> re.Pattern:
+        return path_template_regex(self.value)
+
+    def matches(self, path: str) -> bool:
+        return self.path_regex.fullmatch(path) is not None
+
+
+# Objects of these endpoints are never modified once written
+IMMUTABLE_ENDPOINTS = (
+    MinioEndpoints.chunks,
+    MinioEndpoints.raw,
+    MinioEndpoints.raw_with_upload_id,
+)
+
+
+register_object_kinds(
+    {endpoint.name: endpoint.path_regex for endpoint in MinioEndpoints}
+)
+
+
+def is_immutable_path(_bucket_name: str, path: str) -> bool:
+    return any(endpoint.matches(path) for endpoint in IMMUTABLE_ENDPOINTS)
+
+
+def get_local_cache() -> DiskCache | None:
+    """
+    Returns the local on-disk cache of immutable archive objects,
+    or `None` if it is not enabled in the config.
+    """
+    if not get_config("services", "minio", "local_cache", "enabled", default=False):
+        return None
+    return DiskCache(
+        directory=get_config(
+            "services",
+            "minio",
+            "local_cache",
+            "directory",
+            default=os.path.join(tempfile.gettempdir(), "archive_cache"),
+        ),
+        max_bytes=int(
+            get_config(
+                "services",
+                "minio",
+                "local_cache",
+                "max_bytes",
+                default=2 * 1024 * 1024 * 1024,
+            )
+        ),
+    )
+
 
 class ArchiveService(object):
     """
@@ -67,6 +128,10 @@ class ArchiveService(object):
         self.storage = shared.storage.get_appropriate_storage_service(
             repository.repoid if repository else None
         )
+        if (local_cache := get_local_cache()) is not None:
+            self.storage = CachedStorageService(
+                self.storage, local_cache, cacheable=is_immutable_path
+            )
 
         self.storage_hash = self.get_archive_hash(repository) if repository else None
 
@@ -101,13 +166,21 @@ class ArchiveService(object):
         data: dict,
         *,
         encoder=ReportEncoder,
+        stream: bool = False,
     ):
+        """
+        Writes `data` as JSON, encoded by `dumps_json` with `encoder`.
+
+        With `stream`, large payloads are encoded piecewise into a temporary file
+        which is then uploaded, instead of being encoded in memory all at once.
+        """
         if not self.storage_hash:
             raise ValueError("No hash key provided")
         if commit_id is None:
             # Some classes don't have a commit associated with them
             # For example Pull belongs to multiple commits.
-            path = MinioEndpoints.json_data_no_commit.get_path(
+            endpoint = MinioEndpoints.json_data_no_commit
+            path = endpoint.get_path(
                 version="v4",
                 repo_hash=self.storage_hash,
                 table=table,
@@ -115,7 +188,8 @@ class ArchiveService(object):
                 external_id=external_id,
             )
         else:
-            path = MinioEndpoints.json_data.get_path(
+            endpoint = MinioEndpoints.json_data
+            path = endpoint.get_path(
                 version="v4",
                 repo_hash=self.storage_hash,
                 commitid=commit_id,
@@ -123,25 +197,66 @@ class ArchiveService(object):
                 field=field,
                 external_id=external_id,
             )
-        stringified_data = json.dumps(data, cls=encoder)
-        self.write_file(path, stringified_data)
+        zstd_dictionary = self.get_zstd_dictionary(endpoint)
+        if stream:
+            with tempfile.SpooledTemporaryFile(max_size=JSON_SPOOL_SIZE) as data_file:
+                for chunk in iter_json(data, encoder):
+                    data_file.write(chunk)
+                data_file.seek(0)
+                self.write_file(path, data_file, zstd_dictionary=zstd_dictionary)
+        else:
+            self.write_file(
+                path, dumps_json(data, encoder), zstd_dictionary=zstd_dictionary
+            )
         return path
 
+    @classmethod
+    def get_zstd_dictionary(cls, endpoint: MinioEndpoints) -> str | None:
+        """
+        The trained zstd dictionary (see `shared.storage.zstd_dictionaries`) new
+        objects of `endpoint` are compressed with, if any is configured.
+        """
+        return get_config(
+            "services", "minio", "zstd_dictionaries", endpoint.name, default=None
+        )
+
+    def train_zstd_dictionary(
+        self, endpoint: MinioEndpoints, version: int, sample_paths: list[str]
+    ) -> str:
+        """
+        Trains a new version of the zstd dictionary for objects of `endpoint` from
+        the objects at `sample_paths`, and returns its name. The dictionary is only
+        used once its name is set in `services.minio.zstd_dictionaries.<endpoint>`.
+        """
+        return train_dictionary(
+            self.storage, self.root, endpoint.name, version, sample_paths
+        )
+
     @sentry_sdk.trace
     def write_file(
-        self, path, data, reduced_redundancy=False, is_already_gzipped=False
+        self,
+        path,
+        data,
+        reduced_redundancy=False,
+        is_already_gzipped=False,
+        *,
+        zstd_dictionary: str | None = None,
     ):
         """
         Writes a generic file to the archive -- it's typically recommended to
         not use this in lieu of the convenience methods write_raw_upload and
         write_chunks
         """
+        kwargs = {}
+        if zstd_dictionary:
+            kwargs["zstd_dictionary"] = zstd_dictionary
         self.storage.write_file(
             self.root,
             path,
             data,
             reduced_redundancy=reduced_redundancy,
             is_already_gzipped=is_already_gzipped,
+            **kwargs,
         )
 
     @sentry_sdk.trace
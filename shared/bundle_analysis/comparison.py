@@ -1,13 +1,15 @@
+import heapq
 import logging
 from collections import defaultdict
 from dataclasses import dataclass
 from enum import Enum
 from functools import cached_property
-from typing import Dict, Iterator, List, MutableSet, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import sentry_sdk
+from sqlalchemy import text
 
-from shared.bundle_analysis.models import MetadataKey
+from shared.bundle_analysis.models import MetadataKey, get_db_session
 from shared.bundle_analysis.report import (
     AssetReport,
     BundleAnalysisReport,
@@ -85,6 +87,9 @@ class AssetChange(BaseChange):
 
 AssetMatch = Tuple[Optional[AssetReport], Optional[AssetReport]]
 
+# Name under which the base report database is attached to the head report connection
+BASE_DATABASE_ALIAS = "base"
+
 
 class AssetComparison:
     def __init__(
@@ -149,36 +154,41 @@ class BundleComparison:
     ):
         self.base_bundle_report = base_bundle_report
         self.head_bundle_report = head_bundle_report
+        self._asset_comparisons: Optional[List[AssetComparison]] = None
 
     def total_size_delta(self) -> int:
         base_size = self.base_bundle_report.total_size()
         head_size = self.head_bundle_report.total_size()
         return head_size - base_size
 
-    @sentry_sdk.trace
     def asset_comparisons(self) -> List[AssetComparison]:
+        if self._asset_comparisons is None:
+            self._asset_comparisons = self._compute_asset_comparisons()
+        return self._asset_comparisons
+
+    @sentry_sdk.trace
+    def _compute_asset_comparisons(self) -> List[AssetComparison]:
         # this groups assets by name
         # there can be multiple assets with the same name and we
         # need to try and match them across base and head reports
-        base_asset_reports = defaultdict(set)
+        base_asset_reports = defaultdict(list)
         for asset_report in self.base_bundle_report.asset_reports():
-            base_asset_reports[asset_report.name].add(asset_report)
-        head_asset_reports = defaultdict(set)
+            base_asset_reports[asset_report.name].append(asset_report)
+        head_asset_reports = defaultdict(list)
         for asset_report in self.head_bundle_report.asset_reports():
-            head_asset_reports[asset_report.name].add(asset_report)
+            head_asset_reports[asset_report.name].append(asset_report)
 
         # match bundles across base and head
         # (A, B) means that bundle A transformed to bundle B
         # (X, None) means that bundle X was deleted
         # (None, X) means that bundle X was added
         matches: List[AssetMatch] = []
-        asset_names = []
         for asset_name, asset_reports in head_asset_reports.items():
-            asset_names.append(asset_name)
-            matches += self._match_assets(base_asset_reports[asset_name], asset_reports)
-        for asset_name, asset_reports in base_asset_reports.items():
-            if asset_name not in asset_names:
-                matches += self._match_assets(asset_reports, [])
+            matches += self._match_assets(
+                base_asset_reports.pop(asset_name, []), asset_reports
+            )
+        for asset_reports in base_asset_reports.values():
+            matches += self._match_assets(asset_reports, [])
 
         return [
             AssetComparison(base_asset_report, head_asset_report)
@@ -187,8 +197,8 @@ class BundleComparison:
 
     def _match_assets(
         self,
-        base_asset_reports: MutableSet[AssetReport],
-        head_asset_reports: MutableSet[AssetReport],
+        base_asset_reports: Sequence[AssetReport],
+        head_asset_reports: Sequence[AssetReport],
     ) -> List[AssetMatch]:
         """
         The given base assets and head assets all have the same name.
@@ -201,47 +211,96 @@ class BundleComparison:
             - same modules by name
         2. Pick asset with the closest size
         """
-        n = max([len(base_asset_reports), len(head_asset_reports)])
         matches: List[AssetMatch] = []
 
-        while len(matches) < n:
-            if len(head_asset_reports) > 0:
-                # we have an unmatched head asset
-                head_asset_report = head_asset_reports.pop()
+        # 1. Pick asset with the same UUID (hash join on the UUID)
+        base_asset_reports_by_uuid = defaultdict(list)
+        for base_asset_report in base_asset_reports:
+            base_asset_reports_by_uuid[base_asset_report.uuid].append(base_asset_report)
+        unmatched_head_asset_reports = []
+        for head_asset_report in head_asset_reports:
+            same_uuid_asset_reports = base_asset_reports_by_uuid.get(
+                head_asset_report.uuid
+            )
+            if same_uuid_asset_reports:
+                matches.append((same_uuid_asset_reports.pop(), head_asset_report))
+            else:
+                unmatched_head_asset_reports.append(head_asset_report)
+        unmatched_base_asset_reports = [
+            base_asset_report
+            for same_uuid_asset_reports in base_asset_reports_by_uuid.values()
+            for base_asset_report in same_uuid_asset_reports
+        ]
+
+        # 2. Pick asset with the closest size
+        matches += self._match_assets_by_size(
+            unmatched_base_asset_reports, unmatched_head_asset_reports
+        )
+        return matches
 
-                if len(base_asset_reports) == 0:
-                    # no more base assets to match against
-                    matches.append((None, head_asset_report))
-                else:
-                    # 1. Pick asset with the same UUID
-                    base_asset_report_uuids = {
-                        base_bundle.uuid: base_bundle
-                        for base_bundle in base_asset_reports
-                    }
-                    if head_asset_report.uuid in base_asset_report_uuids:
-                        base_asset_report = base_asset_report_uuids[
-                            head_asset_report.uuid
-                        ]
-
-                    # 2. Pick asset with the closest size
-                    else:
-                        size_deltas = {
-                            abs(head_asset_report.size - base_bundle.size): base_bundle
-                            for base_bundle in base_asset_reports
-                        }
-                        min_delta = min(size_deltas.keys())
-                        base_asset_report = size_deltas[min_delta]
-
-                    matches.append((base_asset_report, head_asset_report))
-                    base_asset_reports.remove(base_asset_report)
-            elif len(base_asset_reports) > 0:
-                # we have unmatched base assets and no more head assets
-                base_asset_report = base_asset_reports.pop()
-                matches.append((base_asset_report, None))
+    def _match_assets_by_size(
+        self,
+        base_asset_reports: Sequence[AssetReport],
+        head_asset_reports: Sequence[AssetReport],
+    ) -> List[AssetMatch]:
+        """
+        Matches base and head assets by closest size, leftovers are considered
+        removed (base) or added (head).
+
+        All the assets are laid out in a single list sorted by size, where the closest
+        base/head candidates are always neighbours. We repeatedly match the neighbouring
+        base/head pair with the smallest size difference and unlink both from the list,
+        which makes their own neighbours adjacent. This is O(n log n) in the number of
+        same-named assets, instead of comparing every head asset against every base asset.
+        """
+        if not base_asset_reports or not head_asset_reports:
+            return [(base, None) for base in base_asset_reports] + [
+                (None, head) for head in head_asset_reports
+            ]
+
+        items: List[Tuple[int, bool, AssetReport]] = sorted(
+            [(asset.size, False, asset) for asset in base_asset_reports]
+            + [(asset.size, True, asset) for asset in head_asset_reports],
+            key=lambda item: (item[0], item[1]),
+        )
+        n = len(items)
+        prev_index = list(range(-1, n - 1))
+        next_index = list(range(1, n + 1))
+        matched = [False] * n
+
+        # (size difference, left index, right index) of neighbouring base/head pairs
+        candidates = [
+            (items[i + 1][0] - items[i][0], i, i + 1)
+            for i in range(n - 1)
+            if items[i][1] != items[i + 1][1]
+        ]
+        heapq.heapify(candidates)
+
+        matches: List[AssetMatch] = []
+        while candidates:
+            _, left, right = heapq.heappop(candidates)
+            if matched[left] or matched[right] or next_index[left] != right:
+                continue
+            matched[left] = matched[right] = True
+            if items[left][1]:
+                matches.append((items[right][2], items[left][2]))
             else:
-                # shouldn't ever get here
-                raise Exception("incorrect asset matching logic")  # pragma: no cover
+                matches.append((items[left][2], items[right][2]))
+
+            # unlink the matched pair, its neighbours are now adjacent
+            before, after = prev_index[left], next_index[right]
+            if before >= 0:
+                next_index[before] = after
+            if after < n:
+                prev_index[after] = before
+            if before >= 0 and after < n and items[before][1] != items[after][1]:
+                heapq.heappush(
+                    candidates, (items[after][0] - items[before][0], before, after)
+                )
 
+        for index, (_, is_head, asset) in enumerate(items):
+            if not matched[index]:
+                matches.append((None, asset) if is_head else (asset, None))
         return matches
 
 
@@ -328,6 +387,8 @@ class BundleAnalysisComparison:
         self.loader = loader
         self.base_report_key = base_report_key
         self.head_report_key = head_report_key
+        self._bundle_comparisons: Dict[str, BundleComparison] = {}
+        self._bundle_routes_changes: Dict[str, List[RouteChange]] = {}
 
         compare_sha_external_id = self._check_compare_sha(repository)
         if compare_sha_external_id:
@@ -371,55 +432,119 @@ class BundleAnalysisComparison:
             raise MissingHeadReportError()
         return head_report
 
-    @sentry_sdk.trace
-    def bundle_changes(self) -> Iterator[BundleChange]:
+    @cached_property
+    def _bundle_sizes(self) -> List[Tuple[str, Optional[int], Optional[int]]]:
         """
-        Returns a list of changes across the bundles in the base and head reports.
+        Total size of every bundle in the head and base reports as
+        `(bundle name, head size, base size)`, where a `None` size means the bundle
+        does not exist in that report. Bundles are ordered like the head report's
+        bundles, followed by the bundles that only exist in the base report.
+
+        This is computed with a single query by attaching the base report database
+        to the head report connection and reading the precomputed bundle summaries.
         """
-        base_bundle_reports = {
-            bundle_report.name: bundle_report
-            for bundle_report in self.base_report.bundle_reports()
-        }
-        head_bundle_reports = {
-            bundle_report.name: bundle_report
-            for bundle_report in self.head_report.bundle_reports()
-        }
+        base_db_path, head_db_path = self.base_report.db_path, self.head_report.db_path
+        with get_db_session(head_db_path) as session:
+            session.execute(
+                text(f"ATTACH DATABASE :path AS {BASE_DATABASE_ALIAS}"),
+                {"path": base_db_path},
+            )
+            try:
+                rows = session.execute(
+                    text(
+                        f"""
+                        WITH sizes AS (
+                            SELECT
+                                bundles.id AS id,
+                                bundles.name AS name,
+                                1 AS is_head,
+                                COALESCE(SUM(bundle_summaries.size), 0) AS size
+                            FROM main.bundles
+                            LEFT JOIN main.bundle_summaries
+                                ON bundle_summaries.bundle_id = bundles.id
+                                AND bundle_summaries.chunk_entry IS NULL
+                                AND bundle_summaries.chunk_initial IS NULL
+                            GROUP BY bundles.id, bundles.name
+                            UNION ALL
+                            SELECT
+                                bundles.id AS id,
+                                bundles.name AS name,
+                                0 AS is_head,
+                                COALESCE(SUM(bundle_summaries.size), 0) AS size
+                            FROM {BASE_DATABASE_ALIAS}.bundles
+                            LEFT JOIN {BASE_DATABASE_ALIAS}.bundle_summaries
+                                ON bundle_summaries.bundle_id = bundles.id
+                                AND bundle_summaries.chunk_entry IS NULL
+                                AND bundle_summaries.chunk_initial IS NULL
+                            GROUP BY bundles.id, bundles.name
+                        )
+                        SELECT
+                            name,
+                            MAX(CASE WHEN is_head THEN size END) AS head_size,
+                            MAX(CASE WHEN NOT is_head THEN size END) AS base_size
+                        FROM sizes
+                        GROUP BY name
+                        ORDER BY
+                            MAX(CASE WHEN is_head THEN id END) IS NULL,
+                            MAX(CASE WHEN is_head THEN id END),
+                            MAX(CASE WHEN NOT is_head THEN id END)
+                        """
+                    )
+                ).all()
+            finally:
+                session.execute(text(f"DETACH DATABASE {BASE_DATABASE_ALIAS}"))
+        return [(name, head_size, base_size) for name, head_size, base_size in rows]
 
-        for bundle_name, head_bundle_report in head_bundle_reports.items():
-            if bundle_name not in base_bundle_reports:
-                yield BundleChange(
-                    bundle_name=bundle_name,
-                    change_type=BundleChange.ChangeType.ADDED,
-                    size_delta=head_bundle_report.total_size(),
-                    percentage_delta=100,
-                )
-            else:
-                base_bundle_report = base_bundle_reports[bundle_name]
-                del base_bundle_reports[bundle_name]
-                size_delta = (
-                    head_bundle_report.total_size() - base_bundle_report.total_size()
+    @cached_property
+    def _bundle_changes(self) -> List[BundleChange]:
+        bundle_changes = []
+        for bundle_name, head_size, base_size in self._bundle_sizes:
+            if base_size is None:
+                bundle_changes.append(
+                    BundleChange(
+                        bundle_name=bundle_name,
+                        change_type=BundleChange.ChangeType.ADDED,
+                        size_delta=head_size,
+                        percentage_delta=100,
+                    )
                 )
-                percentage_delta = round(
-                    (size_delta / base_bundle_report.total_size()) * 100, 2
+            elif head_size is None:
+                bundle_changes.append(
+                    BundleChange(
+                        bundle_name=bundle_name,
+                        change_type=BundleChange.ChangeType.REMOVED,
+                        size_delta=-base_size,
+                        percentage_delta=-100.0,
+                    )
                 )
-                yield BundleChange(
-                    bundle_name=bundle_name,
-                    change_type=BundleChange.ChangeType.CHANGED,
-                    size_delta=size_delta,
-                    percentage_delta=percentage_delta,
+            else:
+                size_delta = head_size - base_size
+                if size_delta == 0:
+                    percentage_delta = 0
+                elif base_size == 0:
+                    percentage_delta = 100.0
+                else:
+                    percentage_delta = round((size_delta / base_size) * 100, 2)
+                bundle_changes.append(
+                    BundleChange(
+                        bundle_name=bundle_name,
+                        change_type=BundleChange.ChangeType.CHANGED,
+                        size_delta=size_delta,
+                        percentage_delta=percentage_delta,
+                    )
                 )
+        return bundle_changes
 
-        for bundle_name, base_bundle_report in base_bundle_reports.items():
-            yield BundleChange(
-                bundle_name=bundle_name,
-                change_type=BundleChange.ChangeType.REMOVED,
-                size_delta=-base_bundle_report.total_size(),
-                percentage_delta=-100.0,
-            )
+    @sentry_sdk.trace
+    def bundle_changes(self) -> Iterator[BundleChange]:
+        """
+        Returns a list of changes across the bundles in the base and head reports.
+        """
+        return iter(self._bundle_changes)
 
     @property
     def total_size_delta(self) -> int:
-        return sum(bundle_change.size_delta for bundle_change in self.bundle_changes())
+        return sum(bundle_change.size_delta for bundle_change in self._bundle_changes)
 
     @property
     def percentage_delta(self) -> float:
@@ -430,7 +555,7 @@ class BundleAnalysisComparison:
         Percentage is returned as a float 0-100, rounded to 2 decimal places
         """
         base_size = sum(
-            report.total_size() for report in self.base_report.bundle_reports()
+            base_size for _, _, base_size in self._bundle_sizes if base_size is not None
         )
         if base_size == 0:
             return 100.0
@@ -442,11 +567,15 @@ class BundleAnalysisComparison:
         More detailed comparison (about asset changes) for a particular bundle that
         exists both in the base and head reports.
         """
-        base_bundle_report = self.base_report.bundle_report(bundle_name)
-        head_bundle_report = self.head_report.bundle_report(bundle_name)
-        if base_bundle_report is None or head_bundle_report is None:
-            raise MissingBundleError()
-        return BundleComparison(base_bundle_report, head_bundle_report)
+        if bundle_name not in self._bundle_comparisons:
+            base_bundle_report = self.base_report.bundle_report(bundle_name)
+            head_bundle_report = self.head_report.bundle_report(bundle_name)
+            if base_bundle_report is None or head_bundle_report is None:
+                raise MissingBundleError()
+            self._bundle_comparisons[bundle_name] = BundleComparison(
+                base_bundle_report, head_bundle_report
+            )
+        return self._bundle_comparisons[bundle_name]
 
     @sentry_sdk.trace
     def bundle_routes_changes(self) -> Dict[str, List[RouteChange]]:
@@ -485,14 +614,16 @@ class BundleAnalysisComparison:
         """
         Comparison for all the routes available to a pair of bundles.
         """
-        base_bundle_report = self.base_report.bundle_report(bundle_name)
-        head_bundle_report = self.head_report.bundle_report(bundle_name)
-        if base_bundle_report is None or head_bundle_report is None:
-            raise MissingBundleError()
+        if bundle_name not in self._bundle_routes_changes:
+            base_bundle_report = self.base_report.bundle_report(bundle_name)
+            head_bundle_report = self.head_report.bundle_report(bundle_name)
+            if base_bundle_report is None or head_bundle_report is None:
+                raise MissingBundleError()
 
-        base_route_report = base_bundle_report.full_route_report()
-        head_route_report = head_bundle_report.full_route_report()
+            base_route_report = base_bundle_report.full_route_report()
+            head_route_report = head_bundle_report.full_route_report()
 
-        return BundleRoutesComparison(
-            base_route_report, head_route_report
-        ).size_changes()
+            self._bundle_routes_changes[bundle_name] = BundleRoutesComparison(
+                base_route_report, head_route_report
+            ).size_changes()
+        return self._bundle_routes_changes[bundle_name]
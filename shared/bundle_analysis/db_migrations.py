@@ -12,6 +12,12 @@ from shared.bundle_analysis.migrations.v003_modify_gzip_size_nullable import (
 from shared.bundle_analysis.migrations.v004_add_dynamic_imports import (
     add_dynamic_imports,
 )
+from shared.bundle_analysis.migrations.v005_add_bundle_summaries import (
+    add_bundle_summaries,
+)
+from shared.bundle_analysis.migrations.v006_add_foreign_key_indexes import (
+    add_foreign_key_indexes,
+)
 
 
 class BundleAnalysisMigration:
@@ -37,6 +43,8 @@ class BundleAnalysisMigration:
             3: add_is_cached,
             4: modify_gzip_size_nullable,
             5: add_dynamic_imports,
+            6: add_bundle_summaries,
+            7: add_foreign_key_indexes,
         }
 
     def update_schema_version(self, version):
@@ -0,0 +1,63 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def add_bundle_summaries(db_session: Session):
+    """
+    Adds a table called bundle_summaries (BundleSummary model name)
+    This table holds precomputed asset size aggregates per bundle so that
+    total size queries don't need to join and sum over all the assets.
+
+    Existing bundles are backfilled from their current assets and chunks.
+    """
+    stmts = [
+        """
+        CREATE TABLE bundle_summaries (
+            bundle_id integer not null,
+            asset_type text not null,
+            chunk_entry boolean,
+            chunk_initial boolean,
+            size integer not null,
+            gzip_size integer not null,
+            foreign key (bundle_id) references bundles (id)
+        );
+        """,
+        """
+        CREATE INDEX bundle_summaries_bundle_id_index ON bundle_summaries (bundle_id);
+        """,
+        """
+        INSERT INTO bundle_summaries
+            (bundle_id, asset_type, chunk_entry, chunk_initial, size, gzip_size)
+        SELECT
+            sessions.bundle_id,
+            assets.asset_type,
+            NULL,
+            NULL,
+            SUM(assets.size),
+            SUM(COALESCE(assets.gzip_size, assets.size))
+        FROM assets
+        JOIN sessions ON sessions.id = assets.session_id
+        WHERE sessions.bundle_id IS NOT NULL
+        GROUP BY sessions.bundle_id, assets.asset_type;
+        """,
+        """
+        INSERT INTO bundle_summaries
+            (bundle_id, asset_type, chunk_entry, chunk_initial, size, gzip_size)
+        SELECT
+            sessions.bundle_id,
+            assets.asset_type,
+            chunks.entry,
+            chunks.initial,
+            SUM(assets.size),
+            SUM(COALESCE(assets.gzip_size, assets.size))
+        FROM assets
+        JOIN sessions ON sessions.id = assets.session_id
+        JOIN assets_chunks ON assets_chunks.asset_id = assets.id
+        JOIN chunks ON chunks.id = assets_chunks.chunk_id
+        WHERE sessions.bundle_id IS NOT NULL
+        GROUP BY sessions.bundle_id, assets.asset_type, chunks.entry, chunks.initial;
+        """,
+    ]
+
+    for stmt in stmts:
+        db_session.execute(text(stmt))
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def add_foreign_key_indexes(db_session: Session):
+    """
+    Adds indexes on the foreign keys that weren't covered by a primary key
+    (the second column of the join tables and the session of chunks and modules)
+    so that deleting a session's rows doesn't need to scan the whole tables.
+
+    No data needs to be migrated.
+    """
+    stmts = [
+        """
+        CREATE INDEX chunks_session_id_index ON chunks (session_id);
+        """,
+        """
+        CREATE INDEX modules_session_id_index ON modules (session_id);
+        """,
+        """
+        CREATE INDEX assets_chunks_chunk_id_index ON assets_chunks (chunk_id);
+        """,
+        """
+        CREATE INDEX chunks_modules_module_id_index ON chunks_modules (module_id);
+        """,
+        """
+        CREATE INDEX dynamic_imports_asset_id_index ON dynamic_imports (asset_id);
+        """,
+    ]
+
+    for stmt in stmts:
+        db_session.execute(text(stmt))
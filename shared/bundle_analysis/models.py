@@ -61,6 +61,8 @@ create table chunks (
     foreign key (session_id) references sessions (id)
 );
 
+create index chunks_session_id_index on chunks (session_id);
+
 create table assets_chunks (
     asset_id integer not null,
     chunk_id integer not null,
@@ -69,6 +71,8 @@ create table assets_chunks (
     foreign key (chunk_id) references chunks (id)
 );
 
+create index assets_chunks_chunk_id_index on assets_chunks (chunk_id);
+
 create table modules (
     id integer primary key,
     session_id integer not null,
@@ -77,6 +81,8 @@ create table modules (
     foreign key (session_id) references sessions (id)
 );
 
+create index modules_session_id_index on modules (session_id);
+
 create table chunks_modules (
     chunk_id integer not null,
     module_id integer not null,
@@ -85,6 +91,8 @@ create table chunks_modules (
     foreign key (module_id) references modules (id)
 );
 
+create index chunks_modules_module_id_index on chunks_modules (module_id);
+
 create table dynamic_imports (
     chunk_id integer not null,
     asset_id integer not null,
@@ -92,9 +100,23 @@ create table dynamic_imports (
     foreign key (chunk_id) references chunks (id),
     foreign key (asset_id) references assets (id)
 );
+
+create index dynamic_imports_asset_id_index on dynamic_imports (asset_id);
+
+create table bundle_summaries (
+    bundle_id integer not null,
+    asset_type text not null,
+    chunk_entry boolean, --- null means the row aggregates over assets regardless of chunks
+    chunk_initial boolean, --- null means the row aggregates over assets regardless of chunks
+    size integer not null,
+    gzip_size integer not null,
+    foreign key (bundle_id) references bundles (id)
+);
+
+create index bundle_summaries_bundle_id_index on bundle_summaries (bundle_id);
 """
 
-SCHEMA_VERSION = 5
+SCHEMA_VERSION = 7
 
 Base = declarative_base()
 
@@ -306,6 +328,25 @@ class DynamicImport(Base):
     )
 
 
+class BundleSummary(Base):
+    """
+    Precomputed asset size aggregates for a bundle, materialized at ingest time so that
+    size queries don't need to join and sum over every asset of the bundle.
+    There is one row per asset type with null `chunk_entry`/`chunk_initial` that sums
+    over the assets themselves, and one row per (asset type, entry, initial) combination
+    that sums over the asset/chunk pairs, mirroring the join done when filtering by chunk.
+    """
+
+    __tablename__ = "bundle_summaries"
+
+    bundle_id = Column(types.Integer, ForeignKey("bundles.id"), primary_key=True)
+    asset_type = Column(SQLAlchemyEnum(AssetType), primary_key=True)
+    chunk_entry = Column(types.Boolean, primary_key=True, nullable=True)
+    chunk_initial = Column(types.Boolean, primary_key=True, nullable=True)
+    size = Column(types.Integer, nullable=False)
+    gzip_size = Column(types.Integer, nullable=False)
+
+
 class MetadataKey(Enum):
     SCHEMA_VERSION = "schema_version"
     COMPARE_SHA = "compare_sha"
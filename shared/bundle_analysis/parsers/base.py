@@ -1,6 +1,7 @@
 import abc
 from typing import Tuple
 
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 
@@ -10,7 +11,46 @@ class ParserInterface(metaclass=abc.ABCMeta):
         return hasattr(subclass, "parse") and callable(subclass.parse)
 
 
+# Set-based deletion of a session and everything that belongs to it, the join tables
+# are cleaned up first as SQLite doesn't enforce (nor cascade) their foreign keys
+DELETE_SESSION_STATEMENTS = [
+    """
+    DELETE FROM dynamic_imports
+    WHERE
+        chunk_id IN (SELECT id FROM chunks WHERE session_id = :session_id)
+        OR asset_id IN (SELECT id FROM assets WHERE session_id = :session_id)
+    """,
+    """
+    DELETE FROM assets_chunks
+    WHERE
+        asset_id IN (SELECT id FROM assets WHERE session_id = :session_id)
+        OR chunk_id IN (SELECT id FROM chunks WHERE session_id = :session_id)
+    """,
+    """
+    DELETE FROM chunks_modules
+    WHERE
+        chunk_id IN (SELECT id FROM chunks WHERE session_id = :session_id)
+        OR module_id IN (SELECT id FROM modules WHERE session_id = :session_id)
+    """,
+    "DELETE FROM assets WHERE session_id = :session_id",
+    "DELETE FROM chunks WHERE session_id = :session_id",
+    "DELETE FROM modules WHERE session_id = :session_id",
+    "DELETE FROM sessions WHERE id = :session_id",
+]
+
+
+def delete_session(db_session: Session, session_id: int) -> None:
+    """
+    Deletes the given session along with its assets, chunks, modules and
+    all the join table rows referencing them.
+    """
+    for stmt in DELETE_SESSION_STATEMENTS:
+        db_session.execute(text(stmt), {"session_id": session_id})
+
+
 class ParserTrait:
+    db_session: Session
+
     @abc.abstractmethod
     def __init__(self, db_session: Session):
         pass
@@ -18,3 +58,72 @@ class ParserTrait:
     @abc.abstractmethod
     def parse(self, path: str) -> Tuple[int, str]:
         pass
+
+    def delete_previous_session(self, session_id: int, bundle_id: int) -> None:
+        """
+        Deletes the session previously ingested for the same bundle (if any)
+        when a bundle is re-uploaded, `session_id` being the new session.
+        """
+        old_session_ids = [
+            old_session_id
+            for (old_session_id,) in self.db_session.execute(
+                text(
+                    "SELECT id FROM sessions WHERE bundle_id = :bundle_id AND id != :session_id"
+                ),
+                {"bundle_id": bundle_id, "session_id": session_id},
+            )
+        ]
+        for old_session_id in old_session_ids:
+            delete_session(self.db_session, old_session_id)
+
+    def materialize_bundle_summary(self, bundle_id: int) -> None:
+        """
+        Recomputes the precomputed size aggregates (`BundleSummary`) of the given bundle.
+        This needs to run once all the assets, chunks and their associations are written.
+        """
+        params = {"bundle_id": bundle_id}
+        self.db_session.execute(
+            text("DELETE FROM bundle_summaries WHERE bundle_id = :bundle_id"), params
+        )
+        self.db_session.execute(
+            text(
+                """
+                INSERT INTO bundle_summaries
+                    (bundle_id, asset_type, chunk_entry, chunk_initial, size, gzip_size)
+                SELECT
+                    sessions.bundle_id,
+                    assets.asset_type,
+                    NULL,
+                    NULL,
+                    SUM(assets.size),
+                    SUM(COALESCE(assets.gzip_size, assets.size))
+                FROM assets
+                JOIN sessions ON sessions.id = assets.session_id
+                WHERE sessions.bundle_id = :bundle_id
+                GROUP BY sessions.bundle_id, assets.asset_type
+                """
+            ),
+            params,
+        )
+        self.db_session.execute(
+            text(
+                """
+                INSERT INTO bundle_summaries
+                    (bundle_id, asset_type, chunk_entry, chunk_initial, size, gzip_size)
+                SELECT
+                    sessions.bundle_id,
+                    assets.asset_type,
+                    chunks.entry,
+                    chunks.initial,
+                    SUM(assets.size),
+                    SUM(COALESCE(assets.gzip_size, assets.size))
+                FROM assets
+                JOIN sessions ON sessions.id = assets.session_id
+                JOIN assets_chunks ON assets_chunks.asset_id = assets.id
+                JOIN chunks ON chunks.id = assets_chunks.chunk_id
+                WHERE sessions.bundle_id = :bundle_id
+                GROUP BY sessions.bundle_id, assets.asset_type, chunks.entry, chunks.initial
+                """
+            ),
+            params,
+        )
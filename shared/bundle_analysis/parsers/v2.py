@@ -114,24 +114,11 @@ class ParserV2(ParserTrait):
                     self._parse_event(event)
 
                 # Delete old session/asset/chunk/module with the same bundle name if applicable
-                old_session = (
-                    self.db_session.query(Session)
-                    .filter(
-                        Session.bundle == self.session.bundle,
-                        Session.id != self.session.id,
-                    )
-                    .one_or_none()
-                )
-                if old_session:
-                    for model in [Asset, Chunk, Module]:
-                        to_be_deleted = self.db_session.query(model).filter(
-                            model.session == old_session
-                        )
-                        for item in to_be_deleted:
-                            self.db_session.delete(item)
-                            self.db_session.flush()
-                    self.db_session.delete(old_session)
+                if self.session.bundle is not None:
                     self.db_session.flush()
+                    self.delete_previous_session(
+                        self.session.id, self.session.bundle.id
+                    )
 
                 if self.asset_list:
                     insert_asset = Asset.__table__.insert().values(self.asset_list)
@@ -156,6 +143,9 @@ class ParserV2(ParserTrait):
                 self._create_associations()
 
                 assert self.session.bundle is not None
+                self.db_session.flush()
+                self.materialize_bundle_summary(self.session.bundle.id)
+
                 return self.session.id, self.session.bundle.name
         except Exception as e:
             # Inject the plugin name to the Exception object so we have visibilitity on which plugin
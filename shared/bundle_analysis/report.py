@@ -1,10 +1,12 @@
+import hashlib
 import json
 import logging
 import os
 import sqlite3
 import tempfile
 from collections import defaultdict, deque
-from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import sentry_sdk
 from sqlalchemy import asc, desc, text
@@ -13,7 +15,6 @@ from sqlalchemy.orm import Session as DbSession
 from sqlalchemy.orm import aliased
 from sqlalchemy.orm.query import Query
 from sqlalchemy.sql import func
-from sqlalchemy.sql.functions import coalesce
 
 from shared.bundle_analysis.db_migrations import BundleAnalysisMigration
 from shared.bundle_analysis.models import (
@@ -22,6 +23,7 @@ from shared.bundle_analysis.models import (
     Asset,
     AssetType,
     Bundle,
+    BundleSummary,
     Chunk,
     DynamicImport,
     Metadata,
@@ -31,10 +33,112 @@ from shared.bundle_analysis.models import (
     get_db_session,
 )
 from shared.bundle_analysis.parser import Parser
+from shared.bundle_analysis.parsers.base import delete_session
 from shared.bundle_analysis.utils import AssetRoute, AssetRoutePluginName
 
 log = logging.getLogger(__name__)
 
+# Tables (and their columns) copied from a report database created by a worker
+# process in `BundleAnalysisReport.ingest_many`
+INGESTED_REPORT_TABLES = {
+    "assets": [
+        "id",
+        "session_id",
+        "name",
+        "normalized_name",
+        "size",
+        "gzip_size",
+        "uuid",
+        "asset_type",
+    ],
+    "chunks": [
+        "id",
+        "session_id",
+        "external_id",
+        "unique_external_id",
+        "entry",
+        "initial",
+    ],
+    "modules": ["id", "session_id", "name", "size"],
+    "assets_chunks": ["asset_id", "chunk_id"],
+    "chunks_modules": ["chunk_id", "module_id"],
+    "dynamic_imports": ["chunk_id", "asset_id"],
+    "bundle_summaries": [
+        "bundle_id",
+        "asset_type",
+        "chunk_entry",
+        "chunk_initial",
+        "size",
+        "gzip_size",
+    ],
+}
+
+# Columns of the copied tables referencing the ID of another copied table
+INGESTED_REPORT_REFERENCES = {
+    "asset_id": "assets",
+    "chunk_id": "chunks",
+    "module_id": "modules",
+}
+
+
+def filter_modules_by_changed_files(
+    modules: Iterable[Module], pr_changed_files: List[str]
+) -> List[Module]:
+    """
+    Filters modules where the module name has to be part of the PR's changed file list.
+    However we can't simply do a simple equality match because the module names we store is relative
+    to the root of the app while the PR's file path is relative to the root of the repo. So we will
+    need to check that any of the PR's file lists ends with any of the modules for the given asset.
+    For example,
+        PR changed files: ["abc/def.ts", "ghi/jkl.ts"],
+        modules: ["def.ts", "mno.ts"]
+        -> ["def.ts"]
+
+    Instead of checking every changed file against every module, this builds an index of
+    the normalized module names once and looks up each suffix of a changed file in it, only
+    trying suffix lengths that some module name actually has.
+    Returns the distinct matching modules in their original order.
+    """
+    modules = list(modules)
+    normalized_changed_files = [
+        os.path.normpath(path[2:] if path.startswith("./") else path)
+        for path in pr_changed_files
+    ]
+
+    # Changed files starting with a "." are matched against the module names
+    # without their first character, so there is one index for each case
+    suffix_indexes: Dict[bool, Tuple[Dict[str, List[Module]], List[int]]] = {}
+
+    def suffix_index(strip_first_char: bool):
+        if strip_first_char not in suffix_indexes:
+            index = defaultdict(list)
+            for module in modules:
+                normalized_module = os.path.normpath(
+                    module.name[1:] if strip_first_char else module.name
+                )
+                index[normalized_module].append(module)
+            suffix_indexes[strip_first_char] = (
+                index,
+                sorted({len(name) for name in index}),
+            )
+        return suffix_indexes[strip_first_char]
+
+    matched_module_ids = set()
+    for file in normalized_changed_files:
+        index, lengths = suffix_index(file.startswith("."))
+        for length in lengths:
+            if length > len(file):
+                break
+            for module in index.get(file[len(file) - length :], []):
+                matched_module_ids.add(module.id)
+
+    filtered_modules = []
+    for module in modules:
+        if module.id in matched_module_ids:
+            filtered_modules.append(module)
+            matched_module_ids.remove(module.id)
+    return filtered_modules
+
 
 class ModuleReport:
     """
@@ -106,44 +210,30 @@ class AssetReport:
             if pr_changed_files is None:
                 return [ModuleReport(self.db_path, module) for module in query]
 
-            """
-            Apply filter on modules where the module name has to be part of the PR's changed file list.
-            However we can't simply do a simple equality match because the module names we store is relative
-            to the root of the app while the PR's file path is relative to the root of the repo. So we will
-            need to check that any of the PR's file lists ends with any of the modules for the given asset.
-            For example,
-                PR changed files: ["abc/def.ts", "ghi/jkl.ts"],
-                modules: ["def.ts", "mno.ts"]
-                -> ["def.ts"]
-            """
-            normalized_changed_files = [
-                os.path.normpath(path[2:] if path.startswith("./") else path)
-                for path in pr_changed_files
+            return [
+                ModuleReport(self.db_path, module)
+                for module in filter_modules_by_changed_files(
+                    query.all(), pr_changed_files
+                )
             ]
-            filtered_modules = set()
-            for file in normalized_changed_files:
-                for module in query:
-                    normalized_module = os.path.normpath(
-                        module.name[1:] if file.startswith(".") else module.name
-                    )
-                    if file.endswith(normalized_module):
-                        filtered_modules.add(module)
-
-            return [ModuleReport(self.db_path, module) for module in filtered_modules]
 
-    def routes(self) -> Optional[List[str]]:
+    def routes(
+        self, modules: Optional[List[ModuleReport]] = None
+    ) -> Optional[List[str]]:
+        """
+        Returns the routes of the asset, computed from the names of its modules.
+        The modules can be passed in when they were already fetched for the asset.
+        """
         plugin_name = self.bundle_info.get("plugin_name")
         if plugin_name not in [item.value for item in AssetRoutePluginName]:
             return None
 
-        asset_route_compute = AssetRoute(AssetRoutePluginName(plugin_name))
-        module_names, routes = [m.name for m in self.modules()], set()
-        for module_name in module_names:
-            route = asset_route_compute.get_from_filename(module_name)
-            if route is not None:
-                routes.add(route)
+        if modules is None:
+            modules = self.modules()
 
-        return list(routes)
+        asset_route_compute = AssetRoute(AssetRoutePluginName(plugin_name))
+        routes = asset_route_compute.get_from_filenames(m.name for m in modules)
+        return list({route for route in routes.values() if route is not None})
 
     def dynamically_imported_assets(self) -> List["AssetReport"]:
         """
@@ -257,10 +347,75 @@ class BundleReport:
                 chunk_entry,
                 chunk_initial,
             ).order_by(ordering(getattr(Asset, ordering_column)))
+            bundle_info = self.info()
             return (
-                AssetReport(self.db_path, asset, self.info()) for asset in assets.all()
+                AssetReport(self.db_path, asset, bundle_info) for asset in assets.all()
+            )
+
+    def _summary_filter(
+        self,
+        query: Query,
+        asset_types: Optional[List[AssetType]] = None,
+        chunk_entry: Optional[bool] = None,
+        chunk_initial: Optional[bool] = None,
+    ) -> Query:
+        query = query.filter(BundleSummary.bundle_id == self.bundle.id)
+        if chunk_entry is None and chunk_initial is None:
+            # Rows aggregating over the assets themselves
+            query = query.filter(
+                BundleSummary.chunk_entry.is_(None),
+                BundleSummary.chunk_initial.is_(None),
+            )
+        else:
+            # Rows aggregating over asset/chunk pairs, same as joining Asset.chunks
+            query = query.filter(BundleSummary.chunk_entry.isnot(None))
+            if chunk_entry is not None:
+                query = query.filter(BundleSummary.chunk_entry == chunk_entry)
+            if chunk_initial is not None:
+                query = query.filter(BundleSummary.chunk_initial == chunk_initial)
+        if asset_types is not None:
+            query = query.filter(BundleSummary.asset_type.in_(asset_types))
+        return query
+
+    @sentry_sdk.trace
+    def asset_modules(
+        self, pr_changed_files: Optional[List[str]] = None
+    ) -> Dict[int, List[ModuleReport]]:
+        """
+        Returns the modules of every asset of the bundle keyed by asset ID, fetched with
+        a single query. When `pr_changed_files` is given only the modules matching one of the
+        changed files are kept (see `filter_modules_by_changed_files`), which is computed
+        for all the assets in a single pass.
+        """
+        with get_db_session(self.db_path) as session:
+            rows = (
+                session.query(Asset.id, Module)
+                .join(Module.chunks)
+                .join(Chunk.assets)
+                .join(Session, Session.id == Asset.session_id)
+                .filter(Session.bundle_id == self.bundle.id)
+                # a module of several chunks of the same asset is listed once
+                .distinct()
+                .all()
             )
 
+            modules = [module for _, module in rows]
+            if pr_changed_files is not None:
+                matched_module_ids = {
+                    module.id
+                    for module in filter_modules_by_changed_files(
+                        modules, pr_changed_files
+                    )
+                }
+            else:
+                matched_module_ids = {module.id for module in modules}
+
+            results = defaultdict(list)
+            for asset_id, module in rows:
+                if module.id in matched_module_ids:
+                    results[asset_id].append(ModuleReport(self.db_path, module))
+            return results
+
     def total_size(
         self,
         asset_types: Optional[List[AssetType]] = None,
@@ -268,19 +423,13 @@ class BundleReport:
         chunk_initial: Optional[bool] = None,
     ) -> int:
         with get_db_session(self.db_path) as session:
-            assets = (
-                session.query(func.sum(Asset.size).label("asset_size"))
-                .join(Asset.session)
-                .join(Session.bundle)
-                .filter(Bundle.id == self.bundle.id)
-            )
-            assets = self._asset_filter(
-                assets,
+            summaries = self._summary_filter(
+                session.query(func.sum(BundleSummary.size)),
                 asset_types,
                 chunk_entry,
                 chunk_initial,
             )
-            return assets.scalar() or 0
+            return summaries.scalar() or 0
 
     def total_gzip_size(
         self,
@@ -295,21 +444,13 @@ class BundleReport:
         for those assets that are not compressible we will use its uncompressed size.
         """
         with get_db_session(self.db_path) as session:
-            assets = (
-                session.query(
-                    func.sum(coalesce(Asset.gzip_size, Asset.size)).label("size")
-                )
-                .join(Asset.session)
-                .join(Session.bundle)
-                .filter(Bundle.id == self.bundle.id)
-            )
-            assets = self._asset_filter(
-                assets,
+            summaries = self._summary_filter(
+                session.query(func.sum(BundleSummary.gzip_size)),
                 asset_types,
                 chunk_entry,
                 chunk_initial,
             )
-            return assets.scalar() or 0
+            return summaries.scalar() or 0
 
     def info(self) -> dict:
         with get_db_session(self.db_path) as session:
@@ -331,8 +472,9 @@ class BundleReport:
         Note that this ignores dynamically imported Assets (ie only the direct asset)
         """
         route_map = defaultdict(list)
+        modules_by_asset = self.asset_modules()
         for asset_report in self.asset_reports():
-            routes = asset_report.routes()
+            routes = asset_report.routes(modules_by_asset.get(asset_report.id, []))
             if routes is not None:
                 for route in routes:
                     route_map[route].append(asset_report)
@@ -374,6 +516,11 @@ class BundleAnalysisReport:
 
     db_path: str
 
+    # storage path and content hash of the database as it was loaded from storage
+    # (set by `BundleAnalysisReportLoader`), used to skip saving unchanged reports
+    loaded_storage_path: Optional[str] = None
+    loaded_content_hash: Optional[str] = None
+
     def __init__(self, db_path: str | None = None):
         if db_path is None:
             _, self.db_path = tempfile.mkstemp(prefix="bundle_analysis_")
@@ -418,6 +565,31 @@ class BundleAnalysisReport:
     def cleanup(self):
         os.unlink(self.db_path)
 
+    def content_hash(self) -> str:
+        """
+        Returns a hash of the database file contents.
+        """
+        with open(self.db_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    @sentry_sdk.trace
+    def vacuumed_copy(self) -> str:
+        """
+        Writes a compacted copy of the database to a new temporary file and returns its path.
+        The copy doesn't carry over the free pages left behind by deleted rows (ie. after
+        bundle re-uploads) and has its pages defragmented, so it is smaller and compresses better.
+        """
+        fd, snapshot_path = tempfile.mkstemp(prefix="bundle_analysis_snapshot_")
+        os.close(fd)
+        # VACUUM INTO requires the target file to not exist yet
+        os.unlink(snapshot_path)
+        con = sqlite3.connect(self.db_path)
+        try:
+            con.execute("VACUUM INTO ?", (snapshot_path,))
+        finally:
+            con.close()
+        return snapshot_path
+
     @sentry_sdk.trace
     def ingest(self, path: str, compare_sha: Optional[str] = None) -> Tuple[int, str]:
         """
@@ -425,30 +597,7 @@ class BundleAnalysisReport:
         Returns session ID of ingested data.
         """
         with get_db_session(self.db_path) as session:
-            # Normally Assets/Chunks/Modules are cascade deleted and the many-to-many table entries
-            # would be deleted as well as they are foreign keys. However some rare cases occurs
-            # where the chunks_modules and assets_chunks table IDs doesn't exist in its
-            # associated Assets/Chunks/Modules table even though they are foreign keys.
-            # Fix: before each ingestion we make sure these rows are deleted.
-            for params in [
-                ["chunks_modules", "chunk_id", "chunks", "module_id", "modules"],
-                ["assets_chunks", "asset_id", "assets", "chunk_id", "chunks"],
-            ]:
-                sql = text(
-                    f"""
-                    DELETE FROM {params[0]}
-                    WHERE
-                        {params[1]} NOT IN (SELECT id FROM {params[2]})
-                        OR {params[3]} NOT IN (SELECT id FROM {params[4]})
-                """
-                )
-                result = session.execute(sql)
-                session.commit()
-                rows_deleted = result.rowcount
-                if rows_deleted > 0:
-                    log.warning(
-                        f"Integrity error detected, deleted {rows_deleted} corrupted rows from {params[0]}"
-                    )
+            self._delete_corrupted_join_rows(session)
 
             parser = Parser(path, session).get_proper_parser()
             session_id, bundle_name = parser.parse(path)
@@ -469,6 +618,178 @@ class BundleAnalysisReport:
             session.commit()
             return session_id, bundle_name
 
+    def _delete_corrupted_join_rows(self, session: DbSession) -> None:
+        # Normally Assets/Chunks/Modules are cascade deleted and the many-to-many table entries
+        # would be deleted as well as they are foreign keys. However some rare cases occurs
+        # where the chunks_modules and assets_chunks table IDs doesn't exist in its
+        # associated Assets/Chunks/Modules table even though they are foreign keys.
+        # Fix: before each ingestion we make sure these rows are deleted.
+        # These are anti-joins on the primary keys, so they only cost a scan of the join tables.
+        for params in [
+            ["chunks_modules", "chunk_id", "chunks", "module_id", "modules"],
+            ["assets_chunks", "asset_id", "assets", "chunk_id", "chunks"],
+        ]:
+            sql = text(
+                f"""
+                DELETE FROM {params[0]}
+                WHERE
+                    NOT EXISTS (SELECT 1 FROM {params[2]} WHERE {params[2]}.id = {params[0]}.{params[1]})
+                    OR NOT EXISTS (SELECT 1 FROM {params[4]} WHERE {params[4]}.id = {params[0]}.{params[3]})
+            """
+            )
+            result = session.execute(sql)
+            rows_deleted = result.rowcount
+            if rows_deleted > 0:
+                log.warning(
+                    f"Integrity error detected, deleted {rows_deleted} corrupted rows from {params[0]}"
+                )
+        session.commit()
+
+    @sentry_sdk.trace
+    def ingest_many(
+        self,
+        paths: List[str],
+        compare_sha: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Tuple[int, str]]:
+        """
+        Ingest several bundle stats JSON files, with the same outcome as calling `ingest`
+        on each of them in order.
+        The files are parsed concurrently in worker processes, each one into its own
+        temporary report database. Their rows are then copied into this report in a
+        single transaction, so either all of the files are ingested or none of them.
+        Returns the session ID and bundle name of each ingested file.
+        """
+        ingested_db_paths: List[str] = []
+        try:
+            if len(paths) <= 1 or max_workers == 1:
+                ingested_db_paths.extend(
+                    _ingest_into_new_report(path) for path in paths
+                )
+            else:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [
+                        executor.submit(_ingest_into_new_report, path) for path in paths
+                    ]
+                    # wait for all of them so every temporary report gets cleaned up
+                    errors = []
+                    for future in futures:
+                        try:
+                            ingested_db_paths.append(future.result())
+                        except Exception as e:
+                            errors.append(e)
+                    if errors:
+                        raise errors[0]
+
+            with get_db_session(self.db_path) as session:
+                self._delete_corrupted_join_rows(session)
+
+                results = [
+                    self._copy_ingested_report(session, ingested_db_path)
+                    for ingested_db_path in ingested_db_paths
+                ]
+
+                if compare_sha:
+                    sql = text(
+                        """
+                        INSERT OR REPLACE INTO metadata (key, value)
+                        VALUES (:key, :value)
+                    """
+                    )
+                    session.execute(
+                        sql, {"key": "compare_sha", "value": json.dumps(compare_sha)}
+                    )
+
+                session.commit()
+                return results
+        finally:
+            for ingested_db_path in ingested_db_paths:
+                os.unlink(ingested_db_path)
+
+    def _copy_ingested_report(
+        self, session: DbSession, ingested_db_path: str
+    ) -> Tuple[int, str]:
+        """
+        Copies the single bundle of a report created by `_ingest_into_new_report` into
+        this report, replacing the previous session of a bundle with the same name.
+        Row IDs are shifted past the current maximum ID of each table.
+        Returns the session ID and bundle name of the copied bundle.
+        """
+        con = sqlite3.connect(ingested_db_path)
+        try:
+            ((bundle_name, is_cached),) = con.execute(
+                "SELECT name, is_cached FROM bundles"
+            ).fetchall()
+            ((info,),) = con.execute("SELECT info FROM sessions").fetchall()
+
+            bundle_id = session.execute(
+                text("SELECT id FROM bundles WHERE name = :name"), {"name": bundle_name}
+            ).scalar()
+            if bundle_id is None:
+                bundle_id = session.execute(
+                    text(
+                        "INSERT INTO bundles (name, is_cached) VALUES (:name, :is_cached)"
+                    ),
+                    {"name": bundle_name, "is_cached": is_cached},
+                ).lastrowid
+            else:
+                session.execute(
+                    text("UPDATE bundles SET is_cached = :is_cached WHERE id = :id"),
+                    {"is_cached": is_cached, "id": bundle_id},
+                )
+                old_session_ids = session.execute(
+                    text("SELECT id FROM sessions WHERE bundle_id = :bundle_id"),
+                    {"bundle_id": bundle_id},
+                ).all()
+                for (old_session_id,) in old_session_ids:
+                    delete_session(session, old_session_id)
+                session.execute(
+                    BundleSummary.__table__.delete().where(
+                        BundleSummary.bundle_id == bundle_id
+                    )
+                )
+
+            session_id = session.execute(
+                text(
+                    "INSERT INTO sessions (info, bundle_id) VALUES (:info, :bundle_id)"
+                ),
+                {"info": info, "bundle_id": bundle_id},
+            ).lastrowid
+
+            id_offsets = {
+                table: session.execute(
+                    text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+                ).scalar()
+                for table in ["assets", "chunks", "modules"]
+            }
+            for table, columns in INGESTED_REPORT_TABLES.items():
+                rows = []
+                for row in con.execute(f"SELECT {', '.join(columns)} FROM {table}"):
+                    values = dict(zip(columns, row))
+                    for column in columns:
+                        if column == "id":
+                            values[column] += id_offsets[table]
+                        elif column in INGESTED_REPORT_REFERENCES:
+                            values[column] += id_offsets[
+                                INGESTED_REPORT_REFERENCES[column]
+                            ]
+                    if "session_id" in values:
+                        values["session_id"] = session_id
+                    if "bundle_id" in values:
+                        values["bundle_id"] = bundle_id
+                    rows.append(values)
+                if rows:
+                    session.execute(
+                        text(
+                            f"INSERT INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join(':' + column for column in columns)})"
+                        ),
+                        rows,
+                    )
+            return session_id, bundle_name
+        finally:
+            con.close()
+
     def _associate_bundle_report_assets_by_name(
         self, curr_bundle_report: BundleReport, prev_bundle_report: BundleReport
     ) -> Set[Tuple[str, str]]:
@@ -622,14 +943,33 @@ class BundleAnalysisReport:
                 raise Exception(
                     "Data integrity error - cannot have Bundles without Sessions"
                 )
-            for model in [Asset, Chunk, Module]:
-                stmt = model.__table__.delete().where(
-                    model.session == session_to_be_deleted
+            delete_session(session, session_to_be_deleted.id)
+
+            # Deletes the precomputed size aggregates
+            session.execute(
+                BundleSummary.__table__.delete().where(
+                    BundleSummary.bundle_id == bundle_to_be_deleted.id
                 )
-                session.execute(stmt)
+            )
 
-            # Deletes Session and Bundle
-            session.delete(session_to_be_deleted)
-            session.delete(bundle_to_be_deleted)
+            # Deletes Bundle
+            session.execute(
+                Bundle.__table__.delete().where(Bundle.id == bundle_to_be_deleted.id)
+            )
 
             session.commit()
+
+
+def _ingest_into_new_report(path: str) -> str:
+    """
+    Ingests the given bundle stats JSON file into a new temporary report.
+    Returns the path of the report database, which the caller is responsible for deleting.
+    This runs in worker processes for `BundleAnalysisReport.ingest_many`.
+    """
+    report = BundleAnalysisReport()
+    try:
+        report.ingest(path)
+    except Exception:
+        report.cleanup()
+        raise
+    return report.db_path
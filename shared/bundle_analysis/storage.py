@@ -1,4 +1,5 @@
 import logging
+import os
 import tempfile
 from enum import Enum
 from typing import Optional
@@ -8,7 +9,9 @@ import sentry_sdk
 from shared.bundle_analysis.report import BundleAnalysisReport
 from shared.config import get_config
 from shared.storage.base import BaseStorageService
+from shared.storage.disk_cache import DiskCache
 from shared.storage.exceptions import FileNotInStorageError, PutRequestRateLimitError
+from shared.storage.metrics import path_template_regex, register_object_kinds
 
 log = logging.getLogger(__name__)
 
@@ -17,6 +20,31 @@ def get_bucket_name() -> str:
     return get_config("bundle_analysis", "bucket_name", default="bundle-analysis")
 
 
+def get_local_cache() -> Optional[DiskCache]:
+    """
+    Returns the local on-disk cache of downloaded bundle report databases,
+    or `None` if it is not enabled in the config.
+    """
+    if not get_config("bundle_analysis", "local_cache", "enabled", default=False):
+        return None
+    return DiskCache(
+        directory=get_config(
+            "bundle_analysis",
+            "local_cache",
+            "directory",
+            default=os.path.join(tempfile.gettempdir(), "bundle_analysis_cache"),
+        ),
+        max_bytes=int(
+            get_config(
+                "bundle_analysis",
+                "local_cache",
+                "max_bytes",
+                default=2 * 1024 * 1024 * 1024,
+            )
+        ),
+    )
+
+
 class StoragePaths(Enum):
     bundle_report = "v1/repos/{repo_key}/{report_key}/bundle_report.sqlite"
     upload = "v1/uploads/{upload_key}.json"
@@ -25,6 +53,14 @@ class StoragePaths(Enum):
         return self.value.format(**kwargs)
 
 
+register_object_kinds(
+    {
+        f"bundle_analysis_{storage_path.name}": path_template_regex(storage_path.value)
+        for storage_path in StoragePaths
+    }
+)
+
+
 class BundleAnalysisReportLoader:
     """
     Loads and saves `BundleAnalysisReport`s into the underlying storage service.
@@ -32,10 +68,40 @@ class BundleAnalysisReportLoader:
     that identifies a repo in the storage layer.
     """
 
-    def __init__(self, storage_service: BaseStorageService, repo_key: str):
+    def __init__(
+        self,
+        storage_service: BaseStorageService,
+        repo_key: str,
+        local_cache: Optional[DiskCache] = None,
+        vacuum_on_save: Optional[bool] = None,
+    ):
         self.storage_service = storage_service
         self.repo_key = repo_key
         self.bucket_name = get_bucket_name()
+        self.local_cache = local_cache if local_cache is not None else get_local_cache()
+        if vacuum_on_save is None:
+            vacuum_on_save = get_config(
+                "bundle_analysis", "vacuum_on_save", default=False
+            )
+        self.vacuum_on_save = vacuum_on_save
+
+    def _loaded(self, db_path: str, storage_path: str) -> BundleAnalysisReport:
+        report = BundleAnalysisReport(db_path)
+        # remember what was loaded so that saving it back unchanged is a no-op
+        report.loaded_storage_path = storage_path
+        report.loaded_content_hash = report.content_hash()
+        return report
+
+    def _etag_unchanged(self, path: str, etag: str) -> bool:
+        """
+        Whether the file still has the ETag it had before it was read. If it was
+        overwritten in between, the content that was read can't be cached under
+        that ETag, since it may be the new content.
+        """
+        try:
+            return self.storage_service.get_etag(self.bucket_name, path) == etag
+        except FileNotInStorageError:
+            return False
 
     @sentry_sdk.trace
     def load(self, report_key: str) -> Optional[BundleAnalysisReport]:
@@ -48,23 +114,60 @@ class BundleAnalysisReportLoader:
         )
         _, db_path = tempfile.mkstemp(prefix="bundle_analysis_")
 
+        cache_key = None
+        if self.local_cache is not None:
+            try:
+                etag = self.storage_service.get_etag(self.bucket_name, path)
+            except FileNotInStorageError:
+                os.unlink(db_path)
+                return None
+            except NotImplementedError:
+                etag = None
+            if etag is not None:
+                cache_key = f"{self.bucket_name}/{path}@{etag}"
+                if self.local_cache.get(cache_key, db_path):
+                    return self._loaded(db_path, path)
+
         with open(db_path, "w+b") as f:
             try:
                 self.storage_service.read_file(self.bucket_name, path, file_obj=f)
             except FileNotInStorageError:
                 return None
-        return BundleAnalysisReport(db_path)
+
+        if cache_key is not None and self._etag_unchanged(path, etag):
+            try:
+                self.local_cache.put(cache_key, db_path)
+            except OSError:
+                log.warning("Unable to cache bundle analysis report", exc_info=True)
+
+        return self._loaded(db_path, path)
 
     @sentry_sdk.trace
     def save(self, report: BundleAnalysisReport, report_key: str):
         """
         Saves a `BundleAnalysisReport` for the given report key into storage.
+        The upload is skipped if the report was loaded from that same key and
+        its database did not change since.
         """
         storage_path = StoragePaths.bundle_report.path(
             repo_key=self.repo_key, report_key=report_key
         )
+        content_hash = report.content_hash()
+        if (
+            report.loaded_storage_path == storage_path
+            and report.loaded_content_hash == content_hash
+        ):
+            log.info(
+                "Bundle analysis report unchanged since load, skipping upload",
+                extra=dict(storage_path=storage_path),
+            )
+            return
+
+        upload_path = report.db_path
+        if self.vacuum_on_save:
+            upload_path = report.vacuumed_copy()
         try:
-            with open(report.db_path, "rb") as f:
+            with open(upload_path, "rb") as f:
                 self.storage_service.write_file(self.bucket_name, storage_path, f)
         except Exception as e:
             log.info(f"Bundle analysis GCS save file error: {e}")
@@ -72,3 +175,9 @@ class BundleAnalysisReportLoader:
                 raise PutRequestRateLimitError("GCS Rate Limit Error for Saving File")
             else:
                 raise e
+        finally:
+            if upload_path != report.db_path:
+                os.unlink(upload_path)
+
+        report.loaded_storage_path = storage_path
+        report.loaded_content_hash = content_hash
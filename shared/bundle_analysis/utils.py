@@ -1,12 +1,23 @@
 import logging
 import os
 import re
+import threading
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 log = logging.getLogger(__name__)
 
+# Matches strings with at least one non-dot character before the first dot
+# and at least one non-dot character after the last dot.
+FILE_REGEX = re.compile(r"^[^/\\]+?\.[^/\\]+$")
+
+# Matches route groups and renamed indices, ie. characters inside parenthesis and themselves
+ROUTE_GROUP_REGEX = re.compile(r"\(.*?\)")
+
+# Maximum number of filenames memoized per plugin (and route prefix) by AssetRoute
+ROUTE_MEMO_MAX_SIZE = 100_000
+
 
 class AssetRoutePluginName(Enum):
     REMIX_VITE = "@codecov/remix-vite-plugin"
@@ -18,6 +29,13 @@ class AssetRoutePluginName(Enum):
 
 
 class AssetRoute:
+    # filename -> route memos, shared by all the instances using the same plugin and route prefix
+    # as the same module names show up across assets, bundles and base/head reports
+    _route_memos: Dict[
+        Tuple[AssetRoutePluginName, Optional[str]], Dict[str, Optional[str]]
+    ] = {}
+    _route_memos_lock = threading.Lock()
+
     def __init__(
         self,
         plugin: AssetRoutePluginName,
@@ -47,6 +65,11 @@ class AssetRoute:
         else:
             self._prefix = self._from_filename_map[plugin][1]
 
+        with self._route_memos_lock:
+            self._route_memo = self._route_memos.setdefault(
+                (plugin, configured_route_prefix), {}
+            )
+
     def _is_file(self, s: str, extensions: Optional[List[str]] = None) -> bool:
         """
         Determines if the passed string represents a file with one or more dots,
@@ -65,10 +88,7 @@ class AssetRoute:
         ):
             return False
 
-        # Matches strings with at least one non-dot character before the first dot
-        # and at least one non-dot character after the last dot.
-        file_regex = re.compile(r"^[^/\\]+?\.[^/\\]+$")
-        return bool(file_regex.match(s))
+        return bool(FILE_REGEX.match(s))
 
     def _compute_remix(self, filename: str) -> Optional[str]:
         """
@@ -178,7 +198,7 @@ class AssetRoute:
             return None
 
         # Remove route groups and renamed indices, ie remove character inside parenthesis and itself
-        returned_items = [re.sub(r"\(.*?\)", "", item) for item in path_items]
+        returned_items = [ROUTE_GROUP_REGEX.sub("", item) for item in path_items]
 
         # Get the file name without extension
         file = returned_items[-1]
@@ -268,13 +288,40 @@ class AssetRoute:
             Optional[str]: The computed route or None if invalid.
         """
         try:
-            return self._compute_from_filename(filename)
+            return self._route_memo[filename]
+        except KeyError:
+            pass
+
+        try:
+            route = self._compute_from_filename(filename)
         except Exception as e:
             log.error(
                 f"Uncaught error during AssetRoute path compute: {e}", exc_info=True
             )
             return None
 
+        with self._route_memos_lock:
+            if len(self._route_memo) >= ROUTE_MEMO_MAX_SIZE:
+                # evict the oldest entry
+                del self._route_memo[next(iter(self._route_memo))]
+            self._route_memo[filename] = route
+        return route
+
+    def get_from_filenames(self, filenames: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Computes the routes of a batch of files, each distinct file being computed once.
+        Args:
+            filenames (Iterable[str]): The file paths to compute the routes from.
+
+        Returns:
+            Dict[str, Optional[str]]: The computed route (or None if invalid) of each file path.
+        """
+        routes = {}
+        for filename in filenames:
+            if filename not in routes:
+                routes[filename] = self.get_from_filename(filename)
+        return routes
+
 
 def get_extension(filename: str) -> str:
     """
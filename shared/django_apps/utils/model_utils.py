@@ -1,5 +1,6 @@
 import logging
-from typing import Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
 
 import orjson
 
@@ -9,6 +10,9 @@ from shared.utils.ReportEncoder import ReportEncoder
 
 log = logging.getLogger(__name__)
 
+# Maximum number of concurrent storage reads done by `prefetch_archive_fields`
+PREFETCH_ARCHIVE_FIELDS_MAX_WORKERS = 16
+
 
 class ArchiveFieldInterfaceMeta(type):
     def __subclasscheck__(cls, subclass):
@@ -85,6 +89,10 @@ class ArchiveField:
         self.cached_value_property_name = f"__{self.public_name}_cached_value"
 
     def __get__(self, obj, objtype=None):
+        # accessed on the class itself, ie. `Commit.report`
+        if obj is None:
+            return self
+
         # check cached value first
         value = getattr(obj, self.cached_value_property_name, None)
         if value is not None:
@@ -147,6 +155,96 @@ class ArchiveField:
         setattr(obj, self.cached_value_property_name, value)
 
 
+def prefetch_archive_fields(
+    objects: Iterable[Any],
+    *field_names: str,
+    max_workers: int = PREFETCH_ARCHIVE_FIELDS_MAX_WORKERS,
+) -> List[Any]:
+    """Fetches the storage-backed values of the given ArchiveFields for all the objects at once.
+    The storage reads are done concurrently (with at most `max_workers` threads) instead of
+    one at a time when each object's field is accessed. The values are cached on the objects
+    the same way accessing the field does, so subsequent accesses don't hit storage.
+
+    Objects whose value is already cached or not in storage (ie. saved in the DB) are skipped,
+    and files missing from storage are left for the field access to handle.
+    Returns the objects as a list.
+
+    Example:
+        commits = prefetch_archive_fields(Commit.objects.filter(repository=repo), "report")
+    """
+    objects = list(objects)
+
+    to_fetch: list[tuple[object, ArchiveField, str]] = []
+    for obj in objects:
+        for field_name in field_names:
+            field = getattr(type(obj), field_name)
+            if getattr(obj, field.cached_value_property_name, None) is not None:
+                continue
+            archive_field = getattr(obj, field.archive_field_name)
+            if archive_field is not None:
+                to_fetch.append((obj, field, archive_field))
+
+    if not to_fetch:
+        return objects
+
+    archive_service = ArchiveService(repository=None)
+
+    def read_file(path: str) -> Optional[str]:
+        try:
+            return archive_service.read_file(path)
+        except FileNotInStorageError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(to_fetch))) as executor:
+        file_strs = executor.map(read_file, [path for _, _, path in to_fetch])
+
+        for (obj, field, _), file_str in zip(to_fetch, file_strs):
+            if file_str is None:
+                continue
+            value = field.rehydrate_fn(obj, orjson.loads(file_str))
+            if value is not None:
+                setattr(obj, field.cached_value_property_name, value)
+
+    return objects
+
+
+class ArchiveFieldQuerySetMixin:
+    """Mixin for QuerySets of models using ArchiveField that adds `prefetch_archive_fields`,
+    which works like `prefetch_related`: the storage-backed values of the given fields are
+    fetched for all the objects (see `prefetch_archive_fields`) when the queryset is evaluated.
+
+    Example:
+        class CommitQuerySet(ArchiveFieldQuerySetMixin, QuerySet):
+            pass
+
+        Commit.objects.filter(repository=repo).prefetch_archive_fields("report")
+    """
+
+    _archive_fields_to_prefetch: tuple = ()
+
+    def prefetch_archive_fields(self, *field_names: str):
+        clone = self._chain()
+        clone._archive_fields_to_prefetch = (
+            self._archive_fields_to_prefetch + field_names
+        )
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._archive_fields_to_prefetch = self._archive_fields_to_prefetch
+        return clone
+
+    def _fetch_all(self):
+        is_fetched = self._result_cache is not None
+        super()._fetch_all()
+        if self._archive_fields_to_prefetch and not is_fetched:
+            # `values()` and `values_list()` querysets don't return model instances
+            instances = [
+                obj for obj in self._result_cache if isinstance(obj, self.model)
+            ]
+            prefetch_archive_fields(instances, *self._archive_fields_to_prefetch)
+
+
 # This is the place for DB trigger logic that's been moved into code
 # Owner
 def get_ownerid_if_member(
@@ -16,12 +16,14 @@ __all__ = [
 ]
 
 
-def inc_counter(counter: Counter, labels: dict | None = None) -> None:
+def inc_counter(
+    counter: Counter, labels: dict | None = None, amount: float = 1
+) -> None:
     try:
         if labels:
-            counter.labels(**labels).inc()
+            counter.labels(**labels).inc(amount)
         else:
-            counter.inc()
+            counter.inc(amount)
     except Exception as e:
         log.warning(f"Error incrementing counter {counter._name}: {e}")
 
@@ -44,3 +46,13 @@ def set_summary(summary: Summary, value, labels: dict | None = None) -> None:
             summary.observe(value)
     except Exception as e:
         log.warning(f"Error observing summary {summary._name}: {e}")
+
+
+def observe_histogram(histogram: Histogram, value, labels: dict | None = None) -> None:
+    try:
+        if labels:
+            histogram.labels(**labels).observe(value)
+        else:
+            histogram.observe(value)
+    except Exception as e:
+        log.warning(f"Error observing histogram {histogram._name}: {e}")
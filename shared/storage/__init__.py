@@ -1,7 +1,13 @@
 from shared.config import get_config
+from shared.storage.async_storage import AsyncStorageService
 from shared.storage.minio import MinioStorageService
 
 
 def get_appropriate_storage_service(*_args, **_kwargs) -> MinioStorageService:
     minio_config = get_config("services", "minio", default={})
     return MinioStorageService(minio_config)
+
+
+def get_appropriate_async_storage_service(*_args, **_kwargs) -> AsyncStorageService:
+    minio_config = get_config("services", "minio", default={})
+    return AsyncStorageService(minio_config)
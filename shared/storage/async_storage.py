@@ -0,0 +1,460 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import ssl
+from hashlib import sha256
+from io import BytesIO
+from typing import IO, Any, BinaryIO, Iterable, Mapping, overload
+from urllib.parse import urlunsplit
+from xml.etree import ElementTree
+
+import certifi
+import httpx
+import zstandard
+from minio.credentials.credentials import Credentials
+from minio.credentials.providers import (
+    ChainedProvider,
+    EnvAWSProvider,
+    EnvMinioProvider,
+    IamAwsProvider,
+    Provider,
+    StaticProvider,
+)
+from minio.helpers import BaseURL
+from minio.signer import sign_v4_s3
+from minio.time import to_amz_date, utcnow
+
+from shared.storage.base import CHUNK_SIZE
+from shared.storage.exceptions import (
+    BatchStorageError,
+    BucketAlreadyExistsError,
+    FileNotInStorageError,
+)
+from shared.storage.minio import (
+    CONNECT_TIMEOUT,
+    HTTP_POOL_MAXSIZE,
+    READ_TIMEOUT,
+)
+from shared.storage.zstd_dictionaries import (
+    ZSTD_DICTIONARY_METADATA_KEY,
+    cache_dictionary,
+    get_cached_dictionary,
+    get_dictionary_path,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_REGION = "us-east-1"
+EMPTY_PAYLOAD_SHA256 = sha256(b"").hexdigest()
+
+
+class AsyncStorageService:
+    """
+    An asyncio counterpart of `MinioStorageService`, talking to the S3 API
+    directly through httpx and signing requests with SigV4.
+
+    It takes the same config as `MinioStorageService` (see
+    `get_appropriate_async_storage_service`), and files written by either
+    service can be read by the other.
+
+    Unlike the minio client, the region of a bucket is never looked up:
+    requests are signed for the configured `region` (or `us-east-1`).
+    Response bodies are decompressed by httpx according to their
+    `Content-Encoding`, both for `gzip` and `zstd`.
+
+    The underlying `httpx.AsyncClient` is created lazily and bound to the event
+    loop it is first used in, it should be closed through `aclose` (or by using
+    the service as an async context manager).
+    """
+
+    def __init__(self, minio_config: dict):
+        self.minio_config = minio_config
+
+        host = minio_config.get("host", "")
+        port = minio_config.get("port")
+        if port is not None:
+            host = f"{host}:{port}"
+        self.verify_ssl = minio_config.get("verify_ssl", False)
+        self.region = minio_config.get("region") or DEFAULT_REGION
+        self._base_url = BaseURL(
+            ("https://" if self.verify_ssl else "http://") + host,
+            minio_config.get("region"),
+        )
+        self._provider = self._get_credentials_provider(minio_config)
+        self._credentials: Credentials | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @staticmethod
+    def _get_credentials_provider(minio_config: dict) -> Provider:
+        if minio_config.get("iam_auth"):
+            return ChainedProvider(
+                providers=[
+                    IamAwsProvider(custom_endpoint=minio_config.get("iam_endpoint")),
+                    EnvMinioProvider(),
+                    EnvAWSProvider(),
+                ]
+            )
+        return StaticProvider(
+            minio_config.get("access_key_id"), minio_config.get("secret_access_key")
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # the limits and TLS settings of a client aren't applied to a
+            # transport given to it, so they are set on the transport
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                transport=httpx.AsyncHTTPTransport(
+                    verify=ssl.create_default_context(
+                        cafile=os.environ.get("SSL_CERT_FILE") or certifi.where()
+                    ),
+                    limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE),
+                    retries=3,
+                ),
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # bounds the batch operations by the connection pool size, so that
+        # requests don't time out waiting for a connection
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(HTTP_POOL_MAXSIZE)
+        return self._semaphore
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AsyncStorageService":
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        await self.aclose()
+
+    async def _get_credentials(self) -> Credentials:
+        if self._credentials is None or self._credentials.is_expired():
+            # the IAM provider fetches credentials with blocking requests
+            self._credentials = await asyncio.to_thread(self._provider.retrieve)
+        return self._credentials
+
+    async def _build_request(
+        self,
+        method: str,
+        bucket_name: str,
+        path: str | None = None,
+        query_params: dict | None = None,
+        headers: dict[str, str] | None = None,
+        body: bytes | None = None,
+    ) -> httpx.Request:
+        url = self._base_url.build(
+            method=method,
+            region=self.region,
+            bucket_name=bucket_name,
+            object_name=path,
+            query_params=query_params,
+        )
+        credentials = await self._get_credentials()
+        date = utcnow()
+        content_sha256 = sha256(body).hexdigest() if body else EMPTY_PAYLOAD_SHA256
+        headers = {
+            **(headers or {}),
+            "Host": url.netloc,
+            "x-amz-date": to_amz_date(date),
+            "x-amz-content-sha256": content_sha256,
+        }
+        if body:
+            headers["Content-Length"] = str(len(body))
+        if credentials.session_token:
+            headers["X-Amz-Security-Token"] = credentials.session_token
+        headers = sign_v4_s3(
+            method=method,
+            url=url,
+            region=self.region,
+            headers=headers,
+            credentials=credentials,
+            content_sha256=content_sha256,
+            date=date,
+        )
+        return self.client.build_request(
+            method, urlunsplit(url), headers=headers, content=body
+        )
+
+    @staticmethod
+    async def _error_code(response: httpx.Response) -> str | None:
+        body = await response.aread()
+        if not body:
+            return None
+        try:
+            return ElementTree.fromstring(body).findtext("Code")
+        except ElementTree.ParseError:
+            return None
+
+    async def create_root_storage(self, bucket_name="archive", region="us-east-1"):
+        read_only_policy = {
+            "Statement": [
+                {
+                    "Action": ["s3:GetObject"],
+                    "Effect": "Allow",
+                    "Principal": {"AWS": ["*"]},
+                    "Resource": [f"arn:aws:s3:::{bucket_name}/*"],
+                }
+            ],
+            "Version": "2012-10-17",
+        }
+        request = await self._build_request("HEAD", bucket_name)
+        response = await self.client.send(request)
+        if response.is_success:
+            raise BucketAlreadyExistsError(f"Bucket {bucket_name} already exists")
+
+        body = None
+        if region and region != DEFAULT_REGION:
+            body = (
+                "<CreateBucketConfiguration>"
+                f"<LocationConstraint>{region}</LocationConstraint>"
+                "</CreateBucketConfiguration>"
+            ).encode()
+        request = await self._build_request("PUT", bucket_name, body=body)
+        response = await self.client.send(request)
+        if response.is_error:
+            if await self._error_code(response) == "BucketAlreadyOwnedByYou":
+                raise BucketAlreadyExistsError(f"Bucket {bucket_name} already exists")
+            response.raise_for_status()
+
+        request = await self._build_request(
+            "PUT",
+            bucket_name,
+            query_params={"policy": ""},
+            body=json.dumps(read_only_policy).encode(),
+        )
+        response = await self.client.send(request)
+        response.raise_for_status()
+        return {"name": bucket_name}
+
+    async def write_file(
+        self,
+        bucket_name: str,
+        path: str,
+        data: IO[bytes] | str | bytes,
+        reduced_redundancy: bool = False,
+        *,
+        is_already_gzipped: bool = False,  # deprecated
+        is_compressed: bool = False,
+        compression_type: str | None = "zstd",
+        metadata: dict[str, str] | None = None,
+        zstd_dictionary: str | None = None,
+    ) -> bool:
+        """
+        Writes a file to storage, compressing it as `MinioStorageService.write_file`
+        does. S3 needs the length of the body upfront, so the compressed file is
+        held in memory.
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        elif not isinstance(data, (bytes, bytearray, memoryview)):
+            data = data.read()
+        data = bytes(data)
+
+        if is_already_gzipped:
+            is_compressed = True
+            compression_type = "gzip"
+
+        if is_compressed or compression_type != "zstd":
+            zstd_dictionary = None
+
+        if not is_compressed:
+            if compression_type == "zstd" and zstd_dictionary:
+                dictionary = await self._load_dictionary(bucket_name, zstd_dictionary)
+                data = zstandard.ZstdCompressor(dict_data=dictionary).compress(data)
+            elif compression_type == "zstd":
+                data = zstandard.ZstdCompressor().compress(data)
+            elif compression_type == "gzip":
+                data = gzip.compress(data)
+
+        headers = {"Content-Type": "text/plain"}
+        if zstd_dictionary:
+            headers[f"x-amz-meta-{ZSTD_DICTIONARY_METADATA_KEY}"] = zstd_dictionary
+        elif compression_type:
+            headers["Content-Encoding"] = compression_type
+        if reduced_redundancy:
+            headers["x-amz-storage-class"] = "REDUCED_REDUNDANCY"
+        if metadata:
+            headers.update(
+                {f"x-amz-meta-{k}": v for k, v in metadata.items() if v is not None}
+            )
+
+        request = await self._build_request(
+            "PUT", bucket_name, path, headers=headers, body=data
+        )
+        response = await self.client.send(request)
+        response.raise_for_status()
+        return True
+
+    @overload
+    async def read_file(
+        self,
+        bucket_name: str,
+        path: str,
+        file_obj: None = None,
+        metadata_container: dict[str, str] | None = None,
+    ) -> bytes: ...
+
+    @overload
+    async def read_file(
+        self,
+        bucket_name: str,
+        path: str,
+        file_obj: BinaryIO,
+        metadata_container: dict[str, str] | None = None,
+    ) -> None: ...
+
+    async def read_file(
+        self,
+        bucket_name: str,
+        path: str,
+        file_obj: BinaryIO | None = None,
+        metadata_container: dict[str, str] | None = None,
+    ) -> bytes | None:
+        """
+        Reads a file from storage. When `file_obj` is given, the decompressed
+        content is streamed into it instead of being held in memory.
+        """
+        request = await self._build_request("GET", bucket_name, path)
+        response = await self.client.send(request, stream=True)
+        try:
+            if response.is_error:
+                if await self._error_code(response) == "NoSuchKey":
+                    raise FileNotInStorageError(
+                        f"File {path} does not exist in {bucket_name}"
+                    )
+                response.raise_for_status()
+
+            if metadata_container is not None:
+                for header, value in response.headers.items():
+                    if header.startswith("x-amz-meta-"):
+                        metadata_key = header.removeprefix("x-amz-meta-")
+                        if metadata_key != ZSTD_DICTIONARY_METADATA_KEY:
+                            metadata_container[metadata_key] = value
+
+            # objects compressed with a dictionary have no `Content-Encoding`,
+            # so httpx leaves them to us
+            decompressor = None
+            if zstd_dictionary := response.headers.get(
+                f"x-amz-meta-{ZSTD_DICTIONARY_METADATA_KEY}"
+            ):
+                dictionary = get_cached_dictionary(bucket_name, zstd_dictionary)
+                if dictionary is None:
+                    # the dictionary is fetched once this response is closed, so
+                    # that a read never holds a connection waiting for another one
+                    compressed = await response.aread()
+                    await response.aclose()
+                    dictionary = await self._load_dictionary(
+                        bucket_name, zstd_dictionary
+                    )
+                    data = (
+                        zstandard.ZstdDecompressor(dict_data=dictionary)
+                        .decompressobj()
+                        .decompress(compressed)
+                    )
+                    if file_obj:
+                        file_obj.seek(0)
+                        file_obj.write(data)
+                        return None
+                    return data
+                decompressor = zstandard.ZstdDecompressor(
+                    dict_data=dictionary
+                ).decompressobj()
+
+            res = file_obj if file_obj else BytesIO()
+            res.seek(0)
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                res.write(decompressor.decompress(chunk) if decompressor else chunk)
+            if file_obj:
+                return None
+            return res.getvalue()
+        finally:
+            await response.aclose()
+
+    async def _load_dictionary(
+        self, bucket_name: str, name: str
+    ) -> zstandard.ZstdCompressionDict:
+        if (dictionary := get_cached_dictionary(bucket_name, name)) is not None:
+            return dictionary
+        data = await self.read_file(bucket_name, get_dictionary_path(name))
+        return cache_dictionary(bucket_name, name, data)
+
+    async def delete_file(self, bucket_name: str, path: str) -> bool:
+        # Like `MinioStorageService.delete_file`, this raises `FileNotInStorageError`
+        # when the storage answers `NoSuchKey`. S3 (and minio) answer deletes of
+        # missing objects with a `204` though, which returns `True`.
+        request = await self._build_request("DELETE", bucket_name, path)
+        response = await self.client.send(request)
+        if response.is_error:
+            if await self._error_code(response) == "NoSuchKey":
+                raise FileNotInStorageError(
+                    f"File {path} does not exist in {bucket_name}"
+                )
+            response.raise_for_status()
+        return True
+
+    async def _run_batch(self, coros: Mapping[str, Any]) -> tuple[dict, dict]:
+        async def run(coro):
+            async with self.semaphore:
+                return await coro
+
+        outcomes = await asyncio.gather(
+            *(run(coro) for coro in coros.values()), return_exceptions=True
+        )
+        results, errors = {}, {}
+        for path, outcome in zip(coros, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                errors[path] = outcome
+            else:
+                results[path] = outcome
+        return results, errors
+
+    async def read_files(
+        self, bucket_name: str, paths: Iterable[str]
+    ) -> dict[str, bytes]:
+        results, errors = await self._run_batch(
+            {path: self.read_file(bucket_name, path) for path in paths}
+        )
+        errors = {
+            path: error
+            for path, error in errors.items()
+            if not isinstance(error, FileNotInStorageError)
+        }
+        if errors:
+            raise BatchStorageError(errors, results)
+        return results
+
+    async def write_files(
+        self, bucket_name: str, files: Mapping[str, Any], **write_kwargs
+    ) -> None:
+        _, errors = await self._run_batch(
+            {
+                path: self.write_file(bucket_name, path, data, **write_kwargs)
+                for path, data in files.items()
+            }
+        )
+        if errors:
+            raise BatchStorageError(errors)
+
+    async def delete_files(self, bucket_name: str, paths: Iterable[str]) -> None:
+        _, errors = await self._run_batch(
+            {path: self.delete_file(bucket_name, path) for path in paths}
+        )
+        errors = {
+            path: error
+            for path, error in errors.items()
+            if not isinstance(error, FileNotInStorageError)
+        }
+        if errors:
+            raise BatchStorageError(errors)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import BinaryIO, overload
+from typing import Any, BinaryIO, Iterable, Mapping, overload
+
+from shared.storage.exceptions import BatchStorageError, FileNotInStorageError
 
 CHUNK_SIZE = 1024 * 32
 PART_SIZE = 1024 * 1024 * 20  # 20MiB
@@ -101,6 +103,102 @@ class BaseStorageService(ABC):
         """
         raise NotImplementedError()
 
+    def get_etag(self, bucket_name: str, path: str) -> str:
+        """Returns an identifier of the current contents of a file, without reading it
+
+        The identifier changes whenever the file is overwritten with different contents,
+        which makes it suitable for validating locally cached copies of the file.
+
+        Args:
+            bucket_name (str): The name of the bucket for the file lives
+            path (str): The path of the file
+
+        Raises:
+            NotImplementedError: If the current instance did not implement this method
+            FileNotInStorageError: If the file does not exist
+
+        Returns:
+            str: The ETag of the file
+        """
+        raise NotImplementedError()
+
+    def read_files(self, bucket_name: str, paths: Iterable[str]) -> dict[str, bytes]:
+        """Reads the content of many files
+
+        Files that don't exist are left out of the result.
+        The default implementation reads the files one after the other.
+
+        Args:
+            bucket_name (str): The name of the bucket where the files live
+            paths (Iterable[str]): The paths of the files
+
+        Raises:
+            BatchStorageError: If reading some of the files failed, with the contents
+                of the files that were read in its `results`
+
+        Returns:
+            dict: The contents of each file, still encoded as bytes
+        """
+        results, errors = {}, {}
+        for path in paths:
+            try:
+                results[path] = self.read_file(bucket_name, path)
+            except FileNotInStorageError:
+                pass
+            except Exception as e:
+                errors[path] = e
+        if errors:
+            raise BatchStorageError(errors, results)
+        return results
+
+    def write_files(
+        self, bucket_name: str, files: Mapping[str, Any], **write_kwargs
+    ) -> None:
+        """Writes many files
+
+        The default implementation writes the files one after the other.
+
+        Args:
+            bucket_name (str): The name of the bucket for the files to be created on
+            files (Mapping[str, Any]): The data to be written to each path
+            write_kwargs: The options passed to `write_file` for every file
+
+        Raises:
+            BatchStorageError: If writing some of the files failed
+        """
+        errors = {}
+        for path, data in files.items():
+            try:
+                self.write_file(bucket_name, path, data, **write_kwargs)
+            except Exception as e:
+                errors[path] = e
+        if errors:
+            raise BatchStorageError(errors)
+
+    def delete_files(self, bucket_name: str, paths: Iterable[str]) -> None:
+        """Deletes many files from the storage
+
+        Files that don't exist are ignored.
+        The default implementation deletes the files one after the other.
+
+        Args:
+            bucket_name (str): The name of the bucket where the files live
+            paths (Iterable[str]): The paths of the files to be deleted
+
+        Raises:
+            BatchStorageError: If deleting some of the files failed
+        """
+        errors = {}
+        for path in paths:
+            try:
+                self.delete_file(bucket_name, path)
+            except FileNotInStorageError:
+                pass
+            except Exception as e:
+                errors[path] = e
+        if errors:
+            raise BatchStorageError(errors)
+
 
 class PresignedURLService(ABC):
     @abstractmethod
@@ -0,0 +1,146 @@
+import logging
+import shutil
+from typing import Any, BinaryIO, Callable, Iterable, Mapping, overload
+
+from shared.storage.base import BaseStorageService
+from shared.storage.disk_cache import DiskCache
+from shared.storage.exceptions import BatchStorageError
+
+log = logging.getLogger(__name__)
+
+
+class CachedStorageService(BaseStorageService):
+    """
+    Wraps a storage service with a local read-through `DiskCache`.
+
+    Objects are cached by bucket and path, so only paths for which `cacheable`
+    returns `True` are cached: these must hold immutable objects, as writes
+    going through another process (or another pod) can't invalidate this cache.
+    Writes and deletes going through this service invalidate the cached objects.
+
+    Reads asking for the object metadata always go to the underlying storage.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorageService,
+        cache: DiskCache,
+        cacheable: Callable[[str, str], bool] | None = None,
+    ):
+        self.storage = storage
+        self.cache = cache
+        self.cacheable = cacheable or (lambda bucket_name, path: True)
+
+    @staticmethod
+    def _cache_key(bucket_name: str, path: str) -> str:
+        return f"{bucket_name}/{path}"
+
+    def _invalidate(self, bucket_name: str, path: str) -> None:
+        self.cache.delete(self._cache_key(bucket_name, path))
+
+    def _put(self, bucket_name: str, path: str, data: bytes) -> None:
+        try:
+            self.cache.put_bytes(self._cache_key(bucket_name, path), data)
+        except OSError:
+            log.warning("Unable to cache storage object", exc_info=True)
+
+    def create_root_storage(self, bucket_name="archive", region="us-east-1"):
+        return self.storage.create_root_storage(bucket_name, region)
+
+    def write_file(self, bucket_name, path, data, *args, **kwargs):
+        try:
+            return self.storage.write_file(bucket_name, path, data, *args, **kwargs)
+        finally:
+            self._invalidate(bucket_name, path)
+
+    @overload
+    def read_file(self, bucket_name: str, path: str) -> bytes: ...
+
+    @overload
+    def read_file(self, bucket_name: str, path: str, file_obj: BinaryIO) -> None: ...
+
+    def read_file(self, bucket_name, path, file_obj=None, **kwargs):
+        if kwargs or not self.cacheable(bucket_name, path):
+            return self.storage.read_file(bucket_name, path, file_obj, **kwargs)
+
+        if (entry := self.cache.open(self._cache_key(bucket_name, path))) is not None:
+            with entry:
+                if file_obj is None:
+                    return entry.read()
+                file_obj.seek(0)
+                shutil.copyfileobj(entry, file_obj)
+                return None
+
+        if file_obj is None:
+            data = self.storage.read_file(bucket_name, path)
+            self._put(bucket_name, path, data)
+            return data
+
+        # the object is streamed to a file of the cache rather than read in memory
+        copied = False
+        try:
+            with self.cache.writer(self._cache_key(bucket_name, path)) as temp_file:
+                self.storage.read_file(bucket_name, path, file_obj=temp_file)
+                temp_file.seek(0)
+                file_obj.seek(0)
+                shutil.copyfileobj(temp_file, file_obj)
+                copied = True
+        except OSError:
+            if not copied:
+                raise
+            log.warning("Unable to cache storage object", exc_info=True)
+        return None
+
+    def delete_file(self, bucket_name, path):
+        try:
+            return self.storage.delete_file(bucket_name, path)
+        finally:
+            self._invalidate(bucket_name, path)
+
+    def get_etag(self, bucket_name: str, path: str) -> str:
+        return self.storage.get_etag(bucket_name, path)
+
+    def read_files(self, bucket_name: str, paths: Iterable[str]) -> dict[str, bytes]:
+        results, missing = {}, []
+        for path in paths:
+            entry = None
+            if self.cacheable(bucket_name, path):
+                entry = self.cache.open(self._cache_key(bucket_name, path))
+            if entry is None:
+                missing.append(path)
+                continue
+            with entry:
+                results[path] = entry.read()
+
+        try:
+            fetched = self.storage.read_files(bucket_name, missing) if missing else {}
+        except BatchStorageError as e:
+            e.results = {**results, **e.results}
+            raise
+        for path, data in fetched.items():
+            if self.cacheable(bucket_name, path):
+                self._put(bucket_name, path, data)
+        return {**results, **fetched}
+
+    def write_files(
+        self, bucket_name: str, files: Mapping[str, Any], **write_kwargs
+    ) -> None:
+        try:
+            self.storage.write_files(bucket_name, files, **write_kwargs)
+        finally:
+            for path in files:
+                self._invalidate(bucket_name, path)
+
+    def delete_files(self, bucket_name: str, paths: Iterable[str]) -> None:
+        paths = list(paths)
+        try:
+            self.storage.delete_files(bucket_name, paths)
+        finally:
+            for path in paths:
+                self._invalidate(bucket_name, path)
+
+    def create_presigned_put(self, bucket: str, path: str, expires: int) -> str:
+        return self.storage.create_presigned_put(bucket, path, expires)
+
+    def create_presigned_get(self, bucket: str, path: str, expires: int) -> str:
+        return self.storage.create_presigned_get(bucket, path, expires)
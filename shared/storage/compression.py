@@ -1,20 +1,52 @@
-import gzip
 import importlib.metadata
+import zlib
 from typing import IO
 
+# The compression level used by `gzip.compress` by default
+DEFAULT_GZIP_COMPRESSION_LEVEL = 9
+# Size of the reads done on the uncompressed stream
+GZIP_READ_SIZE = 1024 * 256
+
 
 class GZipStreamReader:
-    def __init__(self, fileobj: IO[bytes]):
+    """
+    Compresses `fileobj` into a single gzip member as it is being read.
+
+    The whole stream goes through one `zlib.compressobj`, so the compression
+    dictionary carries over from one read to the next. `read` returns at most
+    `size` bytes, and only returns an empty result once the stream is exhausted.
+    """
+
+    def __init__(
+        self,
+        fileobj: IO[bytes],
+        compresslevel: int = DEFAULT_GZIP_COMPRESSION_LEVEL,
+    ):
         self.data = fileobj
         self.bytes_compressed = 0
+        # `wbits` of 16 + MAX_WBITS writes the gzip header and trailer
+        self._compressor = zlib.compressobj(
+            compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        self._buffer = bytearray()
+        self._finished = False
 
     def read(self, size: int = -1, /) -> bytes:
-        curr_data = self.data.read(size)
+        while not self._finished and (size < 0 or len(self._buffer) < size):
+            curr_data = self.data.read(max(size, GZIP_READ_SIZE) if size >= 0 else -1)
+            if curr_data:
+                self._buffer += self._compressor.compress(curr_data)
+            else:
+                self._buffer += self._compressor.flush()
+                self._finished = True
 
-        if not curr_data:
-            return b""
+        if size < 0 or size >= len(self._buffer):
+            compressed = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            compressed = bytes(self._buffer[:size])
+            del self._buffer[:size]
 
-        compressed = gzip.compress(curr_data)
         self.bytes_compressed += len(compressed)
         return compressed
 
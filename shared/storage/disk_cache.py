@@ -0,0 +1,178 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator
+
+log = logging.getLogger(__name__)
+
+LOCK_FILENAME = ".lock"
+TEMP_PREFIX = ".tmp-"
+# temp files older than this are considered leftovers of a crashed process
+STALE_TEMP_FILE_SECONDS = 60 * 60
+
+
+class DiskCache:
+    """
+    A local on-disk cache of files, bounded by the total size in bytes of its entries.
+
+    Entries are stored as one file per key inside `directory`. Writes go through a
+    temporary file that is atomically renamed into place, so readers never observe a
+    partially written entry. Recency is tracked through the entries' mtime (bumped on
+    every hit) and least recently used entries are evicted once `max_bytes` is exceeded.
+    Eviction is serialized across processes sharing the same directory with a file lock.
+
+    The cache does not know anything about the validity of its entries, so keys
+    must change whenever the underlying content does (ie. include an ETag or a hash).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        with open(os.path.join(self.directory, LOCK_FILENAME), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key: str, destination_path: str) -> bool:
+        """
+        Copies the cached file for `key` to `destination_path`.
+        Returns whether the key was found in the cache.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            # an entry can't be modified once written so copying a concurrently
+            # evicted entry is still fine, we just keep reading the unlinked file
+            shutil.copyfile(entry_path, destination_path)
+        except FileNotFoundError:
+            return False
+        self._touch(entry_path)
+        return True
+
+    def open(self, key: str) -> BinaryIO | None:
+        """
+        Opens the cached file for `key` for reading, or returns `None` if the key
+        is not in the cache. The file stays readable even if evicted meanwhile.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            entry = open(entry_path, "rb")
+        except FileNotFoundError:
+            return None
+        self._touch(entry_path)
+        return entry
+
+    def put(self, key: str, source_path: str) -> None:
+        """
+        Stores a copy of the file at `source_path` in the cache under `key`,
+        evicting least recently used entries if needed.
+        """
+
+        def write(temp_file: BinaryIO) -> None:
+            with open(source_path, "rb") as source:
+                shutil.copyfileobj(source, temp_file)
+
+        self._store(key, os.path.getsize(source_path), write)
+
+    def put_bytes(self, key: str, data: bytes | bytearray | memoryview) -> None:
+        """
+        Stores `data` in the cache under `key`, evicting least recently used
+        entries if needed.
+        """
+        self._store(key, len(data), lambda temp_file: temp_file.write(data))
+
+    def _store(self, key: str, size: int, write: Callable[[BinaryIO], object]) -> None:
+        if self._too_large(size):
+            return
+        with self.writer(key) as temp_file:
+            write(temp_file)
+
+    def _too_large(self, size: int) -> bool:
+        if size <= self.max_bytes:
+            return False
+        log.info(
+            "File too large to be cached",
+            extra=dict(size=size, max_bytes=self.max_bytes),
+        )
+        return True
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Yields a temporary file of the cache directory to write the entry for `key`
+        into, for content whose size isn't known upfront. The file is stored under
+        `key` once the block exits without errors, unless it is larger than `max_bytes`.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, "w+b") as temp_file:
+                yield temp_file
+                size = os.fstat(temp_file.fileno()).st_size
+            if self._too_large(size):
+                os.unlink(temp_path)
+                return
+            os.replace(temp_path, self._entry_path(key))
+        except BaseException:
+            self._unlink(temp_path)
+            raise
+
+        self.evict()
+
+    def _touch(self, entry_path: str) -> None:
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """
+        Deletes least recently used entries until the cache fits in `max_bytes`.
+        """
+        with self._lock():
+            entries = []
+            now = time.time()
+            with os.scandir(self.directory) as it:
+                for dir_entry in it:
+                    if dir_entry.name == LOCK_FILENAME:
+                        continue
+                    try:
+                        stat = dir_entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if dir_entry.name.startswith(TEMP_PREFIX):
+                        if now - stat.st_mtime > STALE_TEMP_FILE_SECONDS:
+                            self._unlink(dir_entry.path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                self._unlink(path)
+                total_size -= size
+
+    def _unlink(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -8,3 +8,18 @@ class FileNotInStorageError(Exception):
 
 class PutRequestRateLimitError(Exception):
     pass
+
+
+class BatchStorageError(Exception):
+    """
+    Raised by the batch storage operations when some of the files failed.
+
+    Attributes:
+        errors (dict): The exception raised for each failed path
+        results (dict): The results of the paths that succeeded, if the operation has any
+    """
+
+    def __init__(self, errors: dict, results: dict | None = None):
+        super().__init__(f"{len(errors)} file(s) failed: {sorted(errors)[:10]}")
+        self.errors = errors
+        self.results = results if results is not None else {}
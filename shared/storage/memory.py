@@ -1,4 +1,5 @@
 from collections import defaultdict
+from hashlib import md5
 
 from shared.storage.base import CHUNK_SIZE, BaseStorageService
 from shared.storage.exceptions import BucketAlreadyExistsError, FileNotInStorageError
@@ -122,3 +123,21 @@ class MemoryStorageService(BaseStorageService):
         except KeyError:
             raise FileNotInStorageError()
         return True
+
+    def get_etag(self, bucket_name, path):
+        """Returns an identifier of the current contents of a file, without reading it
+
+        Args:
+            bucket_name (str): The name of the bucket for the file lives
+            path (str): The path of the file
+
+        Raises:
+            FileNotInStorageError: If the file does not exist
+
+        Returns:
+            str: The md5 hex digest of the file contents, like S3 ETags
+        """
+        try:
+            return md5(self.storage[bucket_name][path]).hexdigest()
+        except KeyError:
+            raise FileNotInStorageError()
@@ -0,0 +1,166 @@
+import re
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import IO, Callable, Iterator, Mapping
+
+from urllib3 import Retry
+
+from shared.metrics import Counter, Histogram, inc_counter, observe_histogram
+
+STORAGE_REQUEST_DURATION = Histogram(
+    "storage_request_duration_seconds",
+    "Duration of storage operations",
+    [
+        "operation",  # read_file, write_file, ...
+        "bucket",
+        "kind",  # see `register_object_kinds`
+    ],
+    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60],
+)
+
+STORAGE_REQUEST_FAILURES = Counter(
+    "storage_request_failures",
+    "Number of storage operations that failed",
+    [
+        "operation",
+        "bucket",
+        "kind",
+        "error",  # Exception class name
+    ],
+)
+
+STORAGE_BYTES = Counter(
+    "storage_bytes",
+    "Number of bytes read from and written to storage",
+    [
+        "direction",  # read, write
+        "bucket",
+        "kind",
+        "encoding",  # compressed (as stored), uncompressed
+    ],
+)
+
+STORAGE_REQUEST_RETRIES = Counter(
+    "storage_request_retries",
+    "Number of storage HTTP requests retried",
+    [
+        "method",
+        "reason",  # HTTP status code or exception class name
+    ],
+)
+
+UNKNOWN_OBJECT_KIND = "other"
+
+_object_kinds: dict[str, re.Pattern] = {}
+
+
+def path_template_regex(template: str) -> re.Pattern:
+    """
+    Turns a path template such as `v4/repos/{repo_hash}/...` into a pattern
+    matching the paths it formats to.
+    """
+    parts = re.split(r"\{\w+\}", template)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts))
+
+
+def register_object_kinds(kinds: Mapping[str, re.Pattern]) -> None:
+    """
+    Registers the path patterns of kinds of objects (ie. `MinioEndpoints`),
+    used to label the storage metrics.
+    """
+    _object_kinds.update(kinds)
+
+
+def get_object_kind(path: str | None) -> str:
+    if path is not None:
+        for kind, pattern in _object_kinds.items():
+            if pattern.fullmatch(path):
+                return kind
+    return UNKNOWN_OBJECT_KIND
+
+
+@contextmanager
+def record_operation(
+    operation: str, bucket_name: str, path: str | None = None
+) -> Iterator[None]:
+    """
+    Records the duration of a storage operation, and whether it failed.
+    """
+    labels = dict(operation=operation, bucket=bucket_name, kind=get_object_kind(path))
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        inc_counter(STORAGE_REQUEST_FAILURES, {**labels, "error": type(e).__name__})
+        raise
+    finally:
+        observe_histogram(STORAGE_REQUEST_DURATION, time.perf_counter() - start, labels)
+
+
+def recorded_operation(operation: str) -> Callable:
+    """
+    Decorates a storage service method taking a bucket name and a path (or paths)
+    to record it with `record_operation`.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, bucket_name, path, *args, **kwargs):
+            with record_operation(
+                operation, bucket_name, path if isinstance(path, str) else None
+            ):
+                return method(self, bucket_name, path, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_bytes(
+    direction: str,
+    bucket_name: str,
+    path: str,
+    uncompressed: int | None,
+    compressed: int | None,
+) -> None:
+    labels = dict(direction=direction, bucket=bucket_name, kind=get_object_kind(path))
+    if uncompressed is not None:
+        inc_counter(STORAGE_BYTES, {**labels, "encoding": "uncompressed"}, uncompressed)
+    if compressed is not None:
+        inc_counter(STORAGE_BYTES, {**labels, "encoding": "compressed"}, compressed)
+
+
+class CountingReader:
+    """
+    Wraps a file object to count the bytes read from it.
+    """
+
+    def __init__(self, fileobj: IO[bytes]):
+        self.fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, size: int = -1, /) -> bytes:
+        data = self.fileobj.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class RecordingRetry(Retry):
+    """
+    A urllib3 `Retry` counting the retried requests.
+    """
+
+    def increment(
+        self, method=None, url=None, response=None, error=None, *args, **kwargs
+    ):
+        if response is not None and response.status:
+            reason = str(response.status)
+        elif error is not None:
+            reason = type(error).__name__
+        else:
+            reason = "unknown"
+        # raises once the retries are exhausted, so that last attempt isn't counted
+        retry = super().increment(method, url, response, error, *args, **kwargs)
+        inc_counter(STORAGE_REQUEST_RETRIES, dict(method=method or "", reason=reason))
+        return retry
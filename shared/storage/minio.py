@@ -1,10 +1,21 @@
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from functools import lru_cache
 from io import BytesIO
-from typing import IO, BinaryIO, Literal, cast, overload
+from typing import (
+    IO,
+    Any,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Literal,
+    Mapping,
+    cast,
+    overload,
+)
 
 import certifi
 import urllib3
@@ -16,24 +27,51 @@ from minio.credentials.providers import (
     EnvMinioProvider,
     IamAwsProvider,
 )
+from minio.deleteobjects import DeleteObject
 from minio.error import MinioException, S3Error
 from minio.helpers import ObjectWriteResult
-from urllib3 import HTTPResponse, Retry
+from urllib3 import HTTPResponse
+from urllib3.exceptions import IncompleteRead
 from urllib3.util import Timeout
 
 from shared.storage.base import (
-    CHUNK_SIZE,
     PART_SIZE,
     BaseStorageService,
     PresignedURLService,
 )
 from shared.storage.compression import GZipStreamReader, zstd_decoded_by_default
-from shared.storage.exceptions import BucketAlreadyExistsError, FileNotInStorageError
+from shared.storage.exceptions import (
+    BatchStorageError,
+    BucketAlreadyExistsError,
+    FileNotInStorageError,
+)
+from shared.storage.metrics import (
+    CountingReader,
+    RecordingRetry,
+    record_bytes,
+    recorded_operation,
+)
+from shared.storage.zstd_dictionaries import (
+    ZSTD_DICTIONARY_METADATA_KEY,
+    load_dictionary,
+)
 
 log = logging.getLogger(__name__)
 
 CONNECT_TIMEOUT = 10
 READ_TIMEOUT = 60
+# Size of the reads done on responses, configurable with `read_buffer_size`
+READ_BUFFER_SIZE = 1024 * 1024
+# Number of connections kept open to the storage host
+HTTP_POOL_MAXSIZE = 10
+# Number of parts of a multipart upload being compressed and uploaded concurrently,
+# configurable with `upload_concurrency` (and bounded by the connection pool)
+UPLOAD_CONCURRENCY = 4
+# S3 doesn't accept smaller parts, `part_size` can't go below it
+MIN_PART_SIZE = 1024 * 1024 * 5
+# Number of concurrent requests done by batch operations, bounded by
+# the connection pool so that threads never wait on a connection
+BATCH_MAX_WORKERS = HTTP_POOL_MAXSIZE
 
 
 def init_minio_client(
@@ -74,10 +112,10 @@ def init_minio_client(
 
     http_client = urllib3.PoolManager(
         timeout=Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT),
-        maxsize=10,
+        maxsize=HTTP_POOL_MAXSIZE,
         cert_reqs="CERT_REQUIRED",
         ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
-        retries=Retry(
+        retries=RecordingRetry(
             total=5,
             backoff_factor=1,
             status_forcelist=[
@@ -139,8 +177,38 @@ def get_cached_minio_client(
     )
 
 
+def stream_size(data: IO[bytes]) -> int | None:
+    """
+    Returns the number of bytes left to read from `data`,
+    or `None` if it can't be known without reading it.
+    """
+    try:
+        if not data.seekable():
+            return None
+        position = data.tell()
+        end = data.seek(0, os.SEEK_END)
+        data.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
 zstd_default = zstd_decoded_by_default()
 
+# The settings `get_cached_minio_client` takes
+MINIO_CLIENT_SETTINGS = frozenset(
+    (
+        "host",
+        "port",
+        "access_key_id",
+        "secret_access_key",
+        "verify_ssl",
+        "iam_auth",
+        "iam_endpoint",
+        "region",
+    )
+)
+
 
 # Service class for interfacing with codecov's underlying storage layer, minio
 class MinioStorageService(BaseStorageService, PresignedURLService):
@@ -149,7 +217,25 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
 
         log.debug("Connecting to minio with config %s", self.minio_config)
 
-        self.minio_client = get_cached_minio_client(**self.minio_config)
+        # only pass the client settings, the others (ie. nested settings) may not
+        # be hashable and can't be cached on
+        self.minio_client = get_cached_minio_client(
+            **{
+                key: value
+                for key, value in self.minio_config.items()
+                if key in MINIO_CLIENT_SETTINGS
+            }
+        )
+        self.read_buffer_size = int(
+            self.minio_config.get("read_buffer_size", READ_BUFFER_SIZE)
+        )
+        self.part_size = max(
+            int(self.minio_config.get("part_size", PART_SIZE)), MIN_PART_SIZE
+        )
+        self.upload_concurrency = min(
+            int(self.minio_config.get("upload_concurrency", UPLOAD_CONCURRENCY)),
+            HTTP_POOL_MAXSIZE,
+        )
 
         log.debug("Done setting up minio client")
 
@@ -191,6 +277,7 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
             raise
 
     # Writes a file to storage will gzip if not compressed already
+    @recorded_operation("write_file")
     def write_file(
         self,
         bucket_name: str,
@@ -202,23 +289,52 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
         is_compressed: bool = False,
         compression_type: str | None = "zstd",
         metadata: dict[str, str] | None = None,
+        zstd_dictionary: str | None = None,
     ) -> ObjectWriteResult | Literal[True]:
+        """
+        Writes a file to storage, compressing it with `compression_type` unless
+        it `is_compressed` already.
+
+        With `zstd_dictionary`, zstd compression uses that trained dictionary (see
+        `shared.storage.zstd_dictionaries`). The object then has no `Content-Encoding`
+        as HTTP clients can't decode it, and the dictionary name is recorded in its
+        metadata instead so that `read_file` can decompress it.
+        """
         if isinstance(data, str):
             data = BytesIO(data.encode())
         elif isinstance(data, (bytes, bytearray, memoryview)):
             data = BytesIO(data)
+        size = stream_size(data)
+        data = CountingReader(data)
+        # unknown sizes may well be large
+        is_large = size is None or size > self.part_size
 
         if is_already_gzipped:
             is_compressed = True
             compression_type = "gzip"
 
+        if is_compressed or compression_type != "zstd":
+            zstd_dictionary = None
+
         result: IO[bytes]
         if is_compressed:
             result = data
         else:
-            if compression_type == "zstd":
-                cctx = zstandard.ZstdCompressor()
-                result = cctx.stream_reader(data)
+            if compression_type == "zstd" and zstd_dictionary:
+                cctx = zstandard.ZstdCompressor(
+                    dict_data=load_dictionary(self, bucket_name, zstd_dictionary)
+                )
+                # a known size is recorded in the frame, so that `read_file`
+                # can decompress it into a buffer allocated once
+                result = cctx.stream_reader(data, size=-1 if size is None else size)
+
+            elif compression_type == "zstd":
+                # large inputs are compressed by zstd worker threads, in parallel
+                # with the parts being uploaded
+                cctx = zstandard.ZstdCompressor(
+                    threads=self.upload_concurrency if is_large else 0
+                )
+                result = cctx.stream_reader(data, size=-1 if size is None else size)
 
             elif compression_type == "gzip":
                 result = cast(IO[bytes], GZipStreamReader(data))
@@ -227,7 +343,9 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
                 result = data
 
         headers = {}
-        if compression_type:
+        if zstd_dictionary:
+            headers[f"x-amz-meta-{ZSTD_DICTIONARY_METADATA_KEY}"] = zstd_dictionary
+        elif compression_type:
             headers["Content-Encoding"] = compression_type
         if reduced_redundancy:
             headers["x-amz-storage-class"] = "REDUCED_REDUNDANCY"
@@ -242,14 +360,25 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
         # ZstdCompressionReader implements read(): https://github.com/indygreg/python-zstandard/blob/12a80fac558820adf43e6f16206120685b9eb880/zstandard/__init__.pyi#L233C5-L233C49
         # BytesIO implements read(): https://docs.python.org/3/library/io.html#io.BufferedReader.read
         # IO[bytes] implements read(): https://github.com/python/cpython/blob/3.13/Lib/typing.py#L3502
+        # parts of multipart uploads are uploaded by `upload_concurrency` threads.
+        # the size of the upload is only known upfront when it isn't compressed
+        uploaded = result if result is data else CountingReader(result)
         write_result = self.minio_client.put_object(
             bucket_name,
             path,
-            cast(BinaryIO, result),
-            -1,
+            cast(BinaryIO, uploaded),
+            size if result is data and size is not None else -1,
             metadata=headers,
             content_type="text/plain",
-            part_size=PART_SIZE,
+            part_size=self.part_size,
+            num_parallel_uploads=self.upload_concurrency,
+        )
+        record_bytes(
+            "write",
+            bucket_name,
+            path,
+            uncompressed=data.bytes_read,
+            compressed=uploaded.bytes_read,
         )
 
         return write_result
@@ -272,6 +401,7 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
         metadata_container: dict[str, str] | None = None,
     ) -> None: ...
 
+    @recorded_operation("read_file")
     def read_file(
         self,
         bucket_name: str,
@@ -295,37 +425,111 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
             for header, value in response.headers.items():
                 if header.startswith("x-amz-meta-"):
                     metadata_key = header.removeprefix("x-amz-meta-")
-                    metadata_container[metadata_key] = value
+                    if metadata_key != ZSTD_DICTIONARY_METADATA_KEY:
+                        metadata_container[metadata_key] = value
 
         reader = cast(IO[bytes], response)
-        if (
+        zstd_dictionary = (
+            response.headers.get(f"x-amz-meta-{ZSTD_DICTIONARY_METADATA_KEY}")
+            if response.headers
+            else None
+        )
+        dctx = None
+        if zstd_dictionary:
+            dctx = zstandard.ZstdDecompressor(
+                dict_data=load_dictionary(self, bucket_name, zstd_dictionary)
+            )
+        elif (
             response.headers
             and not zstd_default
             and response.headers.get("Content-Encoding") == "zstd"
         ):
             # we have to manually decompress zstandard compressed data
-            cctx = zstandard.ZstdDecompressor()
-            # if the object passed to this has a read method then that's
-            # all this object will ever need, since it will just call read
-            # and get the bytes object resulting from it then compress that
-            # HTTPResponse
-            reader = cctx.stream_reader(reader)
-
-        if file_obj:
-            file_obj.seek(0)
-            while chunk := reader.read(CHUNK_SIZE):
-                file_obj.write(chunk)
-            response.close()
-            response.release_conn()
-            return None
-        else:
-            res = BytesIO()
-            while chunk := reader.read(CHUNK_SIZE):
-                res.write(chunk)
+            dctx = zstandard.ZstdDecompressor()
+
+        try:
+            content_length = response.headers.get("Content-Length")
+            content_encoding = response.headers.get("Content-Encoding", "identity")
+            if dctx is None and content_encoding == "identity" and content_length:
+                # the body isn't decoded, so its size is known upfront
+                result = self._read_exact(response, int(content_length), file_obj)
+                read = int(content_length)
+            elif dctx is not None and content_length and not file_obj:
+                # the compressed body isn't decoded by urllib3 either, so it is
+                # read in a single call and then decompressed in another one
+                result = self._decompress(
+                    dctx, self._read_exact(response, int(content_length), None)
+                )
+                read = len(result)
+            else:
+                if dctx is not None:
+                    # if the object passed to this has a read method then that's
+                    # all this object will ever need, since it will just call read
+                    # and get the bytes object resulting from it then compress that
+                    # HTTPResponse
+                    reader = dctx.stream_reader(reader)
+                chunks = []
+                if file_obj:
+                    file_obj.seek(0)
+                read = 0
+                while chunk := reader.read(self.read_buffer_size):
+                    read += len(chunk)
+                    if file_obj:
+                        file_obj.write(chunk)
+                    else:
+                        chunks.append(chunk)
+                result = None if file_obj else b"".join(chunks)
+
+            record_bytes(
+                "read",
+                bucket_name,
+                path,
+                uncompressed=read,
+                compressed=int(content_length) if content_length else None,
+            )
+            return result
+        finally:
             response.close()
             response.release_conn()
-            return res.getvalue()
 
+    @staticmethod
+    def _decompress(dctx: zstandard.ZstdDecompressor, data: bytes) -> bytes:
+        """
+        Decompresses a zstd frame. When the frame records the size of its content
+        (as the ones written by `write_file` with a known size do), its output is
+        allocated once with that size. Otherwise it is decompressed in chunks.
+        """
+        if data and zstandard.frame_content_size(data) >= 0:
+            return dctx.decompress(data)
+        return dctx.decompressobj().decompress(data)
+
+    def _read_exact(
+        self, response: HTTPResponse, length: int, file_obj: BinaryIO | None
+    ) -> bytes | None:
+        """
+        Reads a response body of `length` bytes. Without `file_obj`, the body is
+        read in a single call, which allocates it once. Otherwise it is read with
+        `readinto` into a reused buffer of `read_buffer_size`.
+        """
+        if not file_obj:
+            content = response.read()
+            if len(content) < length:
+                raise IncompleteRead(len(content), length - len(content))
+            return content
+
+        buffer = bytearray(min(length, self.read_buffer_size))
+        view = memoryview(buffer)
+        file_obj.seek(0)
+        read = 0
+        while read < length:
+            n = response.readinto(view)
+            if not n:
+                raise IncompleteRead(read, length - read)
+            file_obj.write(view[:n])
+            read += n
+        return None
+
+    @recorded_operation("delete_file")
     def delete_file(self, bucket_name: str, path: str) -> bool:
         try:
             # delete a file given a bucket name and a path
@@ -338,6 +542,91 @@ class MinioStorageService(BaseStorageService, PresignedURLService):
                 )
             raise e
 
+    def _run_batch(
+        self, fn: Callable[[str], Any], paths: Iterable[str]
+    ) -> tuple[dict[str, Any], dict[str, Exception]]:
+        """
+        Runs `fn` on every path with a bounded thread pool.
+        Returns the results and the errors by path.
+        """
+
+        def run(path: str) -> tuple[str, Any, Exception | None]:
+            try:
+                return path, fn(path), None
+            except Exception as e:
+                return path, None, e
+
+        results, errors = {}, {}
+        paths = list(paths)
+        if not paths:
+            return results, errors
+        with ThreadPoolExecutor(
+            max_workers=min(BATCH_MAX_WORKERS, len(paths))
+        ) as executor:
+            for path, result, error in executor.map(run, paths):
+                if error is None:
+                    results[path] = result
+                else:
+                    errors[path] = error
+        return results, errors
+
+    def read_files(self, bucket_name: str, paths: Iterable[str]) -> dict[str, bytes]:
+        results, errors = self._run_batch(
+            lambda path: self.read_file(bucket_name, path), paths
+        )
+        errors = {
+            path: error
+            for path, error in errors.items()
+            if not isinstance(error, FileNotInStorageError)
+        }
+        if errors:
+            raise BatchStorageError(errors, results)
+        return results
+
+    def write_files(
+        self, bucket_name: str, files: Mapping[str, Any], **write_kwargs
+    ) -> None:
+        _, errors = self._run_batch(
+            lambda path: self.write_file(
+                bucket_name, path, files[path], **write_kwargs
+            ),
+            files.keys(),
+        )
+        if errors:
+            raise BatchStorageError(errors)
+
+    @recorded_operation("delete_files")
+    def delete_files(self, bucket_name: str, paths: Iterable[str]) -> None:
+        # `remove_objects` sends multi-object delete requests of up to 1000 objects
+        # and lazily yields the objects that failed, so it needs to be consumed
+        errors = {}
+        try:
+            for delete_error in self.minio_client.remove_objects(
+                bucket_name, (DeleteObject(path) for path in paths)
+            ):
+                if delete_error.code != "NoSuchKey":
+                    errors[delete_error.name] = MinioException(
+                        f"{delete_error.code}: {delete_error.message}"
+                    )
+        except S3Error as e:
+            if e.code == "NoSuchBucket":
+                return
+            raise
+        if errors:
+            raise BatchStorageError(errors)
+
+    @recorded_operation("get_etag")
+    def get_etag(self, bucket_name: str, path: str) -> str:
+        try:
+            stat = self.minio_client.stat_object(bucket_name, path)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                raise FileNotInStorageError(
+                    f"File {path} does not exist in {bucket_name}"
+                )
+            raise e
+        return stat.etag
+
     def create_presigned_put(self, bucket: str, path: str, expires: int) -> str:
         expires_td = timedelta(seconds=expires)
         return self.minio_client.presigned_put_object(bucket, path, expires_td)
@@ -0,0 +1,105 @@
+import logging
+import threading
+from typing import Iterable
+
+import zstandard
+
+from shared.storage.base import BaseStorageService
+from shared.storage.exceptions import FileNotInStorageError
+
+log = logging.getLogger(__name__)
+
+# Object metadata key holding the name of the dictionary an object was compressed with
+ZSTD_DICTIONARY_METADATA_KEY = "zstd-dictionary"
+# Dictionaries are stored next to the objects they compress, under this prefix
+ZSTD_DICTIONARIES_PREFIX = "zstd_dictionaries"
+# The default dictionary size of the zstd CLI
+DEFAULT_DICTIONARY_SIZE = 112_640
+ZSTD_COMPRESSION_LEVEL = 3
+
+_dictionaries: dict[tuple[str, str], zstandard.ZstdCompressionDict] = {}
+_dictionaries_lock = threading.Lock()
+
+
+def get_dictionary_name(kind: str, version: int) -> str:
+    """
+    Dictionaries are versioned per kind of object (ie. a `MinioEndpoints` name).
+    A trained dictionary is never overwritten, a new version is trained instead,
+    so that objects compressed with previous versions can still be read.
+    """
+    return f"{kind}.v{version}"
+
+
+def get_dictionary_path(name: str) -> str:
+    return f"{ZSTD_DICTIONARIES_PREFIX}/{name}.zdict"
+
+
+def get_cached_dictionary(
+    bucket_name: str, name: str
+) -> zstandard.ZstdCompressionDict | None:
+    return _dictionaries.get((bucket_name, name))
+
+
+def cache_dictionary(
+    bucket_name: str, name: str, data: bytes
+) -> zstandard.ZstdCompressionDict:
+    dictionary = zstandard.ZstdCompressionDict(data)
+    # computing the compression tables once saves doing it for every object
+    dictionary.precompute_compress(level=ZSTD_COMPRESSION_LEVEL)
+    with _dictionaries_lock:
+        return _dictionaries.setdefault((bucket_name, name), dictionary)
+
+
+def load_dictionary(
+    storage: BaseStorageService, bucket_name: str, name: str
+) -> zstandard.ZstdCompressionDict:
+    """
+    Returns the dictionary `name`, reading it from storage on first use.
+    """
+    if (dictionary := get_cached_dictionary(bucket_name, name)) is not None:
+        return dictionary
+    data = storage.read_file(bucket_name, get_dictionary_path(name))
+    return cache_dictionary(bucket_name, name, data)
+
+
+def train_dictionary(
+    storage: BaseStorageService,
+    bucket_name: str,
+    kind: str,
+    version: int,
+    sample_paths: Iterable[str],
+    dict_size: int = DEFAULT_DICTIONARY_SIZE,
+) -> str:
+    """
+    Trains a zstd dictionary on the objects at `sample_paths`, and stores it in
+    `bucket_name` as version `version` for objects of `kind`.
+    Returns the name of the dictionary, which can then be configured in
+    `services.minio.zstd_dictionaries.<kind>` to be used for new objects.
+
+    A few hundred samples representative of the objects of `kind` are needed,
+    and training on more than ~100 times `dict_size` bytes barely helps.
+    """
+    name = get_dictionary_name(kind, version)
+    path = get_dictionary_path(name)
+    try:
+        storage.read_file(bucket_name, path)
+    except FileNotInStorageError:
+        pass
+    else:
+        raise ValueError(f"Dictionary {name} already exists")
+
+    samples = list(storage.read_files(bucket_name, sample_paths).values())
+    dictionary = zstandard.train_dictionary(
+        dict_size, samples, level=ZSTD_COMPRESSION_LEVEL
+    )
+    storage.write_file(bucket_name, path, dictionary.as_bytes())
+    log.info(
+        "Trained zstd dictionary",
+        extra=dict(
+            name=name,
+            samples=len(samples),
+            samples_size=sum(len(sample) for sample in samples),
+            dict_size=len(dictionary.as_bytes()),
+        ),
+    )
+    return name
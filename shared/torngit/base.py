@@ -1,12 +1,25 @@
+import asyncio
 import re
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import httpx
 
 from shared.django_apps.core.models import Repository
+from shared.torngit.client_pool import get_pooled_client
 from shared.torngit.enums import Endpoints
 from shared.torngit.response_types import ProviderPull
+from shared.torngit.retry import RetryPolicy, get_retry_policy
 from shared.typings.oauth_token_types import (
     OauthConsumerToken,
     OnRefreshCallback,
@@ -16,6 +29,40 @@ from shared.typings.torngit import TorngitInstanceData
 
 get_start_of_line = re.compile(r"@@ \-(\d+),?(\d*) \+(\d+),?(\d*).*").match
 
+# How many pages of a paginated endpoint are requested at once
+PAGINATION_CONCURRENCY = 4
+
+T = TypeVar("T")
+
+
+async def fetch_pages_concurrently(
+    fetch_page: Callable[[int], Awaitable[T]],
+    pages: Iterable[int],
+    concurrency: int = PAGINATION_CONCURRENCY,
+) -> AsyncIterator[T]:
+    """
+    Fetches `pages` with `fetch_page`, at most `concurrency` at a time, and yields
+    them in order. The pages still being fetched are cancelled if one of them
+    fails, or if the iteration stops early.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page: int) -> T:
+        async with semaphore:
+            return await fetch_page(page)
+
+    tasks = [asyncio.ensure_future(fetch(page)) for page in pages]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # retrieves the exception, so that it isn't logged as never retrieved
+                task.exception()
+
 
 class TokenType(Enum):
     read = "read"
@@ -37,6 +84,8 @@ class TorngitBaseAdapter(object):
     _on_token_refresh: OnRefreshCallback = None
     _token: Token | None = None
     verify_ssl = None
+    # whether the provider's API is requested over HTTP/2, when available
+    http2 = False
 
     valid_languages = set(language.value for language in Repository.Languages)
 
@@ -78,15 +127,21 @@ class TorngitBaseAdapter(object):
             timeout = httpx.Timeout(timeouts[1], connect=timeouts[0])
         else:
             timeout = httpx.Timeout(self._timeouts[1], connect=self._timeouts[0])
-        return httpx.AsyncClient(
+        return get_pooled_client(
+            getattr(self, "service", None),
             verify=(
                 self.verify_ssl
                 if not isinstance(self.verify_ssl, bool)
                 else self.verify_ssl
             ),
             timeout=timeout,
+            http2=self.http2,
         )
 
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        return get_retry_policy(self.service)
+
     def get_token_by_type(self, token_type: TokenType):
         if self._token_type_mapping.get(token_type) is not None:
             return self._token_type_mapping.get(token_type)
@@ -0,0 +1,151 @@
+import asyncio
+import importlib.util
+from http.cookiejar import CookieJar
+from typing import Any, AsyncGenerator, Hashable
+from weakref import WeakKeyDictionary
+
+import httpx
+
+from shared.config import get_config
+
+# HTTP/2 needs the `h2` package (ie. the `httpx[http2]` extra)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30
+
+
+class _NoCookieJar(CookieJar):
+    """A cookie jar ignoring the cookies set by responses."""
+
+    def extract_cookies(self, response, request) -> None:
+        pass
+
+    def set_cookie(self, cookie) -> None:
+        pass
+
+
+class PooledAsyncClient(httpx.AsyncClient):
+    """
+    An `httpx.AsyncClient` shared by all the adapters of a provider.
+
+    The adapters use their client as `async with self.get_client() as client:`
+    for each API method, so leaving its context keeps it (and its connections)
+    open. Pooled clients are closed by `close_clients` instead, which is done
+    when their event loop shuts down.
+
+    As the adapters sharing a client act for different owners and tokens,
+    cookies set by a response must not be sent with the requests of the
+    others, so pooled clients don't store any.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._cookies = httpx.Cookies(_NoCookieJar())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+
+# Clients are bound to the event loop their connections were opened on
+_clients: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[Hashable, PooledAsyncClient]
+] = WeakKeyDictionary()
+_shutdown_hooks: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncGenerator[None, None]
+] = WeakKeyDictionary()
+
+
+def get_pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=get_config(
+            "setup",
+            "torngit",
+            "max_connections",
+            default=DEFAULT_MAX_CONNECTIONS,
+        ),
+        max_keepalive_connections=get_config(
+            "setup",
+            "torngit",
+            "max_keepalive_connections",
+            default=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        keepalive_expiry=get_config(
+            "setup",
+            "torngit",
+            "keepalive_expiry",
+            default=DEFAULT_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_pooled_client(
+    service: str | None,
+    *,
+    verify: Any,
+    timeout: httpx.Timeout,
+    http2: bool = False,
+) -> httpx.AsyncClient:
+    """
+    Returns the client of the running event loop for `service` (which determines
+    the base URL of the requests) with these TLS settings and timeout, so that
+    its connections are kept alive and reused from one API method to the next.
+
+    Without a running event loop, a new client owning its connections is
+    returned, the way it was before clients were pooled.
+    """
+    http2 = http2 and HTTP2_AVAILABLE
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return httpx.AsyncClient(verify=verify, timeout=timeout, http2=http2)
+
+    _register_shutdown_hook(loop)
+    clients = _clients.setdefault(loop, {})
+    key = (service, verify, tuple(timeout.as_dict().items()), http2)
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = clients[key] = PooledAsyncClient(
+            verify=verify, timeout=timeout, http2=http2, limits=get_pool_limits()
+        )
+    return client
+
+
+async def close_clients() -> None:
+    """
+    Closes the pooled clients of the running event loop.
+
+    This is done when the event loop shuts down its async generators, which
+    `asyncio.run` (and so `asgiref`'s `async_to_sync`) does before closing it.
+    Code running its own event loop must either do the same, with
+    `loop.run_until_complete(loop.shutdown_asyncgens())`, or await this before
+    closing the loop, so that no connection is left open.
+    """
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+async def _close_clients_on_shutdown() -> AsyncGenerator[None, None]:
+    # left suspended until the event loop closes it when shutting down
+    try:
+        yield
+    finally:
+        await close_clients()
+
+
+def _register_shutdown_hook(loop: asyncio.AbstractEventLoop) -> None:
+    if loop in _shutdown_hooks:
+        return
+    hook = _close_clients_on_shutdown()
+    # starting the generator registers it with the running loop, which only
+    # keeps a weak reference to it
+    try:
+        hook.__anext__().send(None)
+    except StopIteration:
+        pass
+    _shutdown_hooks[loop] = hook
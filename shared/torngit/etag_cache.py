@@ -0,0 +1,104 @@
+import hashlib
+from typing import Any
+
+import httpx
+
+from shared.helpers.cache import NO_VALUE, cache, make_hash_sha256
+from shared.metrics import Counter, inc_counter
+
+ETAG_CACHE_TTL = 60 * 60 * 24
+# Larger responses aren't cached, to keep the cache backend (ie. redis) bounded
+ETAG_CACHE_MAX_CONTENT_SIZE = 1024 * 256
+# The headers of the cached responses that are replayed when they are revalidated
+CACHED_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified")
+
+ETAG_CACHE_COUNTER = Counter(
+    "git_provider_etag_cache",
+    "Number of conditional requests made with a cached response",
+    [
+        "service",
+        "result",  # hit (304, served from cache), miss (the response changed)
+    ],
+)
+
+
+def get_token_identity(token: dict | None) -> str:
+    """
+    Identifies who a response was fetched for. Installation tokens expire every
+    hour, so the entity the token belongs to is used when known rather than the
+    token itself, which is hashed so that it doesn't end up in the cache.
+    """
+    if not token:
+        return "anonymous"
+    if token.get("entity_name"):
+        return token["entity_name"]
+    return hashlib.sha256(token["key"].encode()).hexdigest()
+
+
+def get_etag_cache_key(
+    service: str, url: str, accept: str | None, token: dict | None
+) -> str:
+    # Responses vary on the `Accept` and `Authorization` headers
+    return ":".join(
+        [
+            "etag_cache",
+            service,
+            make_hash_sha256((url, accept, get_token_identity(token))),
+        ]
+    )
+
+
+def get_cached_response(key: str) -> dict[str, Any] | None:
+    value = cache.get_backend().get(key)
+    if value is NO_VALUE:
+        return None
+    return value
+
+
+def cache_response(key: str, response: httpx.Response) -> None:
+    """
+    Caches a successful `response` if it has an `ETag` it can be revalidated with.
+    """
+    etag = response.headers.get("ETag")
+    if etag is None or len(response.content) > ETAG_CACHE_MAX_CONTENT_SIZE:
+        return
+    cache.get_backend().set(
+        key,
+        ETAG_CACHE_TTL,
+        {
+            "etag": etag,
+            "status_code": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in CACHED_HEADERS
+                if name in response.headers
+            },
+            "content": response.content,
+        },
+    )
+
+
+def build_cached_response(
+    cached: dict[str, Any], not_modified: httpx.Response
+) -> httpx.Response:
+    """
+    Builds the response a `304 Not Modified` revalidated from the `cached` one.
+    The headers of the `304` (ie. the rate limit ones) take precedence.
+    """
+    headers = httpx.Headers(cached["headers"])
+    headers.update(not_modified.headers)
+    # the cached content is already decoded
+    for name in ("Content-Length", "Content-Encoding", "Transfer-Encoding"):
+        headers.pop(name, None)
+    return httpx.Response(
+        cached["status_code"],
+        headers=headers,
+        content=cached["content"],
+        request=not_modified.request,
+    )
+
+
+def record_revalidation(service: str, hit: bool) -> None:
+    inc_counter(
+        ETAG_CACHE_COUNTER, dict(service=service, result="hit" if hit else "miss")
+    )
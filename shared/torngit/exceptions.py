@@ -73,6 +73,12 @@ class TorngitServer5xxCodeError(TorngitServerFailureError):
     pass
 
 
+class TorngitCircuitOpenError(TorngitServerFailureError):
+    """
+    Requests to the provider are stopped for a while, after it failed repeatedly.
+    """
+
+
 class TorngitRefreshTokenFailedError(TorngitError):
     def __init__(self, message) -> None:
         self._code = 555
@@ -1,12 +1,15 @@
+import asyncio
 import base64
 import hashlib
 import logging
 import os
+import re
 from base64 import b64decode
 from datetime import datetime, timezone
 from string import Template
-from typing import Dict, List, Optional
-from urllib.parse import parse_qs, urlencode
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+from weakref import WeakKeyDictionary
 
 import httpx
 import sentry_sdk
@@ -19,9 +22,22 @@ from shared.helpers.redis import get_redis_connection
 from shared.metrics import Counter
 from shared.rate_limits import set_entity_to_rate_limited
 from shared.rollouts.features import INCLUDE_GITHUB_COMMENT_ACTIONS_BY_OWNER
-from shared.torngit.base import TokenType, TorngitBaseAdapter
+from shared.torngit.base import (
+    TokenType,
+    TorngitBaseAdapter,
+    fetch_pages_concurrently,
+)
 from shared.torngit.enums import Endpoints
+from shared.torngit.etag_cache import (
+    build_cached_response,
+    cache_response,
+    get_cached_response,
+    get_etag_cache_key,
+    get_token_identity,
+    record_revalidation,
+)
 from shared.torngit.exceptions import (
+    TorngitCircuitOpenError,
     TorngitClientError,
     TorngitClientGeneralError,
     TorngitMisconfiguredCredentials,
@@ -43,6 +59,11 @@ log = logging.getLogger(__name__)
 
 METRICS_PREFIX = "services.torngit.github"
 
+# Concurrent lookups are coalesced into a GraphQL query for this many seconds...
+GRAPHQL_BATCH_WINDOW = 0.01
+# ...unless this many are already waiting for it
+GRAPHQL_BATCH_MAX_SIZE = 50
+
 
 GITHUB_API_CALL_COUNTER = Counter(
     "git_provider_api_calls_github",
@@ -131,7 +152,7 @@ GITHUB_API_ENDPOINTS = {
         "enterprise_counter": GITHUB_E_API_CALL_COUNTER.labels(
             endpoint="get_repo_languages"
         ),
-        "url_template": Template("/repos/${slug}/languages"),
+        "url_template": Template("/graphql"),
     },
     "get_check_suites": {
         "counter": GITHUB_API_CALL_COUNTER.labels(endpoint="get_check_suites"),
@@ -499,9 +520,9 @@ query GetReposFromNodeIds($node_ids: [ID!]!) {
     }
 }
 """,
-        OWNER_FROM_NODEID="""
-query GetOwnerFromNodeId($node_id: ID!) {
-    node(id: $node_id) {
+        OWNERS_FROM_NODEIDS="""
+query GetOwnersFromNodeIds($node_ids: [ID!]!) {
+    nodes(ids: $node_ids) {
         __typename
         ... on Organization {
             login
@@ -545,6 +566,21 @@ query Repos($owner: String!, $cursor: String, $first: Int!) {
 """,
     )
 
+    # Fields looked up for several objects at once, each aliased in a single query
+    # (see `prepare_batch`), with the types of their variables
+    _batched_fields = dict(
+        REPO_LANGUAGES=(
+            {"owner": "String!", "name": "String!"},
+            """repository(owner: $owner, name: $name) {
+        languages(first: 100, orderBy: {field: SIZE, direction: DESC}) {
+            nodes {
+                name
+            }
+        }
+    }""",
+        ),
+    )
+
     def get(self, query_name: str) -> str | None:
         return self._queries.get(query_name, None)
 
@@ -555,9 +591,120 @@ query Repos($owner: String!, $cursor: String, $first: Int!) {
             return {"query": query, "variables": variables}
         return None
 
+    def prepare_batch(self, field_name: str, variables: List[dict]) -> dict | None:
+        """
+        Prepares a query looking up the `field_name` field once for each of the
+        `variables`. The lookup of `variables[i]` is aliased as `batch_<i>`.
+        """
+        batched_field = self._batched_fields.get(field_name)
+        if batched_field is None:
+            return None
+        variable_types, field = batched_field
+        declarations, fields, query_variables = [], [], {}
+        for index, field_variables in enumerate(variables):
+            for name, variable_type in variable_types.items():
+                declarations.append(f"${name}_{index}: {variable_type}")
+                query_variables[f"{name}_{index}"] = field_variables[name]
+            aliased_field = re.sub(r"\$(\w+)", rf"$\g<1>_{index}", field)
+            fields.append(f"    batch_{index}: {aliased_field}")
+        query_name = "".join(part.title() for part in field_name.split("_"))
+        query = "query Batch%s(%s) {\n%s\n}\n" % (
+            query_name,
+            ", ".join(declarations),
+            "\n".join(fields),
+        )
+        return {"query": query, "variables": query_variables}
+
+
+class GraphQLBatch:
+    """
+    Lookups of the same GraphQL field made with the same token, coalesced into a
+    single aliased query sent `window` seconds after the first lookup, or as soon
+    as the batch has `max_size` lookups. Lookups made after it is sent go into a
+    new batch (see `Github._get_graphql_batch`).
+
+    `fetch` sends the query for a list of variables, and returns the result of
+    each lookup in the same order, or the exception it raises.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[List[dict]], Awaitable[list]],
+        window: float = GRAPHQL_BATCH_WINDOW,
+        max_size: int = GRAPHQL_BATCH_MAX_SIZE,
+    ):
+        self.fetch = fetch
+        self.window = window
+        self.max_size = max_size
+        self.is_sent = False
+        self._lookups: dict[tuple, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def load(self, variables: dict) -> Any:
+        key = tuple(sorted(variables.items()))
+        future = self._lookups.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._lookups[key] = loop.create_future()
+            if len(self._lookups) >= self.max_size:
+                self._send()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._send)
+        # so that a cancelled lookup doesn't cancel the others of the batch
+        return await asyncio.shield(future)
+
+    def _send(self) -> None:
+        if self.is_sent:
+            return
+        self.is_sent = True
+        if self._timer is not None:
+            self._timer.cancel()
+        task = asyncio.ensure_future(self._run())
+        _graphql_batch_tasks.add(task)
+        task.add_done_callback(_graphql_batch_tasks.discard)
+
+    async def _run(self) -> None:
+        keys = list(self._lookups)
+        try:
+            results = await self.fetch([dict(key) for key in keys])
+        except Exception as exc:
+            for future in self._lookups.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key, result in zip(keys, results):
+            future = self._lookups[key]
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# The batches that lookups are added to, by event loop, and the ones being sent
+_graphql_batches: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[Hashable, GraphQLBatch]
+] = WeakKeyDictionary()
+_graphql_batch_tasks: set[asyncio.Task] = set()
+
+
+def get_last_page_number(response: Response) -> int | None:
+    """
+    The number of the last page of a paginated response, from its `Link` header.
+    """
+    last_url = response.links.get("last", {}).get("url")
+    if not last_url:
+        return None
+    page = parse_qs(urlparse(last_url).query).get("page")
+    if not page or not page[0].isdigit():
+        return None
+    return int(page[0])
+
 
 class Github(TorngitBaseAdapter):
     service = "github"
+    http2 = True
     graphql = GitHubGraphQLQueries()
 
     def __init__(self, *args, **kwargs):
@@ -641,6 +788,10 @@ class Github(TorngitBaseAdapter):
         """
         Makes a single http request to GitHub and returns the parsed response
         """
+        response = await self._api_response(*args, token=token, **kwargs)
+        return self._parse_response(response)
+
+    async def _api_response(self, *args, token=None, **kwargs) -> Response:
         token_to_use = token or self.token
 
         log.info(
@@ -654,8 +805,46 @@ class Github(TorngitBaseAdapter):
 
         if not token_to_use:
             raise TorngitMisconfiguredCredentials()
-        response = await self.make_http_call(*args, token_to_use=token_to_use, **kwargs)
-        return self._parse_response(response)
+        return await self.make_http_call(*args, token_to_use=token_to_use, **kwargs)
+
+    async def _fetch_all_pages(
+        self,
+        fetch_page: Callable[[int], Awaitable[Response]],
+        is_last_page: Callable[[Any], bool],
+        max_pages: int | None = None,
+    ) -> list:
+        """
+        Fetches all the pages of a paginated endpoint with `fetch_page`, which
+        requests a given page number, and returns them parsed and in order.
+
+        When the first page links to the last one, the other pages are fetched
+        concurrently. Otherwise they are fetched one after the other, until
+        `is_last_page` is true for a page.
+        """
+        response = await fetch_page(1)
+        pages = [self._parse_response(response)]
+        last_page = get_last_page_number(response)
+        if last_page is not None:
+            if max_pages is not None:
+                last_page = min(last_page, max_pages)
+
+            async def fetch_parsed_page(page: int):
+                return self._parse_response(await fetch_page(page))
+
+            pages.extend(
+                [
+                    page
+                    async for page in fetch_pages_concurrently(
+                        fetch_parsed_page, range(2, last_page + 1)
+                    )
+                ]
+            )
+        else:
+            while not is_last_page(pages[-1]) and (
+                max_pages is None or len(pages) < max_pages
+            ):
+                pages.append(self._parse_response(await fetch_page(len(pages) + 1)))
+        return pages
 
     async def paginated_api_generator(
         self, client, method, url_name, token=None, **kwargs
@@ -820,23 +1009,46 @@ class Github(TorngitBaseAdapter):
         elif url.startswith(self.service_url) and self.host_header is not None:
             _headers["Host"] = self.host_header
 
+        # GET responses are revalidated with their ETag, as GitHub doesn't count
+        # `304 Not Modified` responses against the rate limit
+        etag_cache_key = cached_response = None
+        if method == "GET":
+            etag_cache_key = get_etag_cache_key(
+                self.service, url, _headers.get("Accept"), token_to_use
+            )
+            cached_response = get_cached_response(etag_cache_key)
+            if cached_response is not None:
+                _headers["If-None-Match"] = cached_response["etag"]
+
         kwargs = dict(
             json=body if body else None, headers=_headers, follow_redirects=False
         )
-        max_number_retries = 3
+        retry_policy = self.retry_policy
+        retry_policy.record_request()
+        max_number_retries = retry_policy.max_attempts
         tried_refresh = False
         for current_retry in range(1, max_number_retries + 1):
             retry_reason = "retriable_status"
+            if not retry_policy.circuit_breaker.allow_request():
+                raise TorngitCircuitOpenError(
+                    "GitHub is failing, requests are paused for a while."
+                )
             try:
                 res = await client.request(method, url, **kwargs)
+                if res.status_code >= 500:
+                    retry_policy.circuit_breaker.record_failure()
+                else:
+                    retry_policy.circuit_breaker.record_success()
                 if current_retry > 1:
                     # count retries without getting a url
                     self.count_and_get_url_template(url_name="make_http_call_retry")
+                not_modified = res.status_code == 304 and cached_response is not None
+                is_error = res.status_code >= 300 and not not_modified
                 logged_body = None
-                if res.status_code >= 300 and res.text is not None:
+                if is_error and res.text is not None:
                     logged_body = res.text
                 log.log(
-                    logging.WARNING if res.status_code >= 300 else logging.INFO,
+                    logging.WARNING if is_error else logging.INFO,
                     "Github HTTP %s",
                     res.status_code,
                     extra=dict(
@@ -851,19 +1063,26 @@ class Github(TorngitBaseAdapter):
                     ),
                 )
             except (httpx.TimeoutException, httpx.NetworkError):
-                if current_retry < max_number_retries:
+                retry_policy.circuit_breaker.record_failure()
+                delay = retry_policy.get_retry_delay(current_retry)
+                if delay is not None:
                     log.warning(
                         "GitHub was not able to be reached, retrying",
                         extra=dict(
                             current_retry=current_retry,
+                            delay=delay,
                             **log_dict,
                         ),
                     )
+                    await asyncio.sleep(delay)
                     continue
                 else:
                     raise TorngitServerUnreachableError(
                         "GitHub was not able to be reached."
                     )
+            if not_modified:
+                record_revalidation(self.service, hit=True)
+                return build_cached_response(cached_response, res)
             # Github doesn't have any specific message for trying to use an expired token
             # on top of that they return 404 for certain endpoints (not 401).
             # So this is the little heuristics that we follow to decide on refreshing a token
@@ -930,6 +1149,22 @@ class Github(TorngitBaseAdapter):
                     _headers["Authorization"] = f"{prefix} {fallback_token_key}"
                     retry_reason = "fallback_token_attempt"
                     continue
+                elif (
+                    not is_primary_rate_limit
+                    and (
+                        delay := retry_policy.get_retry_delay(
+                            current_retry, retry_after
+                        )
+                    )
+                    is not None
+                ):
+                    # secondary rate limits are short-lived, wait them out
+                    log.info(
+                        "Waiting out GitHub secondary rate limit",
+                        extra=dict(delay=delay, **log_dict),
+                    )
+                    await asyncio.sleep(delay)
+                    continue
                 else:
                     message = f"Github API rate limit error: {res.reason_phrase if is_primary_rate_limit else 'secondary rate limit'}"
                     raise TorngitRateLimitError(
@@ -944,6 +1179,12 @@ class Github(TorngitBaseAdapter):
                 not statuses_to_retry
                 or res.status_code not in statuses_to_retry
                 or current_retry >= max_number_retries  # Last retry
+                or (
+                    delay := retry_policy.get_retry_delay(
+                        current_retry, res.headers.get("Retry-After")
+                    )
+                )
+                is None
             ):
                 if res.status_code == 599:
                     raise TorngitServerUnreachableError(
@@ -961,14 +1202,22 @@ class Github(TorngitBaseAdapter):
                     raise TorngitClientGeneralError(
                         res.status_code, response_data=res.text, message=message
                     )
+                if etag_cache_key is not None and res.status_code == 200:
+                    if cached_response is not None:
+                        record_revalidation(self.service, hit=False)
+                    cache_response(etag_cache_key, res)
                 return res
             else:
                 log.info(
                     "Retrying request to GitHub",
                     extra=dict(
-                        status=res.status_code, retry_reason=retry_reason, **log_dict
+                        status=res.status_code,
+                        retry_reason=retry_reason,
+                        delay=delay,
+                        **log_dict,
                     ),
                 )
+                await asyncio.sleep(delay)
 
     async def refresh_token(
         self, client: httpx.AsyncClient, original_url: str
@@ -1045,15 +1294,13 @@ class Github(TorngitBaseAdapter):
     async def get_branches(self, token=None):
         async with self.get_client() as client:
             token = self.get_token_by_type_if_none(token, TokenType.read)
+
             # https://developer.github.com/v3/repos/#list-branches
-            page = 0
-            branches = []
-            while True:
-                page += 1
+            async def fetch_page(page: int) -> Response:
                 url = self.count_and_get_url_template(
                     url_name="get_branches"
                 ).substitute(slug=self.slug)
-                res = await self.api(
+                return await self._api_response(
                     client,
                     "get",
                     url,
@@ -1061,12 +1308,11 @@ class Github(TorngitBaseAdapter):
                     page=page,
                     token=token,
                 )
-                if len(res) == 0:
-                    break
-                branches.extend([(b["name"], b["commit"]["sha"]) for b in res])
-                if len(res) < 100:
-                    break
-            return branches
+
+            pages = await self._fetch_all_pages(
+                fetch_page, is_last_page=lambda res: len(res) < 100
+            )
+            return [(b["name"], b["commit"]["sha"]) for res in pages for b in res]
 
     async def get_branch(self, branch_name: str, token=None):
         async with self.get_client() as client:
@@ -1250,18 +1496,28 @@ class Github(TorngitBaseAdapter):
     async def _fetch_page_of_repos(
         self, client, username, token, page_size=100, page=1
     ):
+        response = await self._request_page_of_repos(
+            client, username, token, page_size=page_size, page=page
+        )
+        return self._process_page_of_repos(
+            self._parse_response(response), username, page_size=page_size, page=page
+        )
+
+    async def _request_page_of_repos(
+        self, client, username, token, page_size=100, page=1
+    ) -> Response:
         # https://developer.github.com/v3/repos/#list-your-repositories
         if username is None:
             url = self.count_and_get_url_template(
                 url_name="fetch_page_of_repos_without_username"
             ).substitute(page_size=page_size, page=page)
-            repos = await self.api(client, "get", url, token=token)
         else:
             url = self.count_and_get_url_template(
                 url_name="fetch_page_of_repos_with_username"
             ).substitute(username=username, page_size=page_size, page=page)
-            repos = await self.api(client, "get", url, token=token)
+        return await self._api_response(client, "get", url, token=token)
 
+    def _process_page_of_repos(self, repos, username, page_size, page):
         log.info(
             "Fetched page of repos",
             extra=dict(
@@ -1274,16 +1530,24 @@ class Github(TorngitBaseAdapter):
 
         return self._process_repository_page(repos)
 
-    async def _get_owner_from_nodeid(self, client, token, owner_node_id: str):
+    async def _get_owners_from_nodeids(
+        self, client, token, owner_node_ids: List[str]
+    ) -> dict[str, dict]:
         query = self.graphql.prepare(
-            "OWNER_FROM_NODEID", variables={"node_id": owner_node_id}
+            "OWNERS_FROM_NODEIDS", variables={"node_ids": owner_node_ids}
         )
         url = self.count_and_get_url_template(
             url_name="get_owner_from_nodeid_graphql"
         ).substitute()
         res = await self.api(client, "post", url, body=query, token=token)
-        owner_data = res["data"]["node"]
-        return {"username": owner_data["login"], "service_id": owner_data["databaseId"]}
+        return {
+            node_id: {
+                "username": owner_data["login"],
+                "service_id": owner_data["databaseId"],
+            }
+            for node_id, owner_data in zip(owner_node_ids, res["data"]["nodes"])
+            if owner_data is not None
+        }
 
     async def get_repos_from_nodeids_generator(
         self, repo_node_ids: List[str], expected_owner_username, *, token=None
@@ -1311,6 +1575,7 @@ class Github(TorngitBaseAdapter):
                     url_name="get_repos_from_nodeids_generator_graphql"
                 ).substitute()
                 res = await self.api(client, "post", url, body=query, token=token)
+                repos = []
                 for raw_repo_data in res["data"]["nodes"]:
                     if (
                         raw_repo_data is None
@@ -1334,19 +1599,31 @@ class Github(TorngitBaseAdapter):
                             "username": raw_repo_data["owner"]["login"],
                         },
                     }
-                    is_expected_owner = (
+                    repo["owner"]["is_expected_owner"] = (
                         repo["owner"]["username"] == expected_owner_username
                     )
-                    if not is_expected_owner:
-                        ownerid = repo["owner"]["node_id"]
-                        if ownerid not in owners_seen:
-                            owner_info = await self._get_owner_from_nodeid(
-                                client, token, ownerid
-                            )
-                            owners_seen[ownerid] = owner_info
-                        repo["owner"] = {**repo["owner"], **owners_seen[ownerid]}
-
-                    repo["owner"]["is_expected_owner"] = is_expected_owner
+                    repos.append(repo)
+
+                # The owners of the chunk that weren't seen yet are looked up at once
+                unseen_owner_ids = list(
+                    dict.fromkeys(
+                        repo["owner"]["node_id"]
+                        for repo in repos
+                        if not repo["owner"]["is_expected_owner"]
+                        and repo["owner"]["node_id"] not in owners_seen
+                    )
+                )
+                if unseen_owner_ids:
+                    owners_seen.update(
+                        await self._get_owners_from_nodeids(
+                            client, token, unseen_owner_ids
+                        )
+                    )
+                for repo in repos:
+                    if not repo["owner"]["is_expected_owner"]:
+                        repo["owner"].update(
+                            owners_seen.get(repo["owner"]["node_id"], {})
+                        )
                     yield repo
 
     async def list_repos_using_installation(self, username=None):
@@ -1386,22 +1663,24 @@ class Github(TorngitBaseAdapter):
         the same endpoint.
         """
         token = self.get_token_by_type_if_none(token, TokenType.read)
-        page = 0
         page_size = 50
-        data = []
         async with self.get_client() as client:
-            while True:
-                page += 1
-                repos = await self._fetch_page_of_repos(
+
+            async def fetch_page(page: int) -> Response:
+                return await self._request_page_of_repos(
                     client, username, token, page=page, page_size=page_size
                 )
 
-                data.extend(repos)
-
-                if len(repos) < page_size:
-                    break
-
-            return data
+            pages = await self._fetch_all_pages(
+                fetch_page, is_last_page=lambda repos: len(repos) < page_size
+            )
+            return [
+                repo
+                for page, repos in enumerate(pages, 1)
+                for repo in self._process_page_of_repos(
+                    repos, username, page_size=page_size, page=page
+                )
+            ]
 
     async def list_repos_generator(
         self, username=None, token=None, using_installation=False
@@ -1473,16 +1752,21 @@ class Github(TorngitBaseAdapter):
     async def list_teams(self, token=None):
         token = self.get_token_by_type_if_none(token, TokenType.admin)
         # https://developer.github.com/v3/orgs/#list-your-organizations
-        page, data = 0, []
+        data = []
         async with self.get_client() as client:
-            while True:
-                page += 1
+
+            async def fetch_page(page: int) -> Response:
                 url = self.count_and_get_url_template(
                     url_name="list_teams"
                 ).substitute()
-                orgs = await self.api(client, "get", url, page=page, token=token)
-                if len(orgs) == 0:
-                    break
+                return await self._api_response(
+                    client, "get", url, page=page, token=token
+                )
+
+            pages = await self._fetch_all_pages(
+                fetch_page, is_last_page=lambda orgs: len(orgs) < 30
+            )
+            for orgs in pages:
                 # organization names
                 for org in orgs:
                     try:
@@ -1504,8 +1788,6 @@ class Github(TorngitBaseAdapter):
                             "Unable to load organization",
                             extra=dict(url=organization["url"]),
                         )
-                if len(orgs) < 30:
-                    break
 
             return data
 
@@ -1521,24 +1803,26 @@ class Github(TorngitBaseAdapter):
         # NOTE limited to 250 commits
         # NOTE page max size is 100
         # Which means we have to fetch at most 3 pages
-        all_commits = []
         MAX_RESULTS_PER_PAGE = 100
         async with self.get_client() as client:
-            for page_number in [1, 2, 3]:
+
+            async def fetch_page(page: int) -> Response:
                 url = self.count_and_get_url_template(
                     url_name="get_raw_pull_request_commits"
                 ).substitute(
                     slug=self.slug,
                     pullid=pullid,
                     max=MAX_RESULTS_PER_PAGE,
-                    page_n=page_number,
+                    page_n=page,
                 )
-                page_results = await self.api(client, "get", url, token=token)
-                if len(page_results):
-                    all_commits.extend(page_results)
-                if len(page_results) < MAX_RESULTS_PER_PAGE:
-                    break
-        return all_commits
+                return await self._api_response(client, "get", url, token=token)
+
+            pages = await self._fetch_all_pages(
+                fetch_page,
+                is_last_page=lambda commits: len(commits) < MAX_RESULTS_PER_PAGE,
+                max_pages=3,
+            )
+        return [commit for commits in pages for commit in commits]
 
     # Webhook
     # -------
@@ -1714,16 +1998,13 @@ class Github(TorngitBaseAdapter):
 
     async def get_commit_statuses(self, commit, token=None):
         token = self.get_token_by_type_if_none(token, TokenType.status)
-        page = 0
-        statuses = []
         async with self.get_client() as client:
-            while True:
-                page += 1
-                # https://developer.github.com/v3/repos/statuses/#list-statuses-for-a-specific-ref
+            # https://developer.github.com/v3/repos/statuses/#list-statuses-for-a-specific-ref
+            async def fetch_page(page: int) -> Response:
                 url = self.count_and_get_url_template(
                     url_name="get_commit_statuses"
                 ).substitute(slug=self.slug, commit=commit)
-                res = await self.api(
+                return await self._api_response(
                     client,
                     "get",
                     url,
@@ -1731,21 +2012,22 @@ class Github(TorngitBaseAdapter):
                     per_page=100,
                     token=token,
                 )
-                provided_statuses = res.get("statuses", [])
-                statuses.extend(
-                    [
-                        {
-                            "time": s["updated_at"],
-                            "state": s["state"],
-                            "description": s["description"],
-                            "url": s["target_url"],
-                            "context": s["context"],
-                        }
-                        for s in provided_statuses
-                    ]
-                )
-                if len(provided_statuses) < 100:
-                    break
+
+            pages = await self._fetch_all_pages(
+                fetch_page,
+                is_last_page=lambda res: len(res.get("statuses", [])) < 100,
+            )
+        statuses = [
+            {
+                "time": s["updated_at"],
+                "state": s["state"],
+                "description": s["description"],
+                "url": s["target_url"],
+                "context": s["context"],
+            }
+            for res in pages
+            for s in res.get("statuses", [])
+        ]
         return Status(statuses)
 
     # Source
@@ -2017,14 +2299,13 @@ class Github(TorngitBaseAdapter):
     async def get_pull_requests(self, state="open", token=None):
         token = self.get_token_by_type_if_none(token, TokenType.pull)
         # https://developer.github.com/v3/pulls/#list-pull-requests
-        page, pulls = 0, []
         async with self.get_client() as client:
-            while True:
-                page += 1
+
+            async def fetch_page(page: int) -> Response:
                 url = self.count_and_get_url_template(
                     url_name="get_pull_requests"
                 ).substitute(slug=self.slug)
-                res = await self.api(
+                return await self._api_response(
                     client,
                     "get",
                     url,
@@ -2033,15 +2314,11 @@ class Github(TorngitBaseAdapter):
                     state=state,
                     token=token,
                 )
-                if len(res) == 0:
-                    break
 
-                pulls.extend([pull["number"] for pull in res])
-
-                if len(pulls) < 25:
-                    break
-
-            return pulls
+            pages = await self._fetch_all_pages(
+                fetch_page, is_last_page=lambda res: len(res) < 25
+            )
+            return [pull["number"] for res in pages for pull in res]
 
     async def find_pull_request(
         self, commit=None, branch=None, state="open", token=None
@@ -2201,21 +2478,109 @@ class Github(TorngitBaseAdapter):
             res = await self.api(client, "get", url, token=token)
             return res
 
+    def _get_graphql_batch(self, field_name: str, url_name: str, token) -> GraphQLBatch:
+        """
+        The batch of `field_name` lookups made with `token` that a lookup can be
+        added to, which is shared by all the adapters of the event loop.
+        """
+        batches = _graphql_batches.setdefault(asyncio.get_running_loop(), {})
+        key = (field_name, self.api_url, get_token_identity(token))
+        batch = batches.get(key)
+        if batch is None or batch.is_sent:
+
+            async def fetch(variables: List[dict]) -> list:
+                query = self.graphql.prepare_batch(field_name, variables)
+                url = self.count_and_get_url_template(url_name=url_name).substitute()
+                async with self.get_client() as client:
+                    response = await self._api_response(
+                        client, "post", url, body=query, token=token
+                    )
+                return self._get_graphql_batch_results(response, len(variables))
+
+            batch = batches[key] = GraphQLBatch(fetch)
+        return batch
+
+    def _get_graphql_batch_results(self, response: Response, size: int) -> list:
+        """
+        The result of each of the `size` lookups of a batched query, which is `None`
+        for objects that weren't found, or the error the lookup failed with.
+
+        GraphQL errors come with a `200` status: those of a lookup have the alias of
+        the lookup as `path`, while a query that failed as a whole has no `data`.
+        """
+        res = self._parse_response(response)
+        errors = res.get("errors") or []
+        if res.get("data") is None:
+            if any(error.get("type") == "RATE_LIMITED" for error in errors):
+                raise TorngitRateLimitError(
+                    response_data=res,
+                    message="Github API rate limit error: graphql",
+                    reset=response.headers.get("X-RateLimit-Reset"),
+                )
+            raise TorngitClientGeneralError(
+                response.status_code, response_data=res, message="GraphQL query failed"
+            )
+
+        errors_by_alias = {}
+        for error in errors:
+            alias = (error.get("path") or [None])[0]
+            errors_by_alias.setdefault(alias, []).append(error)
+        # errors that don't belong to a lookup fail all of them
+        query_errors = [
+            error
+            for alias, alias_errors in errors_by_alias.items()
+            if not (isinstance(alias, str) and alias.startswith("batch_"))
+            for error in alias_errors
+        ]
+
+        results = []
+        for index in range(size):
+            alias = f"batch_{index}"
+            alias_errors = query_errors + errors_by_alias.get(alias, [])
+            if alias_errors and any(
+                error.get("type") != "NOT_FOUND" for error in alias_errors
+            ):
+                results.append(
+                    TorngitClientGeneralError(
+                        response.status_code,
+                        response_data=alias_errors,
+                        message="; ".join(
+                            error.get("message", "GraphQL error")
+                            for error in alias_errors
+                        ),
+                    )
+                )
+            else:
+                results.append(res["data"].get(alias))
+        return results
+
     # TODO: deprecated - favour the get_repos_with_languages_graphql() method instead
     async def get_repo_languages(self, token=None) -> List[str]:
         """
         Gets the languages belonging to this repository.
+        The lookups of concurrent calls are made in a single GraphQL query.
         Reference:
-            https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-repository-languages
+            https://docs.github.com/en/graphql/reference/objects#repository
         Returns:
             List[str]: A list of language names
         """
-        async with self.get_client() as client:
-            url = self.count_and_get_url_template(
-                url_name="get_repo_languages"
-            ).substitute(slug=self.slug)
-            res = await self.api(client, "get", url, token=token)
-        return list(k.lower() for k in res.keys())
+        token = token or self.token
+        if not token:
+            raise TorngitMisconfiguredCredentials()
+        batch = self._get_graphql_batch(
+            "REPO_LANGUAGES", url_name="get_repo_languages", token=token
+        )
+        repo = await batch.load(
+            {
+                "owner": self.data["owner"]["username"],
+                "name": self.data["repo"]["name"],
+            }
+        )
+        if repo is None:
+            raise TorngitObjectNotFoundError(
+                response_data=None, message=f"Repo {self.slug} not found"
+            )
+        return [language["name"].lower() for language in repo["languages"]["nodes"]]
 
     async def get_repos_with_languages_graphql(
         self, owner_username: str, token=None, first=100
@@ -10,10 +10,15 @@ import httpx
 
 from shared.config import get_config
 from shared.metrics import Counter
-from shared.torngit.base import TokenType, TorngitBaseAdapter
+from shared.torngit.base import (
+    TokenType,
+    TorngitBaseAdapter,
+    fetch_pages_concurrently,
+)
 from shared.torngit.enums import Endpoints
 from shared.torngit.exceptions import (
     TorngitCantRefreshTokenError,
+    TorngitCircuitOpenError,
     TorngitClientError,
     TorngitClientGeneralError,
     TorngitObjectNotFoundError,
@@ -431,15 +436,24 @@ class Gitlab(TorngitBaseAdapter):
             body = json.dumps(body)
         url = url_concat(url_path, args).replace(" ", "%20")
 
+        circuit_breaker = self.retry_policy.circuit_breaker
         max_retries = 2
         for current_retry in range(1, max_retries + 1):
             if token or self.token:
                 headers["Authorization"] = "Bearer %s" % (token or self.token)["key"]
 
+            if not circuit_breaker.allow_request():
+                raise TorngitCircuitOpenError(
+                    "GitLab is failing, requests are paused for a while."
+                )
             try:
                 res = await client.request(
                     method.upper(), url, headers=headers, data=body
                 )
+                if res.status_code >= 500:
+                    circuit_breaker.record_failure()
+                else:
+                    circuit_breaker.record_success()
                 if current_retry > 1:
                     # count retries without getting a url
                     self.count_and_get_url_template("fetch_and_handle_errors_retry")
@@ -477,6 +491,7 @@ class Gitlab(TorngitBaseAdapter):
                     # Success case
                     return res
             except (httpx.TimeoutException, httpx.NetworkError):
+                circuit_breaker.record_failure()
                 raise TorngitServerUnreachableError(
                     "GitLab was not able to be reached. Gateway 502. Please try again."
                 )
@@ -540,36 +555,59 @@ class Gitlab(TorngitBaseAdapter):
         max_number_of_pages=None,
         token=None,
     ):
-        current_page = None
-        has_more = True
-        count_so_far = 0
+        """
+        Yields the pages of `base_url`. When the first page tells the total number
+        of pages (GitLab leaves `X-Total-Pages` out for large collections), the
+        following pages are fetched concurrently, and still yielded in order.
+        """
+        if max_number_of_pages is not None and max_number_of_pages < 1:
+            return
 
         async with self.get_client() as client:
-            while has_more and (
-                max_number_of_pages is None or count_so_far < max_number_of_pages
-            ):
+
+            async def fetch_page(page):
                 current_kwargs = dict(per_page=max_per_page, **default_kwargs)
-                if current_page is not None:
-                    current_kwargs["page"] = current_page
-                current_result = await self.fetch_and_handle_errors(
+                if page is not None:
+                    current_kwargs["page"] = page
+                return await self.fetch_and_handle_errors(
                     client, "GET", base_url, **current_kwargs
                 )
+
+            async def fetch_next_page(page):
+                result = await fetch_page(page)
+                # count calls after initial call
+                self.count_and_get_url_template(counter_name)
+                return None if result.status_code == 204 else result.json()
+
+            current_result = await fetch_page(None)
+            count_so_far = 1
+            yield None if current_result.status_code == 204 else current_result.json()
+
+            current_page = current_result.headers.get("X-Next-Page")
+            total_pages = current_result.headers.get("X-Total-Pages")
+            if current_page and total_pages and total_pages.isdigit():
+                last_page = int(total_pages)
+                if max_number_of_pages is not None:
+                    last_page = min(
+                        last_page, int(current_page) + max_number_of_pages - 2
+                    )
+                async for page in fetch_pages_concurrently(
+                    fetch_next_page, range(int(current_page), last_page + 1)
+                ):
+                    yield page
+                return
+
+            while current_page and (
+                max_number_of_pages is None or count_so_far < max_number_of_pages
+            ):
+                current_result = await fetch_page(current_page)
                 count_so_far += 1
-                if count_so_far > 1:
-                    # count calls after initial call
-                    self.count_and_get_url_template(counter_name)
+                # count calls after initial call
+                self.count_and_get_url_template(counter_name)
                 yield (
                     None if current_result.status_code == 204 else current_result.json()
                 )
-                if (
-                    max_number_of_pages is not None
-                    and count_so_far >= max_number_of_pages
-                ):
-                    has_more = False
-                elif current_result.headers.get("X-Next-Page"):
-                    current_page, has_more = current_result.headers["X-Next-Page"], True
-                else:
-                    current_page, has_more = None, False
+                current_page = current_result.headers.get("X-Next-Page")
 
     async def get_authenticated_user(self, code, redirect_uri=None):
         """
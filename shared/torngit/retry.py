@@ -0,0 +1,231 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from shared.metrics import Counter, inc_counter
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.25
+DEFAULT_MAX_DELAY = 5
+# A longer `Retry-After` fails the request, rather than holding the task that long
+MAX_RETRY_AFTER = 30
+
+# Retries are limited to this share of the requests...
+RETRY_BUDGET_RATIO = 0.2
+# ...on top of this many retries per second
+RETRY_BUDGET_MIN_PER_SECOND = 1
+RETRY_BUDGET_MAX_TOKENS = 50
+
+# A provider's circuit opens after this many failures in a row...
+CIRCUIT_FAILURE_THRESHOLD = 10
+# ...and lets a request through again after this many seconds
+CIRCUIT_RESET_TIMEOUT = 30
+
+TORNGIT_RETRIES = Counter(
+    "git_provider_retries",
+    "Number of requests to git providers that were retried or could have been",
+    [
+        "service",
+        "outcome",  # retried, budget_exhausted, retry_after_too_long
+    ],
+)
+
+TORNGIT_CIRCUIT_OPENED = Counter(
+    "git_provider_circuit_opened",
+    "Number of times requests to a git provider were stopped after repeated failures",
+    ["service"],
+)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a `Retry-After` header, either a number of seconds or an HTTP date.
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryBudget:
+    """
+    A token bucket bounding the retries of a process to a share of its requests,
+    so that retries can't multiply the load on a provider that is failing.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+        max_tokens: float = RETRY_BUDGET_MAX_TOKENS,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._tokens = self.max_tokens
+        self._updated_at = time.monotonic()
+
+    def _deposit(self, amount: float) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.max_tokens,
+            self._tokens + amount + (now - self._updated_at) * self.min_per_second,
+        )
+        self._updated_at = now
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._deposit(self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._deposit(0)
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a provider after `failure_threshold` failures in a
+    row (5xx responses, timeouts, network errors). Every `reset_timeout` seconds,
+    a single request is let through, which closes the circuit if it succeeds.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # the next request is let through after another `reset_timeout`
+            self._opened_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures < self.failure_threshold:
+                return
+            if self._opened_at is None:
+                log.warning(
+                    "Too many failed requests, opening circuit",
+                    extra=dict(service=self.service, failures=self._failures),
+                )
+                inc_counter(TORNGIT_CIRCUIT_OPENED, dict(service=self.service))
+            self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """
+    The retry policy of the requests to a provider: retries back off exponentially
+    with full jitter, honor `Retry-After`, and are bounded by the `RetryBudget`
+    shared by the whole process.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        budget: RetryBudget,
+        circuit_breaker: CircuitBreaker,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ):
+        self.service = service
+        self.budget = budget
+        self.circuit_breaker = circuit_breaker
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def record_request(self) -> None:
+        self.budget.record_request()
+
+    def get_retry_delay(
+        self, attempt: int, retry_after: str | None = None
+    ) -> float | None:
+        """
+        The number of seconds to wait before retrying a request that failed on its
+        `attempt`th attempt, or `None` if it shouldn't be retried.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        retry_after_seconds = parse_retry_after(retry_after)
+        if retry_after_seconds is not None and retry_after_seconds > MAX_RETRY_AFTER:
+            inc_counter(
+                TORNGIT_RETRIES,
+                dict(service=self.service, outcome="retry_after_too_long"),
+            )
+            return None
+        if not self.budget.try_spend():
+            inc_counter(
+                TORNGIT_RETRIES, dict(service=self.service, outcome="budget_exhausted")
+            )
+            return None
+        inc_counter(TORNGIT_RETRIES, dict(service=self.service, outcome="retried"))
+        delay = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        return max(delay, retry_after_seconds or 0)
+
+
+_retry_budget = RetryBudget()
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_retry_policy(service: str, **kwargs) -> RetryPolicy:
+    with _circuit_breakers_lock:
+        circuit_breaker = _circuit_breakers.setdefault(service, CircuitBreaker(service))
+    return RetryPolicy(service, _retry_budget, circuit_breaker, **kwargs)
+
+
+def reset_retry_state() -> None:
+    """
+    Resets the retry budget and the circuit breakers (ie. between tests).
+    """
+    _retry_budget.reset()
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
@@ -1,11 +1,24 @@
 import dataclasses
+import json
 from decimal import Decimal
 from fractions import Fraction
 from json import JSONEncoder
 from types import GeneratorType
+from typing import Any, Iterator
+
+import orjson
 
 from shared.reports.types import ReportTotals
 
+# Dataclasses and datetimes are handed to the encoder's `default`, as `json` does
+ORJSON_OPTION = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+)
+# Dicts and lists with more items than this are encoded item by item by `iter_json`
+JSON_STREAM_ITEMS = 1000
+
 
 class ReportEncoder(JSONEncoder):
     separators = (",", ":")
@@ -26,3 +39,62 @@ class ReportEncoder(JSONEncoder):
             obj = list(obj)
         # let the base class default method raise the typeerror
         return JSONEncoder.default(self, obj)
+
+
+def _orjson_default(encoder: type[JSONEncoder]):
+    encoder_default = encoder().default
+
+    def default(obj):
+        # `json` encodes these natively, but orjson only does for exact types
+        if isinstance(obj, tuple):
+            return list(obj)
+        if isinstance(obj, float):
+            return float(obj)
+        return encoder_default(obj)
+
+    return default
+
+
+def dumps_json(data: Any, encoder: type[JSONEncoder] = ReportEncoder) -> bytes:
+    """
+    Encodes `data` as compact JSON with orjson, handing the objects it can't encode
+    to `encoder.default`, so that the result decodes to the same value as
+    `json.dumps(data, cls=encoder)` does.
+
+    This falls back to `json.dumps` for what orjson can't encode, like integers
+    over 64 bits. Unlike `json.dumps`, NaN and infinities are encoded as `null`.
+    """
+    try:
+        return orjson.dumps(
+            data, default=_orjson_default(encoder), option=ORJSON_OPTION
+        )
+    except orjson.JSONEncodeError:
+        return json.dumps(data, cls=encoder, separators=(",", ":")).encode()
+
+
+def iter_json(
+    data: Any,
+    encoder: type[JSONEncoder] = ReportEncoder,
+    chunk_items: int = JSON_STREAM_ITEMS,
+) -> Iterator[bytes]:
+    """
+    Encodes `data` like `dumps_json` does, in chunks: dicts and lists with more
+    than `chunk_items` items are encoded one item at a time, so that a large
+    payload doesn't need to be held in memory once encoded.
+    """
+    if isinstance(data, dict) and len(data) > chunk_items:
+        yield b"{"
+        for i, (key, value) in enumerate(data.items()):
+            # encodes the key as `"key":`, the same way it is within a dict
+            yield (b"," if i else b"") + dumps_json({key: 0}, encoder)[1:-2]
+            yield from iter_json(value, encoder, chunk_items)
+        yield b"}"
+    elif isinstance(data, (list, tuple)) and len(data) > chunk_items:
+        yield b"["
+        for i, item in enumerate(data):
+            if i:
+                yield b","
+            yield from iter_json(item, encoder, chunk_items)
+        yield b"]"
+    else:
+        yield dumps_json(data, encoder)
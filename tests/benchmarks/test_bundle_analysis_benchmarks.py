@@ -0,0 +1,230 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from shared.bundle_analysis import (
+    BundleAnalysisComparison,
+    BundleAnalysisReport,
+)
+
+
+def generate_bundle_stats(
+    path: Path,
+    bundle_name: str = "benchmark",
+    num_assets: int = 200,
+    modules_per_asset: int = 25,
+    num_shared_modules: int = 500,
+    dynamic_imports_per_chunk: int = 2,
+    plugin_name: str = "@codecov/sveltekit-plugin",
+    seed: int = 0,
+) -> Path:
+    """
+    Writes a synthetic (version 3) bundle stats file to `path`.
+
+    Every asset gets its own chunk, made of one route module plus modules picked
+    from a pool of shared modules. The assets of the first half dynamically import
+    assets of the second half.
+    Different seeds yield the same assets with different sizes and hashes, so two
+    files generated with different seeds can be compared and associated.
+    """
+    rng = random.Random(seed)
+
+    asset_names = [
+        f"assets/chunk-{i}-{rng.getrandbits(32):08x}.js" for i in range(num_assets)
+    ]
+    assets = [
+        {
+            "name": asset_name,
+            "size": rng.randint(1_000, 500_000),
+            "gzipSize": rng.randint(100, 50_000),
+            "normalized": f"assets/chunk-{i}-*.js",
+        }
+        for i, asset_name in enumerate(asset_names)
+    ]
+
+    # the first half of the assets dynamically imports assets from the second half
+    lazy_asset_names = asset_names[num_assets // 2 :]
+    dynamic_imports_per_chunk = min(dynamic_imports_per_chunk, len(lazy_asset_names))
+    chunks = [
+        {
+            "id": f"chunk-{i}",
+            "uniqueId": f"{i}-chunk-{i}",
+            "entry": i == 0,
+            "initial": i % 2 == 0,
+            "files": [asset_name],
+            "names": [f"chunk-{i}"],
+            "dynamicImports": (
+                rng.sample(lazy_asset_names, dynamic_imports_per_chunk)
+                if i < num_assets // 2
+                else []
+            ),
+        }
+        for i, asset_name in enumerate(asset_names)
+    ]
+
+    modules = []
+    shared_module_chunks = [[] for _ in range(num_shared_modules)]
+    for i in range(num_assets):
+        modules.append(
+            {
+                "name": f"./src/routes/route-{i}/+page.ts",
+                "size": rng.randint(100, 10_000),
+                "chunkUniqueIds": [f"{i}-chunk-{i}"],
+            }
+        )
+        for j in rng.sample(
+            range(num_shared_modules),
+            min(modules_per_asset - 1, num_shared_modules),
+        ):
+            shared_module_chunks[j].append(f"{i}-chunk-{i}")
+    for j, chunk_unique_ids in enumerate(shared_module_chunks):
+        modules.append(
+            {
+                "name": f"./src/lib/module-{j}.ts",
+                "size": rng.randint(100, 10_000),
+                "chunkUniqueIds": chunk_unique_ids,
+            }
+        )
+
+    stats = {
+        "version": "3",
+        "builtAt": 1732907862271,
+        "duration": 252,
+        "bundleName": bundle_name,
+        "outputPath": "/dist",
+        "bundler": {"name": "rollup", "version": "4.22.4"},
+        "plugin": {"name": plugin_name, "version": "1.0.0"},
+        "assets": assets,
+        "chunks": chunks,
+        "modules": modules,
+    }
+    with open(path, "w") as f:
+        json.dump(stats, f)
+    return path
+
+
+class PreloadedReportLoader:
+    """
+    Stands in for `BundleAnalysisReportLoader` so that comparisons don't measure
+    downloading the reports from storage.
+    """
+
+    def __init__(self, reports: dict[str, BundleAnalysisReport]):
+        self.reports = reports
+
+    def load(self, repo_key: str) -> BundleAnalysisReport:
+        return self.reports[repo_key]
+
+
+@pytest.fixture
+def base_stats_path(tmp_path):
+    return generate_bundle_stats(tmp_path / "base.json", seed=1)
+
+
+@pytest.fixture
+def head_stats_path(tmp_path):
+    return generate_bundle_stats(tmp_path / "head.json", seed=2)
+
+
+@pytest.fixture
+def base_report(base_stats_path):
+    report = BundleAnalysisReport()
+    report.ingest(base_stats_path)
+    yield report
+    report.cleanup()
+
+
+@pytest.fixture
+def head_report(head_stats_path):
+    report = BundleAnalysisReport()
+    report.ingest(head_stats_path)
+    yield report
+    report.cleanup()
+
+
+def test_bundle_ingest(benchmark, head_stats_path):
+    def bench_fn():
+        report = BundleAnalysisReport()
+        try:
+            report.ingest(head_stats_path)
+        finally:
+            report.cleanup()
+
+    benchmark(bench_fn)
+
+
+def test_bundle_reingest(benchmark, head_stats_path, head_report):
+    def bench_fn():
+        head_report.ingest(head_stats_path)
+
+    benchmark(bench_fn)
+
+
+def test_bundle_ingest_many(benchmark, tmp_path):
+    paths = [
+        generate_bundle_stats(
+            tmp_path / f"bundle-{i}.json", bundle_name=f"bundle-{i}", seed=i
+        )
+        for i in range(4)
+    ]
+
+    def bench_fn():
+        report = BundleAnalysisReport()
+        try:
+            report.ingest_many(paths)
+        finally:
+            report.cleanup()
+
+    benchmark(bench_fn)
+
+
+def test_bundle_associate_previous_assets(benchmark, base_report, head_report):
+    def bench_fn():
+        head_report.associate_previous_assets(base_report)
+
+    benchmark(bench_fn)
+
+
+def test_bundle_changes(benchmark, base_report, head_report):
+    loader = PreloadedReportLoader({"base": base_report, "head": head_report})
+
+    def bench_fn():
+        comparison = BundleAnalysisComparison(loader, "base", "head")
+        list(comparison.bundle_changes())
+        comparison.percentage_delta
+
+    benchmark(bench_fn)
+
+
+def test_bundle_asset_comparisons(benchmark, base_report, head_report):
+    loader = PreloadedReportLoader({"base": base_report, "head": head_report})
+
+    def bench_fn():
+        comparison = BundleAnalysisComparison(loader, "base", "head")
+        for asset_comparison in comparison.bundle_comparison(
+            "benchmark"
+        ).asset_comparisons():
+            asset_comparison.asset_change()
+
+    benchmark(bench_fn)
+
+
+def test_bundle_full_route_report(benchmark, head_report):
+    bundle_report = head_report.bundle_report("benchmark")
+
+    def bench_fn():
+        bundle_report.full_route_report().get_sizes()
+
+    benchmark(bench_fn)
+
+
+def test_bundle_routes_changes(benchmark, base_report, head_report):
+    loader = PreloadedReportLoader({"base": base_report, "head": head_report})
+
+    def bench_fn():
+        comparison = BundleAnalysisComparison(loader, "base", "head")
+        comparison.bundle_routes_changes()
+
+    benchmark(bench_fn)
@@ -0,0 +1,46 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+import zstandard as zstd
+
+from shared.storage.base import PART_SIZE
+from shared.storage.compression import GZipStreamReader
+
+
+def read_fixture(name: str) -> bytes:
+    path = Path(__file__).parent / "fixtures" / name
+    with open(path, "rb") as f:
+        data = f.read()
+
+    dctx = zstd.ZstdDecompressor()
+    return dctx.decompress(data)
+
+
+def read_stream(reader) -> int:
+    # mimics `put_object`, which reads the stream one part at a time
+    size = 0
+    while chunk := reader.read(PART_SIZE):
+        size += len(chunk)
+    return size
+
+
+@pytest.fixture(params=["worker_report.json.zst", "worker_chunks.txt.zst"])
+def payload(request):
+    return read_fixture(request.param)
+
+
+@pytest.mark.parametrize("compresslevel", [1, 6, 9])
+def test_compress_gzip_stream(benchmark, payload, compresslevel):
+    def bench_fn():
+        return read_stream(GZipStreamReader(BytesIO(payload), compresslevel))
+
+    benchmark(bench_fn)
+
+
+def test_compress_zstd_stream(benchmark, payload):
+    def bench_fn():
+        cctx = zstd.ZstdCompressor()
+        return read_stream(cctx.stream_reader(BytesIO(payload)))
+
+    benchmark(bench_fn)
@@ -6,6 +6,14 @@ import vcr
 from shared.config import ConfigHelper
 from shared.reports.resources import Report, ReportFile, Session
 from shared.reports.types import LineSession, ReportLine
+from shared.torngit.retry import reset_retry_state
+
+
+@pytest.fixture(autouse=True)
+def torngit_retry_state():
+    # the retry budget and circuit breakers are per process, tests must not share them
+    yield
+    reset_retry_state()
 
 
 @pytest.fixture
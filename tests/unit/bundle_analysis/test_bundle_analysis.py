@@ -1,10 +1,11 @@
+import os
 from pathlib import Path
 from typing import Tuple
 from unittest import TestCase
 from unittest.mock import patch
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session as DbSession
 
 from shared.bundle_analysis import BundleAnalysisReport, BundleAnalysisReportLoader
@@ -13,6 +14,7 @@ from shared.bundle_analysis.models import (
     Asset,
     AssetType,
     Bundle,
+    BundleSummary,
     Chunk,
     DynamicImport,
     Metadata,
@@ -21,6 +23,9 @@ from shared.bundle_analysis.models import (
     Session,
     get_db_session,
 )
+from shared.bundle_analysis.report import filter_modules_by_changed_files
+from shared.bundle_analysis.storage import StoragePaths
+from shared.storage.disk_cache import DiskCache
 from shared.storage.exceptions import PutRequestRateLimitError
 from shared.storage.memory import MemoryStorageService
 
@@ -439,6 +444,161 @@ def test_save_load_bundle_report():
         report.cleanup()
 
 
+def test_save_load_bundle_report_local_cache(tmp_path, mocker):
+    created_report = BundleAnalysisReport()
+    reports = []
+    try:
+        created_report.ingest(sample_bundle_stats_path)
+
+        storage_service = MemoryStorageService({})
+        loader = BundleAnalysisReportLoader(
+            storage_service=storage_service,
+            repo_key="testing",
+            local_cache=DiskCache(str(tmp_path), max_bytes=10 * 1024 * 1024),
+        )
+        read_file = mocker.spy(storage_service, "read_file")
+        test_key = "8d1099f1-ba73-472f-957f-6908eced3f42"
+        loader.save(created_report, test_key)
+
+        # first load downloads from storage, second load is served from the cache
+        reports.extend([loader.load(test_key), loader.load(test_key)])
+        assert read_file.call_count == 1
+        initial_data = open(created_report.db_path, "rb").read()
+        for report in reports:
+            assert report.db_path != created_report.db_path
+            assert open(report.db_path, "rb").read() == initial_data
+        assert reports[0].db_path != reports[1].db_path
+
+        # saving different content changes the ETag and invalidates the cached copy
+        created_report.ingest(sample_bundle_stats_path_5)
+        loader.save(created_report, test_key)
+        reports.append(loader.load(test_key))
+        assert read_file.call_count == 2
+        assert (
+            open(reports[-1].db_path, "rb").read()
+            == open(created_report.db_path, "rb").read()
+        )
+
+        assert loader.load("doesnotexist") is None
+    finally:
+        created_report.cleanup()
+        for report in reports:
+            report.cleanup()
+
+
+def test_load_bundle_report_local_cache_overwritten_during_read(tmp_path, mocker):
+    created_report = BundleAnalysisReport()
+    other_report = BundleAnalysisReport()
+    reports = []
+    try:
+        created_report.ingest(sample_bundle_stats_path)
+        other_report.ingest(sample_bundle_stats_path_5)
+
+        storage_service = MemoryStorageService({})
+        loader = BundleAnalysisReportLoader(
+            storage_service=storage_service,
+            repo_key="testing",
+            local_cache=DiskCache(str(tmp_path), max_bytes=10 * 1024 * 1024),
+        )
+        test_key = "8d1099f1-ba73-472f-957f-6908eced3f42"
+        loader.save(created_report, test_key)
+        path = StoragePaths.bundle_report.path(repo_key="testing", report_key=test_key)
+        previous_etag = storage_service.get_etag(loader.bucket_name, path)
+
+        # the report is overwritten after its ETag is checked, but before it is read
+        read_file = storage_service.read_file
+
+        def overwrite_then_read_file(*args, **kwargs):
+            loader.save(other_report, test_key)
+            return read_file(*args, **kwargs)
+
+        mocker.patch.object(
+            storage_service, "read_file", side_effect=overwrite_then_read_file
+        )
+        reports.append(loader.load(test_key))
+        other_data = open(other_report.db_path, "rb").read()
+        assert open(reports[0].db_path, "rb").read() == other_data
+
+        # the new content wasn't cached under the previous ETag
+        assert (
+            loader.local_cache.open(f"{loader.bucket_name}/{path}@{previous_etag}")
+            is None
+        )
+        mocker.patch.object(storage_service, "read_file", side_effect=read_file)
+        reports.append(loader.load(test_key))
+        assert open(reports[1].db_path, "rb").read() == other_data
+    finally:
+        created_report.cleanup()
+        other_report.cleanup()
+        for report in reports:
+            report.cleanup()
+
+
+def test_save_bundle_report_skips_unchanged_upload(mocker):
+    try:
+        created_report = BundleAnalysisReport()
+        created_report.ingest(sample_bundle_stats_path)
+
+        storage_service = MemoryStorageService({})
+        loader = BundleAnalysisReportLoader(
+            storage_service=storage_service,
+            repo_key="testing",
+        )
+        write_file = mocker.spy(storage_service, "write_file")
+        loader.save(created_report, "report-key")
+        assert write_file.call_count == 1
+
+        report = loader.load("report-key")
+
+        # nothing changed since it was loaded
+        loader.save(report, "report-key")
+        assert write_file.call_count == 1
+
+        # saving under a different key always uploads
+        loader.save(report, "other-report-key")
+        assert write_file.call_count == 2
+
+        # the report changed since it was loaded
+        report.update_is_cached({"sample": True})
+        loader.save(report, "report-key")
+        assert write_file.call_count == 3
+        loader.save(report, "report-key")
+        assert write_file.call_count == 3
+
+        assert loader.load("report-key").is_cached() is True
+    finally:
+        created_report.cleanup()
+        report.cleanup()
+
+
+def test_save_load_bundle_report_vacuum_on_save():
+    try:
+        created_report = BundleAnalysisReport()
+        created_report.ingest(sample_bundle_stats_path)
+        created_report.ingest(sample_bundle_stats_path_5)
+        # deleting leaves free pages behind in the database
+        created_report.delete_bundle_by_name("sample2")
+
+        loader = BundleAnalysisReportLoader(
+            storage_service=MemoryStorageService({}),
+            repo_key="testing",
+            vacuum_on_save=True,
+        )
+        loader.save(created_report, "report-key")
+        report = loader.load("report-key")
+
+        assert os.path.getsize(report.db_path) < os.path.getsize(created_report.db_path)
+        bundle_report = report.bundle_report("sample")
+        assert bundle_report.total_size() == 150572
+        assert len(list(bundle_report.asset_reports())) == len(
+            list(created_report.bundle_report("sample").asset_reports())
+        )
+        assert report.session_count() == 1
+    finally:
+        created_report.cleanup()
+        report.cleanup()
+
+
 def test_reupload_bundle_report():
     try:
         report = BundleAnalysisReport()
@@ -814,6 +974,7 @@ def test_bundle_deletion():
             assert _table_rows_count(db_session) == (0, 0, 0, 0, 0)
             res = list(db_session.query(Bundle).all())
             assert len(res) == 0
+            assert db_session.query(BundleSummary).count() == 0
     finally:
         bundle_analysis_report.cleanup()
 
@@ -1154,3 +1315,369 @@ def test_bundle_report_cleans_bad_chunks(version):
         temp_path.unlink()
     finally:
         report.cleanup()
+
+
+FOREIGN_KEY_INDEXES = [
+    "chunks_session_id_index",
+    "modules_session_id_index",
+    "assets_chunks_chunk_id_index",
+    "chunks_modules_module_id_index",
+    "dynamic_imports_asset_id_index",
+]
+
+
+def _raw_total_size(
+    db_session: DbSession,
+    bundle_id: int,
+    asset_types=None,
+    chunk_entry=None,
+    chunk_initial=None,
+) -> Tuple[int, int]:
+    query = (
+        db_session.query(Asset)
+        .join(Asset.session)
+        .filter(Session.bundle_id == bundle_id)
+    )
+    if chunk_entry is not None or chunk_initial is not None:
+        query = query.join(Asset.chunks)
+    if chunk_entry is not None:
+        query = query.filter(Chunk.entry == chunk_entry)
+    if chunk_initial is not None:
+        query = query.filter(Chunk.initial == chunk_initial)
+    if asset_types is not None:
+        query = query.filter(Asset.asset_type.in_(asset_types))
+    assets = query.with_entities(Asset.size, Asset.gzip_size).all()
+    return (
+        sum(size for size, _ in assets),
+        sum(gzip_size if gzip_size is not None else size for size, gzip_size in assets),
+    )
+
+
+@pytest.mark.parametrize(
+    "asset_types, chunk_entry, chunk_initial",
+    [
+        (None, None, None),
+        ([AssetType.JAVASCRIPT], None, None),
+        ([AssetType.JAVASCRIPT, AssetType.STYLESHEET], None, None),
+        (None, True, None),
+        (None, None, True),
+        (None, False, False),
+        ([AssetType.JAVASCRIPT], True, True),
+        ([AssetType.FONT], None, None),
+        ([], None, None),
+    ],
+)
+def test_bundle_report_summary_matches_assets(asset_types, chunk_entry, chunk_initial):
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+        report.ingest(sample_bundle_stats_path_5)
+        bundle_report = report.bundle_report("sample")
+
+        with get_db_session(report.db_path) as db_session:
+            expected_size, expected_gzip_size = _raw_total_size(
+                db_session,
+                bundle_report.bundle.id,
+                asset_types,
+                chunk_entry,
+                chunk_initial,
+            )
+
+        assert (
+            bundle_report.total_size(asset_types, chunk_entry, chunk_initial)
+            == expected_size
+        )
+        assert (
+            bundle_report.total_gzip_size(asset_types, chunk_entry, chunk_initial)
+            == expected_gzip_size
+        )
+    finally:
+        report.cleanup()
+
+
+def test_bundle_report_summary_refreshed_on_reupload():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+        report.ingest(sample_bundle_stats_path_2)
+        bundle_report = report.bundle_report("sample")
+
+        with get_db_session(report.db_path) as db_session:
+            assert db_session.query(BundleSummary.bundle_id).distinct().all() == [
+                (bundle_report.bundle.id,)
+            ]
+
+        assert bundle_report.total_size() == 151672
+    finally:
+        report.cleanup()
+
+
+def test_bundle_report_summary_migration_backfill():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+        bundle_report = report.bundle_report("sample")
+        expected = (
+            bundle_report.total_size(),
+            bundle_report.total_gzip_size(),
+            bundle_report.total_size(asset_types=[AssetType.JAVASCRIPT]),
+            bundle_report.total_size(chunk_entry=True, chunk_initial=True),
+        )
+
+        # Bring the file back to the schema prior to the summaries table
+        with get_db_session(report.db_path) as db_session:
+            db_session.execute(text("DROP TABLE bundle_summaries"))
+            for index in FOREIGN_KEY_INDEXES:
+                db_session.execute(text(f"DROP INDEX {index}"))
+            db_session.execute(
+                text("UPDATE metadata SET value = 5 WHERE key = 'schema_version'")
+            )
+            db_session.commit()
+
+        migrated_report = BundleAnalysisReport(report.db_path)
+        assert migrated_report.metadata() == {
+            MetadataKey.SCHEMA_VERSION: SCHEMA_VERSION,
+        }
+        bundle_report = migrated_report.bundle_report("sample")
+        assert (
+            bundle_report.total_size(),
+            bundle_report.total_gzip_size(),
+            bundle_report.total_size(asset_types=[AssetType.JAVASCRIPT]),
+            bundle_report.total_size(chunk_entry=True, chunk_initial=True),
+        ) == expected
+    finally:
+        report.cleanup()
+
+
+def _module_names(modules):
+    return sorted(module.name for module in modules)
+
+
+@pytest.mark.parametrize(
+    "pr_changed_files, expected",
+    [
+        ([], []),
+        (["abc/def.ts"], ["./def.ts", "def.ts"]),
+        (["./abc/def.ts", "ghi/jkl.ts"], ["./def.ts", "def.ts"]),
+        (["abc/xdef.ts"], ["./def.ts", "def.ts"]),
+        (["src/app/index.js"], ["./src/app/index.js", "app/index.js"]),
+        ([".github/def.ts"], ["./def.ts", "def.ts"]),
+        (["mno.tsx"], []),
+    ],
+)
+def test_filter_modules_by_changed_files(pr_changed_files, expected):
+    modules = [
+        Module(id=1, name="./def.ts"),
+        Module(id=2, name="def.ts"),
+        Module(id=3, name="mno.ts"),
+        Module(id=4, name="./src/app/index.js"),
+        Module(id=5, name="app/index.js"),
+        Module(id=1, name="./def.ts"),
+    ]
+    assert (
+        _module_names(filter_modules_by_changed_files(modules, pr_changed_files))
+        == expected
+    )
+
+
+def test_bundle_report_asset_modules():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+        bundle_report = report.bundle_report("sample")
+        assets = list(bundle_report.asset_reports())
+
+        pr_changed_files = [
+            "app1/src/main.tsx",
+            "./app1/src/App.css",
+            "app1/vite.svg",
+            "unrelated/file.py",
+        ]
+
+        all_modules = bundle_report.asset_modules()
+        filtered_modules = bundle_report.asset_modules(pr_changed_files)
+        for asset in assets:
+            assert _module_names(all_modules.get(asset.id, [])) == _module_names(
+                asset.modules()
+            )
+            assert _module_names(filtered_modules.get(asset.id, [])) == _module_names(
+                asset.modules(pr_changed_files)
+            )
+        assert any(filtered_modules.values())
+    finally:
+        report.cleanup()
+
+
+def test_bundle_report_asset_modules_shared_by_chunks():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+        bundle_report = report.bundle_report("sample")
+
+        with get_db_session(report.db_path) as db_session:
+            chunk = next(chunk for chunk in db_session.query(Chunk) if chunk.modules)
+            asset = chunk.assets[0]
+            module = chunk.modules[0]
+            db_session.add(
+                Chunk(
+                    session_id=chunk.session_id,
+                    external_id="shared",
+                    unique_external_id="shared",
+                    entry=False,
+                    initial=False,
+                    assets=[asset],
+                    modules=[module],
+                )
+            )
+            asset_id, module_name = asset.id, module.name
+            db_session.commit()
+
+        asset_report = next(
+            asset for asset in bundle_report.asset_reports() if asset.id == asset_id
+        )
+        modules = bundle_report.asset_modules()[asset_id]
+        assert [m.name for m in modules].count(module_name) == 1
+        assert _module_names(modules) == _module_names(asset_report.modules())
+        filtered_modules = bundle_report.asset_modules([module_name])[asset_id]
+        assert [m.name for m in filtered_modules].count(module_name) == 1
+    finally:
+        report.cleanup()
+
+
+def _join_table_rows_count(db_session: DbSession) -> Tuple[int]:
+    return tuple(
+        db_session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        for table in ["assets_chunks", "chunks_modules", "dynamic_imports"]
+    )
+
+
+def test_reupload_bundle_report_replaces_previous_session():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path_7)
+        with get_db_session(report.db_path) as db_session:
+            expected_rows_count = _table_rows_count(db_session)
+            expected_join_rows_count = _join_table_rows_count(db_session)
+            assert all(expected_join_rows_count)
+
+        # re-ingesting the same bundle leaves no rows behind from the previous session
+        report.ingest(sample_bundle_stats_path_7)
+        with get_db_session(report.db_path) as db_session:
+            assert _table_rows_count(db_session) == expected_rows_count
+            assert _join_table_rows_count(db_session) == expected_join_rows_count
+
+        report.delete_bundle_by_name("dynamic_imports")
+        with get_db_session(report.db_path) as db_session:
+            assert _table_rows_count(db_session) == (0, 0, 0, 0, 0)
+            assert _join_table_rows_count(db_session) == (0, 0, 0)
+    finally:
+        report.cleanup()
+
+
+def test_bundle_report_foreign_key_indexes_migration():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+
+        with get_db_session(report.db_path) as db_session:
+            for index in FOREIGN_KEY_INDEXES:
+                db_session.execute(text(f"DROP INDEX {index}"))
+            db_session.execute(
+                text("UPDATE metadata SET value = 6 WHERE key = 'schema_version'")
+            )
+            db_session.commit()
+
+        migrated_report = BundleAnalysisReport(report.db_path)
+        assert migrated_report.metadata() == {
+            MetadataKey.SCHEMA_VERSION: SCHEMA_VERSION,
+        }
+        with get_db_session(report.db_path) as db_session:
+            indexes = {
+                name
+                for (name,) in db_session.execute(
+                    text("SELECT name FROM sqlite_master WHERE type = 'index'")
+                )
+            }
+        assert set(FOREIGN_KEY_INDEXES) <= indexes
+    finally:
+        report.cleanup()
+
+
+def _report_contents(report: BundleAnalysisReport):
+    contents = {}
+    for bundle_report in report.bundle_reports():
+        contents[bundle_report.name] = (
+            bundle_report.total_size(),
+            bundle_report.total_gzip_size(),
+            bundle_report.total_size(chunk_entry=True),
+            bundle_report.info(),
+            sorted(
+                (
+                    asset.name,
+                    asset.size,
+                    sorted(module.name for module in asset.modules()),
+                    sorted(
+                        dynamic_import.name
+                        for dynamic_import in asset.dynamically_imported_assets()
+                    ),
+                )
+                for asset in bundle_report.asset_reports()
+            ),
+        )
+    return contents
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_ingest_many(max_workers):
+    paths = [
+        sample_bundle_stats_path,
+        sample_bundle_stats_path_5,
+        sample_bundle_stats_path_7,
+        sample_bundle_stats_path_2,
+    ]
+    try:
+        expected_report = BundleAnalysisReport()
+        expected_report.ingest(sample_bundle_stats_path_8)
+        expected_results = [expected_report.ingest(path) for path in paths]
+
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path_8)
+        results = report.ingest_many(
+            paths, compare_sha="abc123", max_workers=max_workers
+        )
+
+        assert [bundle_name for _, bundle_name in results] == [
+            bundle_name for _, bundle_name in expected_results
+        ]
+        assert _report_contents(report) == _report_contents(expected_report)
+        assert report.metadata()[MetadataKey.COMPARE_SHA] == "abc123"
+
+        with get_db_session(expected_report.db_path) as db_session:
+            expected_rows_count = _table_rows_count(db_session)
+            expected_join_rows_count = _join_table_rows_count(db_session)
+        with get_db_session(report.db_path) as db_session:
+            assert _table_rows_count(db_session) == expected_rows_count
+            assert _join_table_rows_count(db_session) == expected_join_rows_count
+    finally:
+        expected_report.cleanup()
+        report.cleanup()
+
+
+def test_ingest_many_parser_error():
+    try:
+        report = BundleAnalysisReport()
+        report.ingest(sample_bundle_stats_path)
+        with get_db_session(report.db_path) as db_session:
+            expected_rows_count = _table_rows_count(db_session)
+
+        with pytest.raises(Exception, match="invalid bundle name"):
+            report.ingest_many(
+                [sample_bundle_stats_path_5, sample_bundle_stats_path_3],
+                max_workers=2,
+            )
+
+        # nothing got written
+        with get_db_session(report.db_path) as db_session:
+            assert _table_rows_count(db_session) == expected_rows_count
+    finally:
+        report.cleanup()
@@ -1,13 +1,16 @@
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
+import shared.bundle_analysis.comparison
 from shared.bundle_analysis import (
     AssetChange,
     BundleAnalysisComparison,
     BundleAnalysisReport,
     BundleAnalysisReportLoader,
     BundleChange,
+    BundleComparison,
     MissingBaseReportError,
     MissingBundleError,
     MissingHeadReportError,
@@ -48,6 +51,57 @@ base_report_bundle_stats_zero_size_asset = (
 )
 
 
+def test_bundle_analysis_comparison_bundle_sizes_single_query(mocker):
+    loader = BundleAnalysisReportLoader(
+        storage_service=MemoryStorageService({}),
+        repo_key="testing",
+    )
+
+    try:
+        base_report = BundleAnalysisReport()
+        base_report.ingest(base_report_bundle_stats_path)
+        with get_db_session(base_report.db_path) as db_session:
+            db_session.add(Bundle(name="old"))
+            db_session.commit()
+
+        head_report = BundleAnalysisReport()
+        with get_db_session(head_report.db_path) as db_session:
+            db_session.add(Bundle(name="new"))
+            db_session.commit()
+        head_report.ingest(head_report_bundle_stats_path)
+
+        loader.save(base_report, "base-report")
+        loader.save(head_report, "head-report")
+    finally:
+        base_report.cleanup()
+        head_report.cleanup()
+
+    comparison = BundleAnalysisComparison(
+        loader=loader,
+        base_report_key="base-report",
+        head_report_key="head-report",
+    )
+    get_db_session_spy = mocker.spy(shared.bundle_analysis.comparison, "get_db_session")
+
+    # head bundles come first in head order, followed by the removed ones
+    assert [
+        (change.bundle_name, change.change_type, change.size_delta)
+        for change in comparison.bundle_changes()
+    ] == [
+        ("new", BundleChange.ChangeType.ADDED, 0),
+        ("sample", BundleChange.ChangeType.CHANGED, 1100),
+        ("old", BundleChange.ChangeType.REMOVED, 0),
+    ]
+    assert comparison.total_size_delta == 1100
+    assert comparison.percentage_delta == 0.73
+    assert list(comparison.bundle_changes()) == list(comparison.bundle_changes())
+
+    assert get_db_session_spy.call_count == 1
+    assert comparison.bundle_comparison("sample") is comparison.bundle_comparison(
+        "sample"
+    )
+
+
 def test_bundle_analysis_comparison():
     loader = BundleAnalysisReportLoader(
         storage_service=MemoryStorageService({}),
@@ -1000,3 +1054,46 @@ def test_bundle_analysis_zero_asset_size_base_sized_head():
         size_base=0,
         size_head=294,
     )
+
+
+def test_bundle_asset_matching_same_name_assets():
+    def asset(uuid, size):
+        return SimpleNamespace(uuid=uuid, size=size)
+
+    base_assets = [
+        asset("a", 100),
+        asset("b", 205),
+        asset("c", 300),
+        asset("d", 5000),
+        asset("e", 1000),
+    ]
+    head_assets = [
+        asset("e", 10),  # same UUID as base "e" regardless of size
+        asset("x", 290),
+        asset("y", 98),
+        asset("z", 210),
+    ]
+
+    bundle_comparison = BundleComparison(None, None)
+    matches = bundle_comparison._match_assets(base_assets, head_assets)
+
+    assert {
+        (
+            (base.uuid, base.size) if base else None,
+            (head.uuid, head.size) if head else None,
+        )
+        for base, head in matches
+    } == {
+        (("e", 1000), ("e", 10)),
+        (("c", 300), ("x", 290)),
+        (("a", 100), ("y", 98)),
+        (("b", 205), ("z", 210)),
+        (("d", 5000), None),
+    }
+
+    # every asset shows up exactly once
+    assert len(matches) == 5
+    assert bundle_comparison._match_assets([], head_assets[:2]) == [
+        (None, head_assets[0]),
+        (None, head_assets[1]),
+    ]
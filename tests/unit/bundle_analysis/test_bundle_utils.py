@@ -408,3 +408,53 @@ def test_bundle_asset_route_split_by_delimiter(
     expected: List[str],
 ):
     assert split_by_delimiter(s, splitter, escape_open, escape_close) == expected
+
+
+def test_bundle_asset_route_memoized_across_instances(mocker):
+    plugin = AssetRoutePluginName.NEXTJS_WEBPACK
+    compute_spy = mocker.spy(AssetRoute, "_compute_nextjs_webpack")
+
+    asset_route = AssetRoute(plugin=plugin, configured_route_prefix="memo-app")
+    assert asset_route.get_from_filename("memo-app/about/page.tsx") == "/about"
+    other_asset_route = AssetRoute(plugin=plugin, configured_route_prefix="memo-app")
+    assert other_asset_route.get_from_filename("memo-app/about/page.tsx") == "/about"
+    assert compute_spy.call_count == 1
+
+    # a different route prefix doesn't share the memoized routes
+    assert (
+        AssetRoute(
+            plugin=plugin, configured_route_prefix="other-app"
+        ).get_from_filename("memo-app/about/page.tsx")
+        is None
+    )
+    assert compute_spy.call_count == 2
+
+
+def test_bundle_asset_route_memo_is_bounded(mocker):
+    mocker.patch("shared.bundle_analysis.utils.ROUTE_MEMO_MAX_SIZE", 2)
+    asset_route = AssetRoute(
+        plugin=AssetRoutePluginName.NEXTJS_WEBPACK,
+        configured_route_prefix="bounded-app",
+    )
+    for name in ["a", "b", "c"]:
+        asset_route.get_from_filename(f"bounded-app/{name}/page.tsx")
+    assert list(asset_route._route_memo) == [
+        "bounded-app/b/page.tsx",
+        "bounded-app/c/page.tsx",
+    ]
+
+
+def test_bundle_asset_route_get_from_filenames():
+    asset_route = AssetRoute(plugin=AssetRoutePluginName.SVELTEKIT)
+    assert asset_route.get_from_filenames(
+        [
+            "src/routes/about/+page.svelte",
+            "src/lib/utils.ts",
+            "src/routes/about/+page.svelte",
+            "src/routes/blog/[slug]/+page.ts",
+        ]
+    ) == {
+        "src/routes/about/+page.svelte": "/about",
+        "src/lib/utils.ts": None,
+        "src/routes/blog/[slug]/+page.ts": "/blog/[slug]",
+    }
@@ -1,7 +1,19 @@
+import json
+from unittest.mock import MagicMock, patch
+
 import pytest
+from django.db.models import QuerySet
+from django.test import TestCase
 
 from shared.django_apps.codecov_auth.tests.factories import OwnerFactory
-from shared.django_apps.utils.model_utils import get_ownerid_if_member
+from shared.django_apps.core.models import Commit
+from shared.django_apps.core.tests.factories import CommitFactory, RepositoryFactory
+from shared.django_apps.utils.model_utils import (
+    ArchiveFieldQuerySetMixin,
+    get_ownerid_if_member,
+    prefetch_archive_fields,
+)
+from shared.storage.exceptions import FileNotInStorageError
 
 
 class TestMigrationUtils:
@@ -29,3 +41,85 @@ class TestMigrationUtils:
             service=service, owner_username=username, owner_id=invalid_owner_id
         )
         assert null_owner_id is None
+
+
+sample_report = {"files": {"file.py": [0]}, "sessions": {}}
+
+
+def _make_commit(commitid, report_storage_path=None, report=None):
+    commit = Commit(commitid=commitid)
+    commit._report = report
+    commit._report_storage_path = report_storage_path
+    return commit
+
+
+@patch("shared.django_apps.utils.model_utils.ArchiveService")
+def test_prefetch_archive_fields(mock_archive):
+    def read_file(path):
+        if path == "missing.json":
+            raise FileNotInStorageError()
+        return json.dumps({**sample_report, "path": path})
+
+    mock_archive.return_value.read_file = MagicMock(side_effect=read_file)
+
+    commits = [
+        _make_commit("a", report_storage_path="a.json"),
+        _make_commit("b", report=sample_report),
+        _make_commit("c", report_storage_path="c.json"),
+        _make_commit("d", report_storage_path="missing.json"),
+    ]
+    assert prefetch_archive_fields(iter(commits), "report", max_workers=2) == commits
+
+    assert mock_archive.call_count == 1
+    assert sorted(
+        call.args[0] for call in mock_archive.return_value.read_file.call_args_list
+    ) == ["a.json", "c.json", "missing.json"]
+
+    # cached values don't hit storage again
+    assert commits[0].report == {**sample_report, "path": "a.json"}
+    assert commits[1].report == sample_report
+    assert commits[2].report == {**sample_report, "path": "c.json"}
+    assert mock_archive.return_value.read_file.call_count == 3
+
+    # files missing from storage are left to the field access
+    assert commits[3].report == {}
+    assert mock_archive.return_value.read_file.call_count == 4
+
+
+@patch("shared.django_apps.utils.model_utils.ArchiveService")
+def test_prefetch_archive_fields_nothing_to_fetch(mock_archive):
+    commits = [_make_commit("a", report=sample_report), _make_commit("b")]
+    assert prefetch_archive_fields(commits, "report") == commits
+    mock_archive.assert_not_called()
+
+
+class TestArchiveFieldQuerySetMixin(TestCase):
+    @patch("shared.django_apps.utils.model_utils.ArchiveService")
+    def test_prefetch_archive_fields_on_evaluation(self, mock_archive):
+        class CommitQuerySet(ArchiveFieldQuerySetMixin, QuerySet):
+            pass
+
+        mock_archive.return_value.read_file = MagicMock(
+            return_value=json.dumps(sample_report)
+        )
+        repository = RepositoryFactory()
+        for i in range(3):
+            CommitFactory(
+                repository=repository,
+                _report=None,
+                _report_storage_path=f"{i}.json",
+            )
+
+        queryset = (
+            CommitQuerySet(model=Commit)
+            .filter(repository=repository)
+            .prefetch_archive_fields("report")
+        )
+        commits = list(queryset.order_by("id"))
+        assert mock_archive.return_value.read_file.call_count == 3
+        assert all(commit.report == sample_report for commit in commits)
+        assert mock_archive.return_value.read_file.call_count == 3
+
+        # values querysets are left alone
+        assert len(queryset.values("id")) == 3
+        assert mock_archive.return_value.read_file.call_count == 3
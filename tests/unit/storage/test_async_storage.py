@@ -0,0 +1,153 @@
+import ssl
+from io import BytesIO
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+import respx
+
+from shared.storage.async_storage import AsyncStorageService
+from shared.storage.exceptions import (
+    BatchStorageError,
+    BucketAlreadyExistsError,
+    FileNotInStorageError,
+)
+from shared.storage.minio import HTTP_POOL_MAXSIZE, MinioStorageService
+
+BUCKET_NAME = "archivetest"
+
+minio_config = {
+    "access_key_id": "codecov-default-key",
+    "secret_access_key": "codecov-default-secret",
+    "verify_ssl": False,
+    "host": "minio",
+    "port": "9000",
+    "iam_auth": False,
+    "iam_endpoint": None,
+}
+
+
+@pytest_asyncio.fixture
+async def storage():
+    async with AsyncStorageService(minio_config) as storage:
+        try:
+            await storage.create_root_storage(BUCKET_NAME)
+        except BucketAlreadyExistsError:
+            pass
+        yield storage
+
+
+@pytest.mark.asyncio
+async def test_create_bucket_already_exists(storage):
+    bucket_name = uuid4().hex
+
+    assert await storage.create_root_storage(bucket_name) == {"name": bucket_name}
+    with pytest.raises(BucketAlreadyExistsError):
+        await storage.create_root_storage(bucket_name)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compression_type", ["zstd", "gzip", None])
+async def test_write_then_read_file(storage, compression_type):
+    path = f"test_write_then_read_file/{uuid4().hex}"
+    data = "lorem ipsum dolor test_write_then_read_file á"
+
+    assert await storage.write_file(
+        BUCKET_NAME,
+        path,
+        data,
+        compression_type=compression_type,
+        metadata={"foo": "bar"},
+    )
+    metadata = {}
+    reading_result = await storage.read_file(
+        BUCKET_NAME, path, metadata_container=metadata
+    )
+    assert reading_result.decode() == data
+    assert metadata == {"foo": "bar"}
+
+    file_obj = BytesIO()
+    assert await storage.read_file(BUCKET_NAME, path, file_obj=file_obj) is None
+    assert file_obj.getvalue().decode() == data
+
+
+@pytest.mark.asyncio
+async def test_read_file_written_by_minio_storage_service(storage):
+    path = f"test_read_file_written_by_minio_storage_service/{uuid4().hex}"
+    data = "lorem ipsum dolor á" * 1000
+
+    MinioStorageService(minio_config).write_file(BUCKET_NAME, path, data)
+    reading_result = await storage.read_file(BUCKET_NAME, path)
+    assert reading_result.decode() == data
+
+    await storage.write_file(BUCKET_NAME, path, data[::-1])
+    reading_result = MinioStorageService(minio_config).read_file(BUCKET_NAME, path)
+    assert reading_result.decode() == data[::-1]
+
+
+@pytest.mark.asyncio
+async def test_read_file_does_not_exist(storage):
+    path = f"test_read_file_does_not_exist/{uuid4().hex}"
+
+    with pytest.raises(FileNotInStorageError):
+        await storage.read_file(BUCKET_NAME, path)
+
+
+@pytest.mark.asyncio
+async def test_write_then_delete_file(storage):
+    path = f"test_write_then_delete_file/{uuid4().hex}"
+
+    await storage.write_file(BUCKET_NAME, path, "lorem ipsum")
+    assert await storage.delete_file(BUCKET_NAME, path) is True
+    with pytest.raises(FileNotInStorageError):
+        await storage.read_file(BUCKET_NAME, path)
+
+
+@pytest.mark.asyncio
+async def test_delete_file_doesnt_exist(storage):
+    path = f"test_delete_file_doesnt_exist/{uuid4().hex}"
+
+    # S3 doesn't report deletes of missing objects, same as for minio's client
+    assert await storage.delete_file(BUCKET_NAME, path) is True
+    assert MinioStorageService(minio_config).delete_file(BUCKET_NAME, path) is True
+
+    with respx.mock:
+        respx.delete(url__regex=rf".*/{BUCKET_NAME}/{path}$").respond(
+            404,
+            text="<Error><Code>NoSuchKey</Code></Error>",
+            headers={"Content-Type": "application/xml"},
+        )
+        with pytest.raises(FileNotInStorageError):
+            await storage.delete_file(BUCKET_NAME, path)
+
+
+@pytest.mark.asyncio
+async def test_write_then_read_and_delete_files(storage):
+    prefix = f"test_write_then_read_and_delete_files/{uuid4().hex}"
+    files = {f"{prefix}/{i}": f"lorem ipsum {i} á" for i in range(25)}
+
+    await storage.write_files(BUCKET_NAME, files)
+    reading_result = await storage.read_files(BUCKET_NAME, [*files, f"{prefix}/a"])
+    assert {path: data.decode() for path, data in reading_result.items()} == files
+
+    await storage.delete_files(BUCKET_NAME, files)
+    assert await storage.read_files(BUCKET_NAME, files) == {}
+
+
+@pytest.mark.asyncio
+async def test_write_files_errors(storage):
+    prefix = f"test_write_files_errors/{uuid4().hex}"
+
+    with pytest.raises(BatchStorageError) as excinfo:
+        await storage.write_files(
+            BUCKET_NAME, {f"{prefix}/ok": "lorem ipsum", f"{prefix}/invalid": 1}
+        )
+    assert list(excinfo.value.errors) == [f"{prefix}/invalid"]
+    assert await storage.read_file(BUCKET_NAME, f"{prefix}/ok") == b"lorem ipsum"
+
+
+@pytest.mark.asyncio
+async def test_client_connection_pool_limit(storage):
+    pool = storage.client._transport._pool
+    assert pool._max_connections == HTTP_POOL_MAXSIZE
+    assert pool._ssl_context.verify_mode == ssl.CERT_REQUIRED
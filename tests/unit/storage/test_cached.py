@@ -0,0 +1,116 @@
+import tempfile
+from unittest import mock
+
+import pytest
+
+from shared.storage.cached import CachedStorageService
+from shared.storage.disk_cache import DiskCache
+from shared.storage.exceptions import BatchStorageError, FileNotInStorageError
+from shared.storage.memory import MemoryStorageService
+
+BUCKET_NAME = "archivetest"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return CachedStorageService(
+        MemoryStorageService({}),
+        DiskCache(str(tmp_path / "cache"), max_bytes=1024 * 1024),
+        cacheable=lambda bucket_name, path: path.startswith("immutable/"),
+    )
+
+
+def test_read_file_cached(storage):
+    storage.write_file(BUCKET_NAME, "immutable/file", "lorem ipsum")
+
+    with mock.patch.object(
+        storage.storage, "read_file", wraps=storage.storage.read_file
+    ) as read_file:
+        assert storage.read_file(BUCKET_NAME, "immutable/file") == b"lorem ipsum"
+        assert storage.read_file(BUCKET_NAME, "immutable/file") == b"lorem ipsum"
+        with tempfile.TemporaryFile() as f:
+            storage.read_file(BUCKET_NAME, "immutable/file", file_obj=f)
+            f.seek(0)
+            assert f.read() == b"lorem ipsum"
+        assert read_file.call_count == 1
+
+
+def test_read_file_obj_streamed_to_cache(storage):
+    storage.write_file(BUCKET_NAME, "immutable/file", "lorem ipsum")
+
+    with mock.patch.object(
+        storage.storage, "read_file", wraps=storage.storage.read_file
+    ) as read_file:
+        with tempfile.TemporaryFile() as f:
+            storage.read_file(BUCKET_NAME, "immutable/file", file_obj=f)
+            f.seek(0)
+            assert f.read() == b"lorem ipsum"
+        assert storage.read_file(BUCKET_NAME, "immutable/file") == b"lorem ipsum"
+        assert read_file.call_count == 1
+        # the object was read into a file rather than returned in memory
+        assert read_file.call_args.kwargs["file_obj"] is not None
+
+
+def test_read_file_not_cacheable(storage):
+    storage.write_file(BUCKET_NAME, "mutable/file", "lorem ipsum")
+
+    with mock.patch.object(
+        storage.storage, "read_file", wraps=storage.storage.read_file
+    ) as read_file:
+        assert storage.read_file(BUCKET_NAME, "mutable/file") == b"lorem ipsum"
+        assert storage.read_file(BUCKET_NAME, "mutable/file") == b"lorem ipsum"
+        assert read_file.call_count == 2
+
+
+def test_read_file_does_not_exist(storage):
+    with pytest.raises(FileNotInStorageError):
+        storage.read_file(BUCKET_NAME, "immutable/file")
+
+
+def test_write_and_delete_invalidate(storage):
+    storage.write_file(BUCKET_NAME, "immutable/file", "lorem ipsum")
+    assert storage.read_file(BUCKET_NAME, "immutable/file") == b"lorem ipsum"
+
+    storage.write_file(BUCKET_NAME, "immutable/file", "dolor sit amet")
+    assert storage.read_file(BUCKET_NAME, "immutable/file") == b"dolor sit amet"
+
+    storage.write_files(BUCKET_NAME, {"immutable/file": "consectetur"})
+    assert storage.read_file(BUCKET_NAME, "immutable/file") == b"consectetur"
+
+    storage.delete_file(BUCKET_NAME, "immutable/file")
+    with pytest.raises(FileNotInStorageError):
+        storage.read_file(BUCKET_NAME, "immutable/file")
+
+    storage.write_file(BUCKET_NAME, "immutable/file", "lorem ipsum")
+    assert storage.read_file(BUCKET_NAME, "immutable/file") == b"lorem ipsum"
+    storage.delete_files(BUCKET_NAME, ["immutable/file"])
+    assert storage.read_files(BUCKET_NAME, ["immutable/file"]) == {}
+
+
+def test_read_files_cached(storage):
+    files = {f"immutable/{i}": f"lorem ipsum {i}" for i in range(5)}
+    storage.write_files(BUCKET_NAME, files)
+    storage.read_file(BUCKET_NAME, "immutable/0")
+
+    with mock.patch.object(
+        storage.storage, "read_files", wraps=storage.storage.read_files
+    ) as read_files:
+        results = storage.read_files(BUCKET_NAME, files)
+        assert {path: data.decode() for path, data in results.items()} == files
+        read_files.assert_called_once_with(
+            BUCKET_NAME, [f"immutable/{i}" for i in range(1, 5)]
+        )
+
+        assert storage.read_files(BUCKET_NAME, files) == results
+        assert read_files.call_count == 1
+
+
+def test_read_files_errors_include_cached_results(storage):
+    storage.write_file(BUCKET_NAME, "immutable/0", "lorem ipsum")
+    storage.read_file(BUCKET_NAME, "immutable/0")
+
+    error = BatchStorageError({"immutable/1": Exception()})
+    with mock.patch.object(storage.storage, "read_files", side_effect=error):
+        with pytest.raises(BatchStorageError) as excinfo:
+            storage.read_files(BUCKET_NAME, ["immutable/0", "immutable/1"])
+    assert excinfo.value.results == {"immutable/0": b"lorem ipsum"}
@@ -0,0 +1,55 @@
+import gzip
+import zlib
+from io import BytesIO
+
+from shared.storage.compression import GZipStreamReader
+
+DATA = b"".join(
+    b'{"name": "file_%d.py", "lines": [1, 0, null, "1/2"]}\n' % i for i in range(20000)
+)
+
+
+def read_all(reader: GZipStreamReader, size: int) -> bytes:
+    chunks = []
+    while chunk := reader.read(size):
+        assert len(chunk) <= size
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def read_all_legacy(data: bytes, size: int) -> bytes:
+    return b"".join(
+        gzip.compress(data[i : i + size]) for i in range(0, len(data), size)
+    )
+
+
+def test_gzip_stream_reader_single_member():
+    reader = GZipStreamReader(BytesIO(DATA))
+    compressed = read_all(reader, 4096)
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decompressor.decompress(compressed) == DATA
+    assert decompressor.eof
+    assert decompressor.unused_data == b""
+    assert reader.tell() == len(compressed)
+    assert reader.read() == b""
+
+
+def test_gzip_stream_reader_read_all():
+    compressed = GZipStreamReader(BytesIO(DATA)).read()
+    assert gzip.decompress(compressed) == DATA
+    # a single member compresses better than one member per chunk
+    assert len(compressed) < len(read_all_legacy(DATA, 4096))
+
+
+def test_gzip_stream_reader_compresslevel():
+    fast = GZipStreamReader(BytesIO(DATA), compresslevel=1).read()
+    best = GZipStreamReader(BytesIO(DATA), compresslevel=9).read()
+    assert gzip.decompress(fast) == gzip.decompress(best) == DATA
+    assert len(best) < len(fast)
+
+
+def test_gzip_stream_reader_empty():
+    compressed = GZipStreamReader(BytesIO(b"")).read(10)
+    assert compressed
+    assert gzip.decompress(read_all(GZipStreamReader(BytesIO(b"")), 10)) == b""
@@ -0,0 +1,125 @@
+import os
+import time
+
+import pytest
+
+from shared.storage.disk_cache import TEMP_PREFIX, DiskCache
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _read(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_put_then_get(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024)
+    source = _write(tmp_path / "source", b"lorem ipsum")
+    destination = str(tmp_path / "destination")
+
+    assert cache.get("key", destination) is False
+    assert not os.path.exists(destination)
+
+    cache.put("key", source)
+    assert cache.get("key", destination) is True
+    assert _read(destination) == b"lorem ipsum"
+    assert cache.get("other-key", destination) is False
+
+
+def test_put_overwrites(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024)
+    destination = str(tmp_path / "destination")
+
+    cache.put("key", _write(tmp_path / "source_1", b"first"))
+    cache.put("key", _write(tmp_path / "source_2", b"second"))
+    assert cache.get("key", destination) is True
+    assert _read(destination) == b"second"
+
+
+def test_delete(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024)
+    destination = str(tmp_path / "destination")
+
+    cache.put("key", _write(tmp_path / "source", b"lorem ipsum"))
+    cache.delete("key")
+    cache.delete("key")
+    assert cache.get("key", destination) is False
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=25)
+    destination = str(tmp_path / "destination")
+
+    cache.put("a", _write(tmp_path / "a", b"a" * 10))
+    cache.put("b", _write(tmp_path / "b", b"b" * 10))
+    # make "a" older than "b", then use it so "b" becomes the least recently used
+    os.utime(cache._entry_path("a"), (time.time() - 100, time.time() - 100))
+    os.utime(cache._entry_path("b"), (time.time() - 50, time.time() - 50))
+    assert cache.get("a", destination) is True
+
+    cache.put("c", _write(tmp_path / "c", b"c" * 10))
+
+    assert cache.get("a", destination) is True
+    assert cache.get("b", destination) is False
+    assert cache.get("c", destination) is True
+
+
+def test_does_not_cache_files_larger_than_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=5)
+    destination = str(tmp_path / "destination")
+
+    cache.put("key", _write(tmp_path / "source", b"lorem ipsum"))
+    assert cache.get("key", destination) is False
+
+
+def test_evict_removes_stale_temp_files(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024)
+    stale = _write(tmp_path / "cache" / f"{TEMP_PREFIX}stale", b"stale")
+    fresh = _write(tmp_path / "cache" / f"{TEMP_PREFIX}fresh", b"fresh")
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+
+    cache.evict()
+
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+def test_put_bytes_then_open(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    assert cache.open("key") is None
+    cache.put_bytes("key", b"lorem ipsum")
+    with cache.open("key") as f:
+        assert f.read() == b"lorem ipsum"
+
+    cache.put_bytes("too-large", b"a" * 2048)
+    assert cache.open("too-large") is None
+
+
+def test_writer(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    with cache.writer("key") as f:
+        f.write(b"lorem ipsum")
+        f.seek(0)
+        assert f.read() == b"lorem ipsum"
+    with cache.open("key") as f:
+        assert f.read() == b"lorem ipsum"
+
+    with cache.writer("too-large") as f:
+        f.write(b"a" * 2048)
+    assert cache.open("too-large") is None
+
+    with pytest.raises(ValueError):
+        with cache.writer("failed") as f:
+            f.write(b"partial")
+            raise ValueError()
+    assert cache.open("failed") is None
+    assert not any(
+        name.startswith(TEMP_PREFIX) for name in os.listdir(tmp_path / "cache")
+    )
@@ -1,4 +1,8 @@
-from shared.storage import get_appropriate_storage_service
+from shared.storage import (
+    get_appropriate_async_storage_service,
+    get_appropriate_storage_service,
+)
+from shared.storage.async_storage import AsyncStorageService
 from shared.storage.minio import MinioStorageService
 
 minio_config = {
@@ -20,3 +24,11 @@ class TestStorageInitialization(object):
         res = get_appropriate_storage_service()
         assert isinstance(res, MinioStorageService)
         assert res.minio_config == minio_config
+
+    def test_get_appropriate_async_storage_service(self, mock_configuration):
+        mock_configuration.params["services"] = {
+            "minio": minio_config,
+        }
+        res = get_appropriate_async_storage_service()
+        assert isinstance(res, AsyncStorageService)
+        assert res.minio_config == minio_config
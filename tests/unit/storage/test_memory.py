@@ -3,7 +3,11 @@ from uuid import uuid4
 
 import pytest
 
-from shared.storage.exceptions import BucketAlreadyExistsError, FileNotInStorageError
+from shared.storage.exceptions import (
+    BatchStorageError,
+    BucketAlreadyExistsError,
+    FileNotInStorageError,
+)
 from shared.storage.memory import MemoryStorageService
 
 BUCKET_NAME = "archivetest"
@@ -98,3 +102,62 @@ def test_delete_file_doesnt_exist():
     ensure_bucket(storage)
     with pytest.raises(FileNotInStorageError):
         storage.delete_file(BUCKET_NAME, path)
+
+
+def test_write_then_get_etag():
+    storage = make_storage()
+    path = f"test_write_then_get_etag/{uuid4().hex}"
+
+    ensure_bucket(storage)
+    storage.write_file(BUCKET_NAME, path, "lorem ipsum")
+    etag = storage.get_etag(BUCKET_NAME, path)
+    assert etag
+    assert storage.get_etag(BUCKET_NAME, path) == etag
+
+    storage.write_file(BUCKET_NAME, path, "dolor sit amet")
+    assert storage.get_etag(BUCKET_NAME, path) != etag
+
+
+def test_get_etag_file_does_not_exist():
+    storage = make_storage()
+    path = f"test_get_etag_file_does_not_exist/{uuid4().hex}"
+
+    ensure_bucket(storage)
+    with pytest.raises(FileNotInStorageError):
+        storage.get_etag(BUCKET_NAME, path)
+
+
+def test_write_then_read_files():
+    storage = make_storage()
+    prefix = f"test_write_then_read_files/{uuid4().hex}"
+    files = {f"{prefix}/{i}": f"lorem ipsum {i} á" for i in range(25)}
+
+    ensure_bucket(storage)
+    storage.write_files(BUCKET_NAME, files)
+    missing_path = f"{prefix}/missing"
+    reading_result = storage.read_files(BUCKET_NAME, [*files, missing_path])
+    assert {path: data.decode() for path, data in reading_result.items()} == files
+
+
+def test_write_files_errors():
+    storage = make_storage()
+    prefix = f"test_write_files_errors/{uuid4().hex}"
+
+    ensure_bucket(storage)
+    with pytest.raises(BatchStorageError) as excinfo:
+        storage.write_files(
+            BUCKET_NAME, {f"{prefix}/ok": "lorem ipsum", f"{prefix}/invalid": 1}
+        )
+    assert list(excinfo.value.errors) == [f"{prefix}/invalid"]
+    assert storage.read_file(BUCKET_NAME, f"{prefix}/ok") == b"lorem ipsum"
+
+
+def test_write_then_delete_files():
+    storage = make_storage()
+    prefix = f"test_write_then_delete_files/{uuid4().hex}"
+    files = {f"{prefix}/{i}": f"lorem ipsum {i}" for i in range(25)}
+
+    ensure_bucket(storage)
+    storage.write_files(BUCKET_NAME, files)
+    storage.delete_files(BUCKET_NAME, [*files, f"{prefix}/missing"])
+    assert storage.read_files(BUCKET_NAME, files) == {}
@@ -0,0 +1,132 @@
+from unittest.mock import Mock
+from uuid import uuid4
+
+import pytest
+from prometheus_client import REGISTRY
+from urllib3.exceptions import MaxRetryError
+
+from shared.storage.exceptions import FileNotInStorageError
+from shared.storage.metrics import (
+    RecordingRetry,
+    get_object_kind,
+    path_template_regex,
+    register_object_kinds,
+)
+from shared.storage.minio import MinioStorageService
+
+BUCKET_NAME = "archivetest"
+
+register_object_kinds(
+    {"test_metrics": path_template_regex("test_metrics/{test}/{id}.txt")}
+)
+
+
+def make_storage() -> MinioStorageService:
+    storage = MinioStorageService(
+        {
+            "access_key_id": "codecov-default-key",
+            "secret_access_key": "codecov-default-secret",
+            "verify_ssl": False,
+            "host": "minio",
+            "port": "9000",
+        }
+    )
+    try:
+        storage.create_root_storage(BUCKET_NAME)
+    except Exception:
+        pass
+    return storage
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_get_object_kind():
+    assert get_object_kind("test_metrics/abc/123.txt") == "test_metrics"
+    assert get_object_kind("test_metrics/abc/def/123.txt") == "other"
+    assert get_object_kind(None) == "other"
+
+
+def test_write_then_read_file_metrics():
+    storage = make_storage()
+    path = f"test_metrics/test_write_then_read_file_metrics/{uuid4().hex}.txt"
+    data = "lorem ipsum dolor " * 1000
+    labels = dict(bucket=BUCKET_NAME, kind="test_metrics")
+
+    before = {
+        "write_count": sample(
+            "storage_request_duration_seconds_count", operation="write_file", **labels
+        ),
+        "read_count": sample(
+            "storage_request_duration_seconds_count", operation="read_file", **labels
+        ),
+        "written": sample(
+            "storage_bytes_total", direction="write", encoding="uncompressed", **labels
+        ),
+        "written_compressed": sample(
+            "storage_bytes_total", direction="write", encoding="compressed", **labels
+        ),
+        "read": sample(
+            "storage_bytes_total", direction="read", encoding="uncompressed", **labels
+        ),
+    }
+
+    storage.write_file(BUCKET_NAME, path, data)
+    assert storage.read_file(BUCKET_NAME, path).decode() == data
+
+    assert (
+        sample(
+            "storage_request_duration_seconds_count", operation="write_file", **labels
+        )
+        == before["write_count"] + 1
+    )
+    assert (
+        sample(
+            "storage_request_duration_seconds_count", operation="read_file", **labels
+        )
+        == before["read_count"] + 1
+    )
+    assert sample(
+        "storage_bytes_total", direction="write", encoding="uncompressed", **labels
+    ) == before["written"] + len(data)
+    written_compressed = (
+        sample(
+            "storage_bytes_total", direction="write", encoding="compressed", **labels
+        )
+        - before["written_compressed"]
+    )
+    assert 0 < written_compressed < len(data)
+    assert sample(
+        "storage_bytes_total", direction="read", encoding="uncompressed", **labels
+    ) == before["read"] + len(data)
+
+
+def test_read_file_failure_metrics():
+    storage = make_storage()
+    path = f"test_metrics/test_read_file_failure_metrics/{uuid4().hex}.txt"
+    labels = dict(
+        operation="read_file",
+        bucket=BUCKET_NAME,
+        kind="test_metrics",
+        error="FileNotInStorageError",
+    )
+
+    before = sample("storage_request_failures_total", **labels)
+    with pytest.raises(FileNotInStorageError):
+        storage.read_file(BUCKET_NAME, path)
+    assert sample("storage_request_failures_total", **labels) == before + 1
+
+
+def test_recording_retry():
+    labels = dict(method="GET", reason="503")
+    before = sample("storage_request_retries_total", **labels)
+
+    retry = RecordingRetry(total=1, status_forcelist=[503])
+    response = Mock(status=503, headers={})
+    retry = retry.increment("GET", "/", response=response)
+    assert sample("storage_request_retries_total", **labels) == before + 1
+
+    with pytest.raises(MaxRetryError):
+        retry.increment("GET", "/", response=response)
+    assert sample("storage_request_retries_total", **labels) == before + 1
@@ -1,12 +1,20 @@
 import gzip
+import os
 import tempfile
 from io import BytesIO
 from uuid import uuid4
 
+import orjson
 import pytest
 import zstandard
 
-from shared.storage.exceptions import BucketAlreadyExistsError, FileNotInStorageError
+from shared.reports.resources import Report, ReportFile
+from shared.reports.types import ReportLine
+from shared.storage.exceptions import (
+    BatchStorageError,
+    BucketAlreadyExistsError,
+    FileNotInStorageError,
+)
 from shared.storage.minio import MinioStorageService, zstd_decoded_by_default
 
 BUCKET_NAME = "archivetest"
@@ -344,3 +352,178 @@ def test_write_then_read_file_with_metadata():
     )
     assert reading_result.decode() == data
     assert metadata_container == {"test": "test"}
+
+
+def test_write_then_get_etag():
+    storage = make_storage()
+    path = f"test_write_then_get_etag/{uuid4().hex}"
+
+    ensure_bucket(storage)
+    storage.write_file(BUCKET_NAME, path, "lorem ipsum")
+    etag = storage.get_etag(BUCKET_NAME, path)
+    assert etag
+    assert storage.get_etag(BUCKET_NAME, path) == etag
+
+    storage.write_file(BUCKET_NAME, path, "dolor sit amet")
+    assert storage.get_etag(BUCKET_NAME, path) != etag
+
+
+def test_get_etag_file_does_not_exist():
+    storage = make_storage()
+    path = f"test_get_etag_file_does_not_exist/{uuid4().hex}"
+
+    ensure_bucket(storage)
+    with pytest.raises(FileNotInStorageError):
+        storage.get_etag(BUCKET_NAME, path)
+
+
+def test_write_then_read_files():
+    storage = make_storage()
+    prefix = f"test_write_then_read_files/{uuid4().hex}"
+    files = {f"{prefix}/{i}": f"lorem ipsum {i} á" for i in range(25)}
+
+    ensure_bucket(storage)
+    storage.write_files(BUCKET_NAME, files)
+    missing_path = f"{prefix}/missing"
+    reading_result = storage.read_files(BUCKET_NAME, [*files, missing_path])
+    assert {path: data.decode() for path, data in reading_result.items()} == files
+
+
+def test_write_files_errors():
+    storage = make_storage()
+    prefix = f"test_write_files_errors/{uuid4().hex}"
+
+    ensure_bucket(storage)
+    with pytest.raises(BatchStorageError) as excinfo:
+        storage.write_files(
+            BUCKET_NAME, {f"{prefix}/ok": "lorem ipsum", f"{prefix}/invalid": 1}
+        )
+    assert list(excinfo.value.errors) == [f"{prefix}/invalid"]
+    assert storage.read_file(BUCKET_NAME, f"{prefix}/ok") == b"lorem ipsum"
+
+
+def test_write_then_delete_files():
+    storage = make_storage()
+    prefix = f"test_write_then_delete_files/{uuid4().hex}"
+    files = {f"{prefix}/{i}": f"lorem ipsum {i}" for i in range(25)}
+
+    ensure_bucket(storage)
+    storage.write_files(BUCKET_NAME, files)
+    storage.delete_files(BUCKET_NAME, [*files, f"{prefix}/missing"])
+    assert storage.read_files(BUCKET_NAME, files) == {}
+
+
+@pytest.mark.parametrize("compression_type", [None, "gzip", "zstd"])
+def test_read_file_small_read_buffer(compression_type):
+    storage = make_storage()
+    storage.read_buffer_size = 1000
+    path = f"test_read_file_small_read_buffer/{uuid4().hex}"
+    data = "".join(f"lorem ipsum {i} á\n" for i in range(10000))
+
+    ensure_bucket(storage)
+    storage.write_file(BUCKET_NAME, path, data, compression_type=compression_type)
+
+    reading_result = storage.read_file(BUCKET_NAME, path)
+    assert isinstance(reading_result, bytes)
+    assert reading_result.decode() == data
+
+    with tempfile.TemporaryFile() as f:
+        storage.read_file(BUCKET_NAME, path, file_obj=f)
+        f.seek(0)
+        assert f.read().decode() == data
+
+
+def test_write_then_read_file_zstd_content_size(mocker):
+    storage = make_storage()
+    storage.read_buffer_size = 1000
+    path = f"test_write_then_read_file_zstd_content_size/{uuid4().hex}"
+    data = "".join(f"lorem ipsum {i} á\n" for i in range(10000)).encode()
+
+    ensure_bucket(storage)
+    storage.write_file(BUCKET_NAME, path, data)
+
+    # the frame records the size of its content
+    response = storage.minio_client.get_object(BUCKET_NAME, path)
+    try:
+        compressed = response.read(decode_content=False)
+    finally:
+        response.close()
+        response.release_conn()
+    assert zstandard.frame_content_size(compressed) == len(data)
+
+    # so the compressed body is decompressed into a single allocation
+    read_exact = mocker.spy(storage, "_read_exact")
+    decompress = mocker.spy(MinioStorageService, "_decompress")
+    reading_result = storage.read_file(BUCKET_NAME, path)
+    assert isinstance(reading_result, bytes)
+    assert reading_result == data
+    assert read_exact.call_count == 1
+    assert read_exact.spy_return == compressed
+    assert decompress.call_count == 1
+
+    # frames without a content size are still decompressed
+    path = f"{path}/no_content_size"
+    cctx = zstandard.ZstdCompressor(write_content_size=False)
+    storage.write_file(
+        BUCKET_NAME,
+        path,
+        cctx.compress(data),
+        compression_type="zstd",
+        is_compressed=True,
+    )
+    assert storage.read_file(BUCKET_NAME, path) == data
+
+
+@pytest.mark.parametrize("compression_type", [None, "zstd"])
+@pytest.mark.parametrize("as_file", [False, True])
+def test_write_then_read_file_multipart(compression_type, as_file):
+    storage = MinioStorageService(
+        {
+            "access_key_id": "codecov-default-key",
+            "secret_access_key": "codecov-default-secret",
+            "verify_ssl": False,
+            "host": "minio",
+            "port": "9000",
+            "part_size": 1024,
+            "upload_concurrency": 3,
+        }
+    )
+    assert storage.part_size == 5 * 1024 * 1024
+    path = f"test_write_then_read_file_multipart/{uuid4().hex}"
+    # random data is incompressible, so compressed uploads span several parts too
+    data = os.urandom(12 * 1024 * 1024)
+
+    ensure_bucket(storage)
+    if as_file:
+        with tempfile.TemporaryFile() as f:
+            f.write(data)
+            f.seek(0)
+            storage.write_file(BUCKET_NAME, path, f, compression_type=compression_type)
+    else:
+        storage.write_file(BUCKET_NAME, path, data, compression_type=compression_type)
+
+    assert storage.read_file(BUCKET_NAME, path) == data
+    stat = storage.minio_client.stat_object(BUCKET_NAME, path)
+    # the ETag of multipart uploads ends with their number of parts
+    assert stat.etag.endswith("-3")
+
+
+def test_write_then_read_report_chunks():
+    storage = make_storage()
+    path = f"test_write_then_read_report_chunks/{uuid4().hex}"
+    report = Report()
+    report_file = ReportFile("file.py")
+    report_file.append(1, ReportLine.create(coverage=1))
+    report_file.append(2, ReportLine.create(coverage=0))
+    report.append(report_file)
+    report_json, chunks, _totals = report.serialize()
+
+    ensure_bucket(storage)
+    storage.write_file(BUCKET_NAME, path, chunks)
+
+    content = storage.read_file(BUCKET_NAME, path)
+    assert isinstance(content, bytes)
+    read_report = Report(files=orjson.loads(report_json)["files"], chunks=content)
+    assert read_report.files == ["file.py"]
+    assert read_report.totals.lines == 2
+    assert read_report.totals.hits == 1
@@ -0,0 +1,156 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+import zstandard
+
+from shared.storage import zstd_dictionaries
+from shared.storage.async_storage import AsyncStorageService
+from shared.storage.memory import MemoryStorageService
+from shared.storage.minio import HTTP_POOL_MAXSIZE, MinioStorageService
+from shared.storage.zstd_dictionaries import (
+    ZSTD_DICTIONARY_METADATA_KEY,
+    get_dictionary_path,
+    train_dictionary,
+)
+
+BUCKET_NAME = "archivetest"
+
+minio_config = {
+    "access_key_id": "codecov-default-key",
+    "secret_access_key": "codecov-default-secret",
+    "verify_ssl": False,
+    "host": "minio",
+    "port": "9000",
+    "iam_auth": False,
+    "iam_endpoint": None,
+}
+
+
+def make_sample(i: int) -> str:
+    return json.dumps(
+        {
+            "files": {
+                f"src/module_{i}_{j}.py": {
+                    "lines": 100 + i * j,
+                    "hits": 90 + j,
+                    "misses": 10 + i,
+                    "coverage": f"{(i * j) % 100}.00",
+                }
+                for j in range(10)
+            },
+            "sessions": {"0": {"flags": ["unit"], "provider": "github"}},
+        }
+    )
+
+
+def make_storage() -> MinioStorageService:
+    storage = MinioStorageService(minio_config)
+    try:
+        storage.create_root_storage(BUCKET_NAME)
+    except Exception:
+        pass
+    return storage
+
+
+@pytest.fixture(scope="module")
+def trained_dictionary():
+    storage = make_storage()
+    prefix = f"test_zstd_dictionaries/{uuid4().hex}"
+    samples = {f"{prefix}/{i}.json": make_sample(i) for i in range(100)}
+    storage.write_files(BUCKET_NAME, samples)
+
+    name = train_dictionary(
+        storage, BUCKET_NAME, f"json_data_{uuid4().hex}", 1, samples, dict_size=4096
+    )
+    return storage, name
+
+
+def test_train_dictionary(trained_dictionary):
+    storage, name = trained_dictionary
+
+    dictionary = zstandard.ZstdCompressionDict(
+        storage.read_file(BUCKET_NAME, get_dictionary_path(name))
+    )
+    assert dictionary.dict_id()
+    with pytest.raises(ValueError):
+        train_dictionary(storage, BUCKET_NAME, name.rsplit(".v", 1)[0], 1, [])
+
+
+def test_train_dictionary_memory_storage():
+    storage = MemoryStorageService({})
+    samples = {f"sample/{i}.json": make_sample(i) for i in range(300)}
+    storage.write_files(BUCKET_NAME, samples)
+
+    name = train_dictionary(storage, BUCKET_NAME, "json_data", 3, samples)
+    assert name == "json_data.v3"
+    assert storage.read_file(BUCKET_NAME, "zstd_dictionaries/json_data.v3.zdict")
+
+
+def test_write_then_read_file_with_dictionary(trained_dictionary):
+    storage, name = trained_dictionary
+    path = f"test_write_then_read_file_with_dictionary/{uuid4().hex}"
+    data = make_sample(1000)
+
+    storage.write_file(BUCKET_NAME, path, data, zstd_dictionary=name)
+
+    response = storage.minio_client.get_object(BUCKET_NAME, path)
+    assert response.headers.get(f"x-amz-meta-{ZSTD_DICTIONARY_METADATA_KEY}") == name
+    assert "Content-Encoding" not in response.headers
+    compressed = response.read(decode_content=False)
+    assert len(compressed) < len(zstandard.ZstdCompressor().compress(data.encode()))
+
+    metadata = {}
+    assert (
+        storage.read_file(BUCKET_NAME, path, metadata_container=metadata).decode()
+        == data
+    )
+    assert metadata == {}
+
+
+def test_write_file_with_dictionary_without_zstd(trained_dictionary):
+    storage, name = trained_dictionary
+    path = f"test_write_file_with_dictionary_without_zstd/{uuid4().hex}"
+    data = make_sample(1000)
+
+    storage.write_file(
+        BUCKET_NAME, path, data, compression_type="gzip", zstd_dictionary=name
+    )
+    response = storage.minio_client.get_object(BUCKET_NAME, path)
+    assert response.headers.get("Content-Encoding") == "gzip"
+    assert storage.read_file(BUCKET_NAME, path).decode() == data
+
+
+@pytest.mark.asyncio
+async def test_async_storage_with_dictionary(trained_dictionary):
+    storage, name = trained_dictionary
+    path = f"test_async_storage_with_dictionary/{uuid4().hex}"
+    data = make_sample(1000)
+
+    storage.write_file(BUCKET_NAME, path, data, zstd_dictionary=name)
+    async with AsyncStorageService(minio_config) as async_storage:
+        assert (await async_storage.read_file(BUCKET_NAME, path)).decode() == data
+
+        await async_storage.write_file(
+            BUCKET_NAME, path, data[::-1], zstd_dictionary=name
+        )
+    assert storage.read_file(BUCKET_NAME, path).decode() == data[::-1]
+
+
+@pytest.mark.asyncio
+async def test_async_storage_read_files_with_dictionary_not_cached(
+    trained_dictionary, mocker
+):
+    storage, name = trained_dictionary
+    prefix = f"test_async_storage_read_files_with_dictionary_not_cached/{uuid4().hex}"
+    files = {f"{prefix}/{i}": make_sample(i) for i in range(HTTP_POOL_MAXSIZE + 5)}
+    storage.write_files(BUCKET_NAME, files, zstd_dictionary=name)
+
+    # every read of the batch has to fetch the dictionary
+    mocker.patch.dict(zstd_dictionaries._dictionaries, clear=True)
+    async with AsyncStorageService(minio_config) as async_storage:
+        reading_result = await asyncio.wait_for(
+            async_storage.read_files(BUCKET_NAME, files), timeout=30
+        )
+    assert {path: data.decode() for path, data in reading_result.items()} == files
@@ -4,10 +4,16 @@ from hashlib import md5
 
 import pytest
 
-from shared.api_archive.archive import ArchiveService, MinioEndpoints
+from shared.api_archive.archive import (
+    ArchiveService,
+    MinioEndpoints,
+    is_immutable_path,
+)
 from shared.config import ConfigHelper
 from shared.django_apps.core.tests.factories import RepositoryFactory
-from shared.utils.ReportEncoder import ReportEncoder
+from shared.reports.types import ReportTotals
+from shared.storage.cached import CachedStorageService
+from shared.utils.ReportEncoder import JSON_STREAM_ITEMS, ReportEncoder, dumps_json
 
 pytestmark = pytest.mark.django_db
 
@@ -39,6 +45,20 @@ class TestMinioEndpoints:
         )
         assert path == "v4/raw/2023-01-01/abc123/def456/report123.txt"
 
+    def test_matches(self):
+        assert MinioEndpoints.chunks.matches(
+            "v4/repos/abc123/commits/def456/chunks.txt"
+        )
+        assert not MinioEndpoints.chunks.matches(
+            "v4/repos/abc123/commits/def456/json_data/coverage/totals/789.json"
+        )
+        assert is_immutable_path(
+            "bucket", "v4/raw/2023-01-01/abc123/def456/report123/upload456.txt"
+        )
+        assert not is_immutable_path(
+            "bucket", "v4/repos/abc123/json_data/coverage/totals/789.json"
+        )
+
 
 @pytest.fixture
 def mock_config(mocker):
@@ -160,8 +180,7 @@ class TestArchiveService:
         assert path == expected_path
 
         result = archive_service.read_file(path)
-        expected_data = json.dumps(data, cls=ReportEncoder)
-        assert result == expected_data
+        assert json.loads(result) == data
 
     def test_write_json_data_to_storage_without_commit(
         self, mock_config, archive_service
@@ -182,8 +201,7 @@ class TestArchiveService:
         assert path == expected_path
 
         result = archive_service.read_file(path)
-        expected_data = json.dumps(data, cls=ReportEncoder)
-        assert result == expected_data
+        assert json.loads(result) == data
 
     def test_write_json_data_to_storage_no_hash(self, mocker):
         mock_get_config = mocker.patch("shared.api_archive.archive.get_config")
@@ -206,20 +224,83 @@ class TestArchiveService:
     def test_write_json_data_to_storage_custom_encoder(
         self, mocker, mock_config, archive_service
     ):
-        mock_json_dumps = mocker.patch("json.dumps")
-        mock_json_dumps.return_value = '{"key": "value"}'
-
-        data = {"key": "value"}
+        data = {"key": "value", "set": {1}}
 
         class CustomEncoder(ReportEncoder):
-            pass
+            def default(self, obj):
+                if isinstance(obj, set):
+                    return sorted(obj)
+                return super().default(obj)
 
         path = archive_service.write_json_data_to_storage(
             "commit123", "table1", "field1", "external1", data, encoder=CustomEncoder
         )
 
-        mock_json_dumps.assert_called_once_with(data, cls=CustomEncoder)
+        result = archive_service.read_file(path)
+
+        assert result == '{"key":"value","set":[1]}'
+
+    def test_write_json_data_to_storage_stream(self, mock_config, archive_service):
+        data = {
+            "files": {
+                f"file_{i}.py": [i, ReportTotals(files=i)]
+                for i in range(JSON_STREAM_ITEMS + 1)
+            },
+            "sessions": {},
+        }
+
+        path = archive_service.write_json_data_to_storage(
+            "commit123", "table1", "field1", "external1", data, stream=True
+        )
 
         result = archive_service.read_file(path)
+        assert result == dumps_json(data).decode()
+        assert json.loads(result) == json.loads(json.dumps(data, cls=ReportEncoder))
 
-        assert result == '{"key": "value"}'
+    def test_write_json_data_to_storage_zstd_dictionary(
+        self, mocker, mock_config, archive_service
+    ):
+        mock_config.set_params(
+            {
+                **mock_config.params,
+                "services": {
+                    **mock_config.params["services"],
+                    "minio": {
+                        **mock_config.params["services"]["minio"],
+                        "zstd_dictionaries": {"json_data": "json_data.v1"},
+                    },
+                },
+            }
+        )
+        mock_write_file = mocker.patch.object(archive_service.storage, "write_file")
+
+        archive_service.write_json_data_to_storage(
+            "commit123", "table1", "field1", "external1", {"key": "value"}
+        )
+        assert mock_write_file.call_args.kwargs["zstd_dictionary"] == "json_data.v1"
+
+        archive_service.write_json_data_to_storage(
+            None, "table1", "field1", "external1", {"key": "value"}
+        )
+        assert "zstd_dictionary" not in mock_write_file.call_args.kwargs
+
+    def test_local_cache(self, mocker, mock_config, mock_repo, tmp_path):
+        mock_config.params["services"]["minio"]["local_cache"] = {
+            "enabled": True,
+            "directory": str(tmp_path),
+        }
+        archive_service = ArchiveService(mock_repo)
+        assert isinstance(archive_service.storage, CachedStorageService)
+
+        archive_service.write_file("test/path", "test data")
+        path = MinioEndpoints.chunks.get_path(
+            version="v4", repo_hash=archive_service.storage_hash, commitid="commit123"
+        )
+        archive_service.write_file(path, "chunk data")
+
+        read_file = mocker.spy(archive_service.storage.storage, "read_file")
+        assert archive_service.read_chunks("commit123") == "chunk data"
+        assert archive_service.read_chunks("commit123") == "chunk data"
+        assert archive_service.read_file("test/path") == "test data"
+        assert archive_service.read_file("test/path") == "test data"
+        assert read_file.call_count == 3
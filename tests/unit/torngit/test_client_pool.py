@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from shared.torngit.base import TorngitBaseAdapter
+from shared.torngit.client_pool import (
+    PooledAsyncClient,
+    close_clients,
+    get_pool_limits,
+    get_pooled_client,
+)
+from shared.torngit.github import Github
+from shared.torngit.gitlab import Gitlab
+
+TIMEOUT = httpx.Timeout(30, connect=10)
+
+
+@pytest.mark.asyncio
+async def test_get_pooled_client_reused():
+    client = get_pooled_client("github", verify=True, timeout=TIMEOUT)
+    assert isinstance(client, PooledAsyncClient)
+
+    with respx.mock:
+        respx.get("https://api.github.com/user").respond(200, json={})
+        async with client as c:
+            assert c is client
+            await c.request("GET", "https://api.github.com/user")
+    assert not client.is_closed
+
+    assert get_pooled_client("github", verify=True, timeout=TIMEOUT) is client
+    assert (
+        get_pooled_client("github", verify=True, timeout=httpx.Timeout(30, connect=10))
+        is client
+    )
+    assert get_pooled_client("gitlab", verify=True, timeout=TIMEOUT) is not client
+    assert get_pooled_client("github", verify=False, timeout=TIMEOUT) is not client
+    assert (
+        get_pooled_client("github", verify=True, timeout=httpx.Timeout(5)) is not client
+    )
+
+    await close_clients()
+    assert client.is_closed
+    assert get_pooled_client("github", verify=True, timeout=TIMEOUT) is not client
+    await close_clients()
+
+
+def test_get_pooled_client_per_event_loop():
+    async def get_client():
+        client = get_pooled_client("github", verify=True, timeout=TIMEOUT)
+        await close_clients()
+        return client
+
+    assert asyncio.run(get_client()) is not asyncio.run(get_client())
+
+
+def test_get_pooled_client_no_event_loop():
+    client = get_pooled_client("github", verify=True, timeout=TIMEOUT)
+    assert type(client) is httpx.AsyncClient
+
+
+def test_get_pool_limits(mock_configuration):
+    mock_configuration._params["setup"]["torngit"] = {"max_connections": 10}
+    limits = get_pool_limits()
+    assert limits.max_connections == 10
+    assert limits.max_keepalive_connections == 20
+
+
+@pytest.mark.asyncio
+async def test_adapters_get_client():
+    github = Github(token={"key": "token"})
+    other_github = Github(token={"key": "other_token"})
+    gitlab = Gitlab(token={"key": "token"})
+
+    client = github.get_client()
+    assert other_github.get_client() is client
+    assert gitlab.get_client() is not client
+    assert github.get_client(timeouts=[5, 15]) is not client
+    assert TorngitBaseAdapter().get_client().timeout == TIMEOUT
+
+    await close_clients()
+
+
+def test_clients_closed_on_event_loop_shutdown():
+    async def get_clients():
+        closed_client = get_pooled_client("github", verify=True, timeout=TIMEOUT)
+        await close_clients()
+        # clients created after an explicit close are closed on shutdown too
+        client = get_pooled_client("github", verify=True, timeout=TIMEOUT)
+        return closed_client, client
+
+    closed_client, client = asyncio.run(get_clients())
+    assert closed_client.is_closed
+    assert client.is_closed
+
+    loop = asyncio.new_event_loop()
+    try:
+        _, client = loop.run_until_complete(get_clients())
+        assert not client.is_closed
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        assert client.is_closed
+    finally:
+        loop.close()
+
+
+@pytest.mark.asyncio
+async def test_adapters_dont_share_cookies():
+    github = Github(token={"key": "token"})
+    other_github = Github(token={"key": "other_token"})
+    assert github.get_client() is other_github.get_client()
+
+    with respx.mock:
+        route = respx.get("https://api.github.com/user").mock(
+            side_effect=[
+                httpx.Response(
+                    200, json={}, headers={"Set-Cookie": "session=secret; Path=/"}
+                ),
+                httpx.Response(200, json={}),
+            ]
+        )
+        async with github.get_client() as client:
+            await github.api(client, "get", "/user")
+        async with other_github.get_client() as client:
+            await other_github.api(client, "get", "/user")
+
+    assert route.calls[0].request.headers["Authorization"] == "token token"
+    second_request = route.calls[1].request
+    assert second_request.headers["Authorization"] == "token other_token"
+    assert "Cookie" not in second_request.headers
+    assert not github.get_client().cookies
+
+    await close_clients()
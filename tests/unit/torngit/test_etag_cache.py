@@ -0,0 +1,131 @@
+import httpx
+import pytest
+import respx
+from prometheus_client import REGISTRY
+
+from shared.helpers.cache import NO_VALUE, BaseBackend, NullBackend, cache
+from shared.torngit.etag_cache import (
+    ETAG_CACHE_MAX_CONTENT_SIZE,
+    get_etag_cache_key,
+    get_token_identity,
+)
+from shared.torngit.exceptions import TorngitClientGeneralError
+from shared.torngit.github import Github
+
+
+class DictBackend(BaseBackend):
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key, NO_VALUE)
+
+    def set(self, key, ttl, value):
+        self.values[key] = value
+
+
+@pytest.fixture
+def backend():
+    backend = DictBackend()
+    cache.configure(backend)
+    yield backend
+    cache.configure(NullBackend())
+
+
+@pytest.fixture
+def handler():
+    return Github(
+        repo=dict(name="example-python"),
+        owner=dict(username="codecov"),
+        token=dict(key="some_key"),
+    )
+
+
+def get_hits(result):
+    return REGISTRY.get_sample_value(
+        "git_provider_etag_cache_total", labels=dict(service="github", result=result)
+    )
+
+
+def test_get_token_identity():
+    assert get_token_identity(None) == "anonymous"
+    assert get_token_identity(dict(key="abc", entity_name="1234_5678")) == "1234_5678"
+    identity = get_token_identity(dict(key="abc"))
+    assert "abc" not in identity
+    assert identity != get_token_identity(dict(key="abd"))
+
+
+def test_get_etag_cache_key():
+    token = dict(key="abc")
+    key = get_etag_cache_key("github", "https://api.github.com/a", "*/*", token)
+    assert key.startswith("etag_cache:github:")
+    assert key == get_etag_cache_key("github", "https://api.github.com/a", "*/*", token)
+    assert key != get_etag_cache_key("github", "https://api.github.com/b", "*/*", token)
+    assert key != get_etag_cache_key("github", "https://api.github.com/a", "a", token)
+    assert key != get_etag_cache_key(
+        "github", "https://api.github.com/a", "*/*", dict(key="abd")
+    )
+
+
+@pytest.mark.asyncio
+async def test_revalidated_response(backend, handler):
+    before_hits, before_misses = get_hits("hit") or 0, get_hits("miss") or 0
+    with respx.mock:
+        route = respx.get("https://api.github.com/repos/codecov/example-python").mock(
+            side_effect=[
+                httpx.Response(
+                    200,
+                    json={"name": "example-python"},
+                    headers={"ETag": '"abc"', "X-RateLimit-Remaining": "10"},
+                ),
+                httpx.Response(
+                    304, headers={"ETag": '"abc"', "X-RateLimit-Remaining": "9"}
+                ),
+                httpx.Response(
+                    200, json={"name": "renamed"}, headers={"ETag": '"def"'}
+                ),
+            ]
+        )
+        async with handler.get_client() as client:
+            url = "/repos/codecov/example-python"
+            assert await handler.api(client, "get", url) == {"name": "example-python"}
+
+            res = await handler.make_http_call(
+                client, "get", url, token_to_use=handler.token
+            )
+            assert res.status_code == 200
+            assert res.json() == {"name": "example-python"}
+            assert res.headers["X-RateLimit-Remaining"] == "9"
+
+            assert await handler.api(client, "get", url) == {"name": "renamed"}
+
+    requests = [call.request for call in route.calls]
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"abc"'
+    assert requests[2].headers["If-None-Match"] == '"abc"'
+    assert [value["etag"] for value in backend.values.values()] == ['"def"']
+    assert get_hits("hit") - before_hits == 1
+    assert get_hits("miss") - before_misses == 1
+
+
+@pytest.mark.asyncio
+async def test_uncached_responses(backend, handler):
+    with respx.mock:
+        respx.get("https://api.github.com/no_etag").respond(200, json={})
+        respx.get("https://api.github.com/too_large").respond(
+            200,
+            text="a" * (ETAG_CACHE_MAX_CONTENT_SIZE + 1),
+            headers={"ETag": "1"},
+        )
+        respx.post("https://api.github.com/post").respond(
+            201, json={}, headers={"ETag": "1"}
+        )
+        respx.get("https://api.github.com/not_modified").respond(304)
+        async with handler.get_client() as client:
+            await handler.api(client, "get", "/no_etag")
+            await handler.api(client, "get", "/too_large")
+            await handler.api(client, "post", "/post", body={"a": 1})
+            # a 304 the cache didn't ask for is still an error
+            with pytest.raises(TorngitClientGeneralError):
+                await handler.api(client, "get", "/not_modified")
+    assert backend.values == {}
@@ -1,5 +1,6 @@
 import asyncio
 import datetime
+import json
 import pickle
 from typing import Dict
 from urllib.parse import parse_qs, parse_qsl, urlparse
@@ -22,7 +23,7 @@ from shared.torngit.exceptions import (
     TorngitServerUnreachableError,
     TorngitUnauthorizedError,
 )
-from shared.torngit.github import Github
+from shared.torngit.github import Github, GraphQLBatch
 from shared.torngit.github import log as gh_log
 from shared.typings.torngit import GithubInstallationInfo
 
@@ -1272,6 +1273,84 @@ class TestUnitGithub(object):
             ):
                 pass
 
+    @pytest.mark.asyncio
+    async def test_get_branches_concurrent_pages(self, valid_handler):
+        before = REGISTRY.get_sample_value(
+            "git_provider_api_calls_github_total",
+            labels={"endpoint": "get_branches"},
+        )
+        url = "https://api.github.com/repos/ThiagoCodecov/example-python/branches"
+
+        def side_effect(request):
+            page = int(request.url.params["page"])
+            branches = [
+                {"name": f"branch-{page}-{i}", "commit": {"sha": f"{page}{i}"}}
+                for i in range(100 if page < 3 else 10)
+            ]
+            headers = {}
+            if page == 1:
+                headers["Link"] = (
+                    f'<{url}?per_page=100&page=2>; rel="next", '
+                    f'<{url}?per_page=100&page=3>; rel="last"'
+                )
+            return httpx.Response(200, json=branches, headers=headers)
+
+        with respx.mock:
+            route = respx.get(url).mock(side_effect=side_effect)
+            branches = await valid_handler.get_branches()
+
+        assert route.call_count == 3
+        assert len(branches) == 210
+        assert branches[0] == ("branch-1-0", "10")
+        assert branches[100] == ("branch-2-0", "20")
+        assert branches[-1] == ("branch-3-9", "39")
+        after = REGISTRY.get_sample_value(
+            "git_provider_api_calls_github_total",
+            labels={"endpoint": "get_branches"},
+        )
+        assert after - before == 3
+
+    @pytest.mark.asyncio
+    async def test_get_pull_request_commits_concurrent_pages_limited(
+        self, valid_handler
+    ):
+        url = (
+            "https://api.github.com/repos/ThiagoCodecov/example-python/pulls/1/commits"
+        )
+
+        def side_effect(request):
+            page = int(request.url.params["page"])
+            headers = {}
+            if page == 1:
+                headers["Link"] = f'<{url}?per_page=100&page=5>; rel="last"'
+            commits = [{"sha": f"{page}-{i}"} for i in range(100)]
+            return httpx.Response(200, json=commits, headers=headers)
+
+        with respx.mock:
+            route = respx.get(url).mock(side_effect=side_effect)
+            commits = await valid_handler.get_pull_request_commits(1)
+
+        assert route.call_count == 3
+        assert commits[::100] == ["1-0", "2-0", "3-0"]
+
+    @pytest.mark.asyncio
+    async def test_get_commit_statuses_concurrent_page_fails(self, valid_handler):
+        url = "https://api.github.com/repos/ThiagoCodecov/example-python/commits/abc/status"
+
+        def side_effect(request):
+            page = int(request.url.params["page"])
+            if page == 3:
+                return httpx.Response(404, json={})
+            headers = {}
+            if page == 1:
+                headers["Link"] = f'<{url}?per_page=100&page=4>; rel="last"'
+            return httpx.Response(200, json={"statuses": []}, headers=headers)
+
+        with respx.mock:
+            respx.get(url).mock(side_effect=side_effect)
+            with pytest.raises(TorngitClientGeneralError):
+                await valid_handler.get_commit_statuses("abc")
+
     @pytest.mark.asyncio
     async def test_list_webhook_deliveries(self, ghapp_handler):
         before = REGISTRY.get_sample_value(
@@ -1851,7 +1930,7 @@ class TestUnitGithub(object):
         assert after_token_refresh - before_token_refresh == 1
 
     @pytest.mark.asyncio
-    async def test__get_owner_from_nodeid(self, ghapp_handler):
+    async def test__get_owners_from_nodeids(self, ghapp_handler):
         before = REGISTRY.get_sample_value(
             "git_provider_api_calls_github_total",
             labels={"endpoint": "get_owner_from_nodeid_graphql"},
@@ -1863,28 +1942,45 @@ class TestUnitGithub(object):
                     headers={"Content-Type": "application/json"},
                     json={
                         "data": {
-                            "node": {
-                                "__typename": "Organization",
-                                "name": "Codecov",
-                                "login": "codecov",
-                                "databaseId": 8226205,
-                            },
+                            "nodes": [
+                                {
+                                    "__typename": "Organization",
+                                    "name": "Codecov",
+                                    "login": "codecov",
+                                    "databaseId": 8226205,
+                                },
+                                None,
+                                {
+                                    "__typename": "User",
+                                    "login": "giovanni-guidini",
+                                    "databaseId": 99758426,
+                                },
+                            ],
                         }
                     },
                 )
             )
-            node_id = "U_kgDOBfIxWg"
+            node_ids = ["O_kgDOAH2FnQ", "U_missing", "U_kgDOBfIxWg"]
             async with ghapp_handler.get_client() as client:
-                res = await ghapp_handler._get_owner_from_nodeid(
-                    client=client, token=MagicMock(), owner_node_id=node_id
+                res = await ghapp_handler._get_owners_from_nodeids(
+                    client=client, token=MagicMock(), owner_node_ids=node_ids
                 )
-            assert res == {"username": "codecov", "service_id": 8226205}
+            assert res == {
+                "O_kgDOAH2FnQ": {"username": "codecov", "service_id": 8226205},
+                "U_kgDOBfIxWg": {
+                    "username": "giovanni-guidini",
+                    "service_id": 99758426,
+                },
+            }
             assert mocked_route.call_count == 1
+            assert json.loads(mocked_route.calls[0].request.content)["variables"] == {
+                "node_ids": node_ids
+            }
             after = REGISTRY.get_sample_value(
                 "git_provider_api_calls_github_total",
                 labels={"endpoint": "get_owner_from_nodeid_graphql"},
             )
-            assert after - before == 1
+            assert after - (before or 0) == 1
 
     @pytest.mark.asyncio
     @pytest.mark.django_db(databases={"default"})
@@ -1974,17 +2070,22 @@ class TestUnitGithub(object):
                         },
                     },
                 )
-            if "query GetOwnerFromNodeId" in content_string:
+            if "query GetOwnersFromNodeIds" in content_string:
+                assert json.loads(content_string)["variables"] == {
+                    "node_ids": ["MDEyOk9yZ2FuaXphdGlvbjgyMjYyMDU="]
+                }
                 return httpx.Response(
                     status_code=200,
                     json={
                         "data": {
-                            "node": {
-                                "__typename": "Organization",
-                                "name": "Codecov",
-                                "login": "codecov",
-                                "databaseId": 8226205,
-                            },
+                            "nodes": [
+                                {
+                                    "__typename": "Organization",
+                                    "name": "Codecov",
+                                    "login": "codecov",
+                                    "databaseId": 8226205,
+                                },
+                            ]
                         }
                     },
                 )
@@ -2056,7 +2157,7 @@ class TestUnitGithub(object):
             "git_provider_api_calls_github_total",
             labels={"endpoint": "get_owner_from_nodeid_graphql"},
         )
-        assert after_get_owner - before_get_owner == 1
+        assert after_get_owner - (before_get_owner or 0) == 1
 
     @pytest.mark.asyncio
     async def test_count_and_get_url_template(self, ghapp_handler):
@@ -2076,3 +2177,159 @@ class TestUnitGithub(object):
     async def test_count_and_get_url_template_unrecognized(self, ghapp_handler):
         with pytest.raises(KeyError):
             ghapp_handler.count_and_get_url_template(url_name="whoops")
+
+    def test_graphql_prepare_batch(self):
+        query = Github.graphql.prepare_batch(
+            "REPO_LANGUAGES",
+            [{"owner": "codecov", "name": "worker"}, {"owner": "a", "name": "b"}],
+        )
+        assert query["query"].startswith(
+            "query BatchRepoLanguages($owner_0: String!, $name_0: String!, "
+            "$owner_1: String!, $name_1: String!) {"
+        )
+        assert "batch_0: repository(owner: $owner_0, name: $name_0)" in query["query"]
+        assert "batch_1: repository(owner: $owner_1, name: $name_1)" in query["query"]
+        assert query["variables"] == {
+            "owner_0": "codecov",
+            "name_0": "worker",
+            "owner_1": "a",
+            "name_1": "b",
+        }
+        assert Github.graphql.prepare_batch("UNKNOWN", []) is None
+
+    @pytest.mark.asyncio
+    async def test_get_repo_languages_batched(self):
+        before = REGISTRY.get_sample_value(
+            "git_provider_api_calls_github_total",
+            labels={"endpoint": "get_repo_languages"},
+        )
+        names = ["worker", "api", "missing", "forbidden"]
+        handlers = [
+            Github(
+                repo=dict(name=name),
+                owner=dict(username="codecov"),
+                token=dict(key="some_key"),
+            )
+            for name in names
+        ]
+
+        def respond(request):
+            variables = json.loads(request.content)["variables"]
+            aliases = {
+                variables[f"name_{index}"]: f"batch_{index}" for index in range(4)
+            }
+            assert sorted(aliases) == sorted(names)
+            return httpx.Response(
+                status_code=200,
+                json={
+                    "data": {
+                        aliases["worker"]: {
+                            "languages": {
+                                "nodes": [{"name": "Python"}, {"name": "Shell"}]
+                            }
+                        },
+                        aliases["api"]: {"languages": {"nodes": []}},
+                        aliases["missing"]: None,
+                        aliases["forbidden"]: None,
+                    },
+                    "errors": [
+                        {
+                            "type": "NOT_FOUND",
+                            "path": [aliases["missing"]],
+                            "message": "Could not resolve to a Repository",
+                        },
+                        {
+                            "type": "FORBIDDEN",
+                            "path": [aliases["forbidden"]],
+                            "message": "Resource protected by organization SAML enforcement",
+                        },
+                    ],
+                },
+            )
+
+        with respx.mock:
+            mocked_route = respx.post("https://api.github.com/graphql").mock(
+                side_effect=respond
+            )
+            res = await asyncio.gather(
+                *(handler.get_repo_languages() for handler in handlers),
+                return_exceptions=True,
+            )
+        assert res[:2] == [["python", "shell"], []]
+        assert isinstance(res[2], TorngitObjectNotFoundError)
+        assert isinstance(res[3], TorngitClientGeneralError)
+        assert "SAML enforcement" in res[3].message
+        assert mocked_route.call_count == 1
+        after = REGISTRY.get_sample_value(
+            "git_provider_api_calls_github_total",
+            labels={"endpoint": "get_repo_languages"},
+        )
+        assert after - (before or 0) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "response_json, expected_error",
+        [
+            (
+                {"data": None, "errors": [{"type": "RATE_LIMITED"}]},
+                TorngitRateLimitError,
+            ),
+            (
+                {"data": None, "errors": [{"message": "Timeout on validation"}]},
+                TorngitClientGeneralError,
+            ),
+            (
+                {
+                    "data": {"batch_0": None, "batch_1": None},
+                    "errors": [{"message": "Something went wrong"}],
+                },
+                TorngitClientGeneralError,
+            ),
+        ],
+    )
+    async def test_get_repo_languages_batched_query_error(
+        self, response_json, expected_error
+    ):
+        handlers = [
+            Github(
+                repo=dict(name=name),
+                owner=dict(username="codecov"),
+                token=dict(key="some_key"),
+            )
+            for name in ["worker", "api"]
+        ]
+        with respx.mock:
+            respx.post("https://api.github.com/graphql").respond(
+                status_code=200, json=response_json
+            )
+            res = await asyncio.gather(
+                *(handler.get_repo_languages() for handler in handlers),
+                return_exceptions=True,
+            )
+        assert all(type(error) is expected_error for error in res)
+
+    @pytest.mark.asyncio
+    async def test_graphql_batch(self):
+        batches = []
+
+        async def fetch(variables):
+            batches.append(variables)
+            if any(v["name"] == "error" for v in variables):
+                raise TorngitServer5xxCodeError()
+            return [v["name"].upper() for v in variables]
+
+        batch = GraphQLBatch(fetch, max_size=2)
+        res = await asyncio.gather(
+            batch.load({"name": "a"}),
+            batch.load({"name": "a"}),
+            batch.load({"name": "b"}),
+        )
+        assert res == ["A", "A", "B"]
+        assert batch.is_sent
+        assert batches == [[{"name": "a"}, {"name": "b"}]]
+
+        batch = GraphQLBatch(fetch)
+        with pytest.raises(TorngitServer5xxCodeError):
+            await asyncio.gather(
+                batch.load({"name": "c"}), batch.load({"name": "error"})
+            )
@@ -616,3 +616,42 @@ class TestUnitGitlab(object):
     async def test_count_and_get_url_template_unrecognized(self, valid_handler):
         with pytest.raises(KeyError):
             valid_handler.count_and_get_url_template(url_name="whoops")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "total_pages_header, max_number_of_pages, expected_pages",
+    [
+        (True, None, [1, 2, 3, 4]),
+        (False, None, [1, 2, 3, 4]),
+        (True, 2, [1, 2]),
+        (False, 2, [1, 2]),
+    ],
+)
+async def test_make_paginated_call(
+    valid_handler, total_pages_header, max_number_of_pages, expected_pages
+):
+    def side_effect(request):
+        page = int(request.url.params.get("page", 1))
+        headers = {"X-Next-Page": str(page + 1) if page < 4 else ""}
+        if total_pages_header:
+            headers["X-Total-Pages"] = "4"
+        return httpx.Response(200, json=[page], headers=headers)
+
+    with respx.mock:
+        route = respx.get("https://gitlab.com/api/v4/projects/187725/items").mock(
+            side_effect=side_effect
+        )
+        pages = [
+            page
+            async for page in valid_handler.make_paginated_call(
+                "/projects/187725/items",
+                default_kwargs={},
+                max_per_page=100,
+                counter_name="get_branches",
+                max_number_of_pages=max_number_of_pages,
+            )
+        ]
+
+    assert pages == [[page] for page in expected_pages]
+    assert route.call_count == len(expected_pages)
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+import respx
+
+from shared.torngit.exceptions import (
+    TorngitCircuitOpenError,
+    TorngitRateLimitError,
+    TorngitServer5xxCodeError,
+)
+from shared.torngit.github import Github
+from shared.torngit.retry import (
+    CircuitBreaker,
+    RetryBudget,
+    RetryPolicy,
+    get_retry_policy,
+    parse_retry_after,
+)
+
+
+@pytest.fixture
+def handler():
+    return Github(
+        repo=dict(name="example-python"),
+        owner=dict(username="codecov"),
+        token=dict(key="some_key"),
+    )
+
+
+@pytest.fixture
+def sleeps(mocker):
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    mocker.patch("shared.torngit.github.asyncio.sleep", side_effect=sleep)
+    return sleeps
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("10") == 10
+    assert parse_retry_after("soon") is None
+    in_a_minute = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert 55 < parse_retry_after(format_datetime(in_a_minute, usegmt=True)) <= 60
+    in_the_past = datetime.now(timezone.utc) - timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(in_the_past, usegmt=True)) == 0
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    assert not budget.try_spend()
+    budget.record_request()
+    assert budget.try_spend()
+
+
+def test_circuit_breaker(mocker):
+    now = mocker.patch("shared.torngit.retry.time.monotonic", return_value=100)
+    breaker = CircuitBreaker("github", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+    now.return_value = 110
+    # a single request is let through
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now.return_value = 120
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_retry_policy_delay(mocker):
+    policy = RetryPolicy(
+        "github",
+        RetryBudget(min_per_second=0, max_tokens=3),
+        CircuitBreaker("github"),
+        max_attempts=3,
+        base_delay=1,
+        max_delay=1.5,
+    )
+    mocker.patch("shared.torngit.retry.random.uniform", side_effect=lambda a, b: b)
+    assert policy.get_retry_delay(1) == 1
+    assert policy.get_retry_delay(2) == 1.5
+    assert policy.get_retry_delay(3) is None
+    # Retry-After takes precedence over shorter backoffs, too long ones aren't waited
+    assert policy.get_retry_delay(1, "5") == 5
+    assert policy.get_retry_delay(1, "3600") is None
+    # the budget is exhausted
+    assert policy.get_retry_delay(1) is None
+
+
+def test_get_retry_policy():
+    policy = get_retry_policy("github")
+    assert policy.circuit_breaker is get_retry_policy("github").circuit_breaker
+    assert policy.budget is get_retry_policy("gitlab").budget
+    assert policy.circuit_breaker is not get_retry_policy("gitlab").circuit_breaker
+
+
+@pytest.mark.asyncio
+async def test_github_backs_off(handler, sleeps):
+    with respx.mock:
+        route = respx.get("https://api.github.com/endpoint").mock(
+            side_effect=[
+                httpx.Response(503),
+                httpx.Response(502, headers={"Retry-After": "2"}),
+                httpx.Response(200, json={"ok": True}),
+            ]
+        )
+        async with handler.get_client() as client:
+            assert await handler.api(client, "get", "/endpoint") == {"ok": True}
+    assert route.call_count == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.25
+    assert sleeps[1] == 2
+
+
+@pytest.mark.asyncio
+async def test_github_secondary_rate_limit_waited(handler, sleeps):
+    with respx.mock:
+        route = respx.get("https://api.github.com/endpoint").mock(
+            side_effect=[
+                httpx.Response(403, headers={"Retry-After": "5"}),
+                httpx.Response(200, json={"ok": True}),
+            ]
+        )
+        async with handler.get_client() as client:
+            assert await handler.api(client, "get", "/endpoint") == {"ok": True}
+    assert route.call_count == 2
+    assert sleeps == [5]
+
+    with respx.mock:
+        respx.get("https://api.github.com/endpoint").respond(
+            403, headers={"Retry-After": "60"}
+        )
+        async with handler.get_client() as client:
+            with pytest.raises(TorngitRateLimitError):
+                await handler.api(client, "get", "/endpoint")
+    assert sleeps == [5]
+
+
+@pytest.mark.asyncio
+async def test_github_circuit_opens(handler, sleeps):
+    breaker = handler.retry_policy.circuit_breaker
+    with respx.mock:
+        route = respx.get("https://api.github.com/endpoint").respond(503)
+        async with handler.get_client() as client:
+            while not breaker.is_open:
+                # the circuit can open between the attempts of a request
+                with pytest.raises(
+                    (TorngitServer5xxCodeError, TorngitCircuitOpenError)
+                ):
+                    await handler.api(client, "get", "/endpoint")
+            calls = route.call_count
+            with pytest.raises(TorngitCircuitOpenError):
+                await handler.api(client, "get", "/endpoint")
+    assert route.call_count == calls
+    # other providers aren't affected
+    assert not get_retry_policy("gitlab").circuit_breaker.is_open
@@ -1,9 +1,12 @@
+import json
+from collections import namedtuple
 from decimal import Decimal
+from fractions import Fraction
 
 import pytest
 
-from shared.reports.types import ReportTotals
-from shared.utils.ReportEncoder import ReportEncoder
+from shared.reports.types import LineSession, ReportLine, ReportTotals
+from shared.utils.ReportEncoder import ReportEncoder, dumps_json, iter_json
 from shared.utils.sessions import Session
 
 
@@ -46,3 +49,41 @@ def test_exception_report_encoder():
     with pytest.raises(Exception) as e_info:
         ReportEncoder().default([1, 2])
     assert e_info.type is TypeError
+
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+class Ratio(float):
+    pass
+
+
+COMPATIBILITY_PAYLOADS = [
+    {"key": "value", "list": [1, 2.5, None, True], "nested": {"a": (1, 2)}},
+    {1: "int key", 2.5: "float key", False: "bool key", None: "null key"},
+    {"totals": ReportTotals(files=3, lines=10, coverage="85.00"), "none": None},
+    [ReportLine.create(coverage=1, sessions=[LineSession(0, 1)]), Decimal("1.10")],
+    {"fraction": Fraction(1, 3), "session": Session("id", "totals")},
+    {"namedtuple": Point(1, 2), "float subclass": Ratio(0.5)},
+    {"unicode": "héllo ✓", "escapes": 'quote" backslash\\ newline\n'},
+    {"big int": 2**70, "floats": [1e16, 0.1, -0.0, 123456789.123]},
+]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("data", COMPATIBILITY_PAYLOADS)
+def test_dumps_json_compatibility(data):
+    expected = json.loads(json.dumps(data, cls=ReportEncoder))
+    assert json.loads(dumps_json(data)) == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("data", COMPATIBILITY_PAYLOADS)
+def test_iter_json(data):
+    assert b"".join(iter_json(data, chunk_items=1)) == dumps_json(data)
+
+
+@pytest.mark.unit
+def test_dumps_json_unsupported_type():
+    with pytest.raises(TypeError):
+        dumps_json({"set": {1, 2}})